@@ -2,3 +2,8 @@
 ALTER TABLE workflows ADD COLUMN IF NOT EXISTS session_id VARCHAR;
 ALTER TABLE workflows ADD COLUMN IF NOT EXISTS is_template VARCHAR DEFAULT 'false';
 CREATE INDEX IF NOT EXISTS idx_workflows_session_id ON workflows(session_id);
+
+-- LLM response cache counters on agent_scores
+ALTER TABLE agent_scores ADD COLUMN IF NOT EXISTS cache_hits INTEGER DEFAULT 0;
+ALTER TABLE agent_scores ADD COLUMN IF NOT EXISTS cache_misses INTEGER DEFAULT 0;
+ALTER TABLE agent_scores ADD COLUMN IF NOT EXISTS cost_saved DOUBLE PRECISION DEFAULT 0;
@@ -4,10 +4,9 @@
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from temporalio.client import Client
 from typing import List
-from app.core.config import settings
 from app.core.database import get_db
+from app.core.temporal_client import get_temporal_client, temporal_client_manager
 from app.models.workflow import ApprovalRequest
 from app.schemas.workflow import ApprovalResponseSchema
 from app.temporal.workflows import OrchestrationWorkflow
@@ -85,20 +84,8 @@ async def respond_to_approval(
         approval.resolved_at = datetime.now(timezone.utc).isoformat()
         db.commit()
         
-        # Signal Temporal workflow with proper authentication
-        if settings.TEMPORAL_API_KEY:
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE,
-                api_key=settings.TEMPORAL_API_KEY,
-                tls=True
-            )
-        else:
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE
-            )
-        
+        # Signal Temporal workflow over the shared client
+        client = await get_temporal_client()
         handle = client.get_workflow_handle(execution_id)
         
         signal_data = {
@@ -108,10 +95,14 @@ async def respond_to_approval(
              "timestamp": datetime.now(timezone.utc).isoformat(),
              # Optionally include all responses if workflow needs them
         }
-        await handle.signal(
-            "approval_signal", # <-- Pass the signal name as a string
-            signal_data
-        )
+        try:
+            await handle.signal(
+                "approval_signal", # <-- Pass the signal name as a string
+                signal_data
+            )
+        except Exception as e:
+            temporal_client_manager.report_failure(e)
+            raise
 
         return {"status": final_status, "execution_id": execution_id}
     else:
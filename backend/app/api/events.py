@@ -1,113 +1,361 @@
 """WebSocket events API"""
 import json
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
-from typing import Optional, Set, Dict
+import time
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, Mapping, Optional, Dict, Set, Tuple
 import asyncio
-from app.core.events import event_bus
+from app.core.config import settings
+from app.core.codec import LazyEvent
+from app.core.dispatcher import LatencyHistogram
+from app.core.events import entity_channel, event_bus, parse_stream_id
+from app.core.event_archive import event_archive
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+# Stream entries read per XRANGE while a reconnecting client catches up
+CATCH_UP_PAGE_SIZE = 500
+
+class ClientConnection:
+    """
+    One WebSocket with a bounded outbound queue drained by its own writer task,
+    so a slow client never delays the broadcaster or other clients.
+    """
+
+    def __init__(self, websocket: WebSocket, channel: str, max_queue: int, max_resyncs: int):
+        self.websocket = websocket
+        self.channel = channel
+        self.max_resyncs = max_resyncs
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.resyncs = 0
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+        # Stream ID of the newest event delivered; older live messages are duplicates of the catch-up
+        self.last_sent_id: Optional[Tuple[int, int]] = None
+
+    def start(self, on_sent: Callable[[str, float], None]) -> None:
+        self.writer = asyncio.create_task(self._write_loop(on_sent))
+
+    def offer(self, message: Mapping) -> bool:
+        """
+        Enqueue without waiting. A full queue means the client fell behind: its backlog is
+        replaced by one "resync" message (the client refetches via replay), and after
+        `max_resyncs` such overflows it is evicted. Returns False once the client is gone.
+        """
+        if self.closed:
+            return False
+        item = (time.perf_counter(), message)
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.resyncs += 1
+        if self.resyncs > self.max_resyncs:
+            self.close()
+            return False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((item[0], {"type": "resync", "channel": self.channel}))
+        return True
+
+    async def _write_loop(self, on_sent: Callable[[str, float], None]) -> None:
+        try:
+            while True:
+                enqueued_at, message = await self.queue.get()
+                event_id = message.id if isinstance(message, LazyEvent) else message.get("id")
+                stream_id = parse_stream_id(event_id) if event_id else None
+                if stream_id is not None and self.last_sent_id is not None and stream_id <= self.last_sent_id:
+                    continue
+                if isinstance(message, LazyEvent):
+                    # Forward the envelope exactly as published - no decode, no per-client encode
+                    await self.websocket.send_text(message.raw)
+                else:
+                    await self.websocket.send_json(message)
+                if stream_id is not None:
+                    self.last_sent_id = stream_id
+                on_sent(self.channel, (time.perf_counter() - enqueued_at) * 1000)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Socket is gone; the endpoint's receive loop will notice and disconnect
+            self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+        if self.writer is not None and not self.writer.done():
+            self.writer.cancel()
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, channel: str):
+    def __init__(self, max_queue: Optional[int] = None, max_resyncs: Optional[int] = None):
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.max_resyncs = max_resyncs if max_resyncs is not None else settings.WS_MAX_RESYNCS
+        # Enqueue -> sent latency per channel
+        self.fanout_latency: Dict[str, LatencyHistogram] = {}
+        self.evictions = 0
+
+    async def connect(self, websocket: WebSocket, channel: str, start_writer: bool = True) -> ClientConnection:
         await websocket.accept()
-        if channel not in self.active_connections:
-            self.active_connections[channel] = set()
-        self.active_connections[channel].add(websocket)
-    
+        return self.register(websocket, channel, start_writer)
+
+    def register(self, websocket: WebSocket, channel: str, start_writer: bool = True) -> ClientConnection:
+        """
+        Track an accepted socket and start its writer task. With start_writer=False live
+        messages only queue up until start_writer() is called (used while catching up).
+        """
+        connection = ClientConnection(websocket, channel, self.max_queue, self.max_resyncs)
+        if start_writer:
+            connection.start(self._record_sent)
+        self.active_connections.setdefault(channel, {})[websocket] = connection
+        return connection
+
+    def start_writer(self, connection: ClientConnection) -> None:
+        connection.start(self._record_sent)
+
     def disconnect(self, websocket: WebSocket, channel: str):
-        if channel in self.active_connections:
-            self.active_connections[channel].discard(websocket)
-    
-    async def broadcast(self, channel: str, message: dict):
-        if channel in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[channel]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    disconnected.add(connection)
-            self.active_connections[channel] -= disconnected
+        connections = self.active_connections.get(channel)
+        if connections is None:
+            return
+        connection = connections.pop(websocket, None)
+        if connection is not None:
+            connection.close()
+        if not connections:
+            del self.active_connections[channel]
+            self.fanout_latency.pop(channel, None)
+
+    def send(self, websocket: WebSocket, channel: str, message: dict) -> bool:
+        """Queue a message for a single client (e.g. keepalive pings)."""
+        connection = self.active_connections.get(channel, {}).get(websocket)
+        return connection is not None and connection.offer(message)
+
+    async def broadcast(self, channel: str, message: Mapping):
+        """Enqueue `message` for every client of `channel`; never waits on a socket."""
+        connections = self.active_connections.get(channel)
+        if not connections:
+            return
+        evicted = [ws for ws, connection in connections.items() if not connection.offer(message)]
+        for websocket in evicted:
+            self.evictions += 1
+            print(f"🐢 Dropping slow or closed WebSocket client from {channel}")
+            self.disconnect(websocket, channel)
+            try:
+                await websocket.close(code=1013)  # Try again later
+            except Exception:
+                pass
+
+    def _record_sent(self, channel: str, latency_ms: float) -> None:
+        self.fanout_latency.setdefault(channel, LatencyHistogram()).observe(latency_ms)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self.active_connections),
+            "clients": sum(len(c) for c in self.active_connections.values()),
+            "queued_messages": sum(conn.queue.qsize() for c in self.active_connections.values() for conn in c.values()),
+            "evictions": self.evictions,
+            "fanout_latency": {channel: h.to_dict() for channel, h in self.fanout_latency.items()},
+        }
 
 manager = ConnectionManager()
 
-@router.websocket("/ws/workflows/{workflow_id}")
-async def websocket_workflow_events(websocket: WebSocket, workflow_id: str):
-    channel = f"workflow:{workflow_id}"
-    await manager.connect(websocket, channel)
-    print(f"✅ WebSocket connected for {channel}, total clients: {len(manager.active_connections.get(channel, []))}")
+# WebSocket channels this instance currently receives from Redis
+watched_channels: Set[str] = set()
+
+def _channel_listener(channel: str) -> Callable:
+    return push_to_execution_clients if channel.startswith("execution:") else push_to_workflow_clients
+
+async def watch_channel(channel: str):
+    """Subscribe to an entity's events when its first client connects."""
+    if channel in watched_channels:
+        return
+    watched_channels.add(channel)
+    await event_bus.subscribe(entity_channel(channel), _channel_listener(channel))
+
+async def unwatch_channel_if_idle(channel: str):
+    """Drop the subscription once the last client of `channel` has left."""
+    if channel not in watched_channels or manager.active_connections.get(channel):
+        return
+    watched_channels.discard(channel)
+    await event_bus.unsubscribe(entity_channel(channel), _channel_listener(channel))
+
+async def catch_up(connection: ClientConnection, last_event_id: str) -> int:
+    """
+    Send the events a reconnecting client missed after `last_event_id`, in pages
+    (executions read through the archive, so their gap is never lost to trimming).
+    Must run after the live subscription is in place and before the writer starts:
+    live messages queue up meanwhile and the writer drops those the catch-up already
+    covered, so the client sees no gap and no duplicates.
+    Returns the number of events replayed.
+    """
+    websocket = connection.websocket
+    try:
+        connection.last_sent_id = parse_stream_id(last_event_id)
+    except ValueError:
+        await websocket.send_json({"type": "resync", "channel": connection.channel})
+        return 0
+
+    if not connection.channel.startswith("execution:"):
+        oldest = await event_bus.read_stream(f"{connection.channel}:events", count=1)
+        if oldest and parse_stream_id(oldest[0]["id"]) > connection.last_sent_id:
+            # Part of the gap was already trimmed from the capped stream; only a full refetch is correct
+            await websocket.send_json({"type": "resync", "channel": connection.channel})
+            return 0
+
+    read_page = _page_reader(connection.channel)
+    replayed = 0
+    cursor: Optional[str] = last_event_id
+    last_id = last_event_id
+    while cursor is not None:
+        page, cursor = await read_page(cursor, "-", CATCH_UP_PAGE_SIZE, None)
+        for event in page:
+            # Replayed events go out in the same envelope as live ones
+            await websocket.send_text(event_bus.live_envelope(event))
+        replayed += len(page)
+        if page:
+            last_id = page[-1]["id"]
+            connection.last_sent_id = parse_stream_id(last_id)
+
+    await websocket.send_json({"type": "replay.complete", "last_event_id": last_id, "replayed": replayed})
+    return replayed
+
+async def _serve_channel(websocket: WebSocket, channel: str, last_event_id: Optional[str] = None):
+    connection = await manager.connect(websocket, channel, start_writer=last_event_id is None)
+    await watch_channel(channel)
+    print(f"✅ WebSocket connected for {channel}, total clients: {len(manager.active_connections.get(channel, {}))}")
     try:
+        if last_event_id is not None:
+            replayed = await catch_up(connection, last_event_id)
+            manager.start_writer(connection)
+            print(f"⏩ Replayed {replayed} missed events on {channel} after {last_event_id}")
         while True:
             # Keep connection alive, wait for client messages or timeout
             try:
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
             except asyncio.TimeoutError:
-                # Send ping to keep alive
-                await websocket.send_json({"type": "ping"})
+                # Ping goes through the client's queue so it never interleaves with the writer
+                if not manager.send(websocket, channel, {"type": "ping"}):
+                    break
     except WebSocketDisconnect:
-        manager.disconnect(websocket, channel)
         print(f"🔌 WebSocket disconnected for {channel}")
+    finally:
+        manager.disconnect(websocket, channel)
+        await unwatch_channel_if_idle(channel)
+
+@router.websocket("/ws/workflows/{workflow_id}")
+async def websocket_workflow_events(websocket: WebSocket, workflow_id: str, last_event_id: Optional[str] = Query(None)):
+    await _serve_channel(websocket, f"workflow:{workflow_id}", last_event_id)
 
 @router.websocket("/ws/executions/{execution_id}")
-async def websocket_execution_events(websocket: WebSocket, execution_id: str):
-    channel = f"execution:{execution_id}"
-    await manager.connect(websocket, channel)
-    print(f"✅ WebSocket connected for {channel}, total clients: {len(manager.active_connections.get(channel, []))}")
+async def websocket_execution_events(websocket: WebSocket, execution_id: str, last_event_id: Optional[str] = Query(None)):
+    await _serve_channel(websocket, f"execution:{execution_id}", last_event_id)
+
+def _replay_start(from_timestamp: Optional[float]) -> str:
+    return f"{int(from_timestamp * 1000)}-0" if from_timestamp else "-"
+
+def _replay_filter(event_types: Optional[str]) -> Optional[Set[str]]:
+    if not event_types:
+        return None
+    return {t.strip() for t in event_types.split(",") if t.strip()} or None
+
+def _page_reader(channel: str) -> Callable:
+    """read_page-style reader for a channel: executions span both storage tiers, workflows are Redis-only (length-capped)."""
+    kind, _, entity_id = channel.partition(":")
+    if kind == "execution":
+        return lambda *args: event_archive.read_execution_page(entity_id, *args)
+    return lambda *args: event_bus.read_page(f"{channel}:events", *args)
+
+async def _iter_events(channel: str, start_id: str, event_types: Optional[Set[str]]):
+    read_page = _page_reader(channel)
+    cursor: Optional[str] = None
+    while True:
+        page, cursor = await read_page(cursor, start_id, 500, event_types)
+        for event in page:
+            yield event
+        if cursor is None:
+            return
+
+async def _replay_page(channel: str, cursor: Optional[str], from_timestamp: Optional[float],
+                       limit: int, event_types: Optional[str]) -> Dict[str, Any]:
+    if cursor is not None:
+        try:
+            parse_stream_id(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
     try:
-        while True:
-            # Keep connection alive, wait for client messages or timeout
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-            except asyncio.TimeoutError:
-                # Send ping to keep alive
-                await websocket.send_json({"type": "ping"})
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, channel)
-        print(f"🔌 WebSocket disconnected for {channel}")
+        events, next_cursor = await _page_reader(channel)(
+            cursor, _replay_start(from_timestamp), limit, _replay_filter(event_types)
+        )
+    except Exception as e:
+        print(f"❌ Failed to replay {channel}: {e}")
+        raise HTTPException(status_code=503, detail="Event stream unavailable")
+    return {"events": events, "count": len(events), "next_cursor": next_cursor}
+
+def _replay_ndjson(channel: str, from_timestamp: Optional[float], event_types: Optional[str]) -> StreamingResponse:
+    async def lines():
+        try:
+            async for event in _iter_events(channel, _replay_start(from_timestamp), _replay_filter(event_types)):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            # Headers are already sent; end the stream and log
+            print(f"❌ Replay of {channel} aborted: {e}")
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.get("/replay/workflow/{workflow_id}")
-async def replay_workflow_events(workflow_id: str, from_timestamp: Optional[float] = Query(None)):
-    # FIX: Added await here
-    events = await event_bus.replay_workflow_events(workflow_id, from_timestamp)
-    return {"workflow_id": workflow_id, "events": events, "count": len(events)}
+async def replay_workflow_events(
+    workflow_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    event_types: Optional[str] = Query(None, description="Comma-separated event types"),
+    from_timestamp: Optional[float] = Query(None),
+):
+    page = await _replay_page(f"workflow:{workflow_id}", cursor, from_timestamp, limit, event_types)
+    return {"workflow_id": workflow_id, **page}
+
+@router.get("/replay/workflow/{workflow_id}/stream")
+async def stream_workflow_events(workflow_id: str, event_types: Optional[str] = Query(None), from_timestamp: Optional[float] = Query(None)):
+    """All events of the workflow as NDJSON, read from Redis page by page."""
+    return _replay_ndjson(f"workflow:{workflow_id}", from_timestamp, event_types)
 
 @router.get("/replay/execution/{execution_id}")
-async def replay_execution_events(execution_id: str, from_timestamp: Optional[float] = Query(None)):
-    # FIX: Added await here
-    events = await event_bus.replay_execution_events(execution_id, from_timestamp)
-    return {"execution_id": execution_id, "events": events, "count": len(events)}
+async def replay_execution_events(
+    execution_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    event_types: Optional[str] = Query(None, description="Comma-separated event types"),
+    from_timestamp: Optional[float] = Query(None),
+):
+    page = await _replay_page(f"execution:{execution_id}", cursor, from_timestamp, limit, event_types)
+    return {"execution_id": execution_id, **page}
 
-async def push_to_websocket_clients(event_data: dict):
-    """
-    Broadcast events to WebSocket clients.
-    event_data structure: {"event_type": str, "data": str (JSON), "timestamp": str}
-    """
-    print(f"🔔 push_to_websocket_clients called with event_type: {event_data.get('event_type')}")
-    
-    # Parse the inner 'data' string into an object first
-    try:
-        if isinstance(event_data.get("data"), str):
-            parsed_data = json.loads(event_data["data"])
-            event_data["data"] = parsed_data
-        else:
-            parsed_data = event_data.get("data", {})
-    except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse event data: {e}")
-        return
+@router.get("/replay/execution/{execution_id}/stream")
+async def stream_execution_events(execution_id: str, event_types: Optional[str] = Query(None), from_timestamp: Optional[float] = Query(None)):
+    """All events of the execution as NDJSON, read page by page from the archive and then Redis."""
+    return _replay_ndjson(f"execution:{execution_id}", from_timestamp, event_types)
+
+def _event_payload(event_data: Mapping) -> Mapping:
+    """The 'data' field arrives as an object; older publishers sent a JSON string."""
+    data = event_data.get("data") or {}
+    if isinstance(data, str):
+        data = json.loads(data)
+    return data
+
+def _target_channel(event_data: Mapping, kind: str) -> Optional[str]:
+    """WebSocket channel for an event: taken from the Redis channel when known, so nothing is decoded."""
+    if isinstance(event_data, LazyEvent) and event_data.channel.startswith(f"events:{kind}:"):
+        return event_data.channel[len("events:"):]
+    entity_id = _event_payload(event_data).get(f"{kind}_id")
+    return f"{kind}:{entity_id}" if entity_id else None
+
+async def push_to_execution_clients(event_data: Mapping):
+    """Broadcast an event from a watched execution's channel to its WebSocket clients."""
+    channel = _target_channel(event_data, "execution")
+    if channel:
+        await manager.broadcast(channel, event_data)
 
-    # Now extract IDs from the parsed data
-    workflow_id = parsed_data.get("workflow_id")
-    execution_id = parsed_data.get("execution_id")
-    
-    print(f"📨 Broadcasting event {event_data.get('event_type')} to execution:{execution_id}, workflow:{workflow_id}")
-    print(f"📊 Active WebSocket channels: {list(manager.active_connections.keys())}")
-    print(f"📊 Clients on execution:{execution_id}: {len(manager.active_connections.get(f'execution:{execution_id}', []))}")
-
-    if workflow_id:
-        await manager.broadcast(f"workflow:{workflow_id}", event_data)
-        print(f"✅ Broadcasted to workflow:{workflow_id}")
-    if execution_id:
-        await manager.broadcast(f"execution:{execution_id}", event_data)
-        print(f"✅ Broadcasted to execution:{execution_id}")
\ No newline at end of file
+async def push_to_workflow_clients(event_data: Mapping):
+    """Broadcast an event from a watched workflow's channel to its WebSocket clients."""
+    channel = _target_channel(event_data, "workflow")
+    if channel:
+        await manager.broadcast(channel, event_data)
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
-from temporalio.client import Client
 from app.core.database import get_db
-from app.core.config import settings
+from app.core.temporal_client import get_temporal_client, temporal_client_manager
 from app.models.workflow import Execution
 from app.temporal.workflows import OrchestrationWorkflow
 from app.services.narration import NarrationService
+from app.core.blob_store import BLOB_REF_PREFIX, blob_store
 
 router = APIRouter(prefix="/executions", tags=["executions"])
 
@@ -48,24 +48,13 @@ async def get_execution(execution_id: str, db: Session = Depends(get_db)):
 
     # Try to augment with live Temporal state, if available
     try:
-        if settings.TEMPORAL_API_KEY:
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE,
-                api_key=settings.TEMPORAL_API_KEY,
-                tls=True
-            )
-        else:
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE,
-            )
+        client = await get_temporal_client()
         handle = client.get_workflow_handle(execution_id)
         state = await handle.query(OrchestrationWorkflow.get_state)
         data["current_state"] = state
-    except Exception:
+    except Exception as e:
         # If Temporal is unavailable or workflow closed, skip state enrichment
-        pass
+        temporal_client_manager.report_failure(e)
 
     return data
 
@@ -92,21 +81,13 @@ async def cancel_execution(execution_id: str, db: Session = Depends(get_db)):
     if not execution:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    if settings.TEMPORAL_API_KEY:
-        client = await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE,
-            api_key=settings.TEMPORAL_API_KEY,
-            tls=True
-        )
-    else:
-        client = await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE,
-        )
-    
+    client = await get_temporal_client()
     handle = client.get_workflow_handle(execution_id)
-    await handle.cancel()
+    try:
+        await handle.cancel()
+    except Exception as e:
+        temporal_client_manager.report_failure(e)
+        raise
     execution.status = "canceled"
     db.commit()
     return {"status": "cancel_requested"}
@@ -122,4 +103,12 @@ async def get_execution_narration(execution_id: str, db: Session = Depends(get_d
 
     narration_service = NarrationService()
     report = narration_service.generate_narration(execution.workflow_id, execution_id)
-    return {"narration": report}
\ No newline at end of file
+    return {"narration": report}
+
+@router.get("/blobs/{digest}")
+async def get_blob(digest: str):
+    """Content behind a "blob:sha256:<digest>" reference found in node outputs or events."""
+    try:
+        return {"digest": digest, "value": await blob_store.get(BLOB_REF_PREFIX + digest)}
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Blob not found")
@@ -5,6 +5,9 @@ from sqlalchemy import func
 from app.core.database import get_db
 from app.models.event_log import EventLog, AgentScore
 from app.models.workflow import Execution
+from app.core.temporal_client import temporal_client_manager
+from app.core.event_log_writer import event_log_writer
+from app.core.events import event_bus
 from typing import Dict, Any
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
@@ -36,6 +39,14 @@ async def get_metrics_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
         "success_rate": round(success_rate, 2)
     }
 
+def _cache_counts(hits: int, misses: int) -> Dict[str, Any]:
+    """Cache hit/miss counts and ratio (None before the first cached request)"""
+    return {
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "cache_hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
 @router.get("/agents")
 async def get_agent_metrics(db: Session = Depends(get_db)):
     """Get agent performance metrics"""
@@ -50,7 +61,9 @@ async def get_agent_metrics(db: Session = Depends(get_db)):
             "failure_count": s.failure_count,
             "reliability_score": round(s.reliability_score, 3),
             "avg_latency_ms": round(s.avg_latency_ms, 2),
-            "total_cost": round(s.total_cost, 2)
+            "total_cost": round(s.total_cost, 2),
+            **_cache_counts(s.cache_hits or 0, s.cache_misses or 0),
+            "cost_saved": round(s.cost_saved or 0.0, 4)
         }
         for s in scores
     ]
@@ -94,5 +107,74 @@ async def get_cost_metrics(db: Session = Depends(get_db)):
     
     return {
         "total_cost": round(total_cost, 2),
-        "by_provider": {k: round(v, 2) for k, v in by_provider.items()}
+        "by_provider": {k: round(v, 2) for k, v in by_provider.items()},
+        "cost_saved_by_cache": round(sum(a.cost_saved or 0.0 for a in agents), 4)
     }
+
+@router.get("/temporal-client")
+async def get_temporal_client_metrics():
+    """Get shared Temporal client connection and payload compression metrics"""
+    from app.core.payload_codec import payload_codec
+    return {**temporal_client_manager.get_metrics(), "payload_codec": payload_codec.get_metrics()}
+
+@router.get("/http-client")
+async def get_http_client_metrics():
+    """
+    Get shared HTTP client pool metrics (requests in use, waiting, connections reused):
+    this API process's pool, and each worker's as last reported to Redis
+    """
+    from app.core.http_client import http_client
+    from app.core.worker_metrics import read_worker_metrics
+    try:
+        workers = await read_worker_metrics(event_bus.redis_client, "http_client")
+    except Exception as e:
+        print(f"⚠️  Reading worker metrics failed: {e}")
+        workers = {}
+    return {"api": http_client.get_metrics(), "workers": workers}
+
+@router.get("/http-cache")
+async def get_http_cache_metrics():
+    """Get API call response cache hit/miss/revalidation metrics and size"""
+    from app.services.http_cache import http_response_cache
+    return await http_response_cache.get_metrics()
+
+@router.get("/llm-cache")
+async def get_llm_cache_metrics():
+    """Get agent LLM response cache hit/miss metrics, saved cost (this process) and size"""
+    from app.services.llm_cache import llm_response_cache
+    return await llm_response_cache.get_metrics()
+
+@router.get("/llm-single-flight")
+async def get_llm_single_flight_metrics():
+    """Get agent call coalescing metrics (calls made, requests coalesced, in flight) for this process"""
+    from app.services.agent_executor import agent_single_flight
+    return agent_single_flight.get_metrics()
+
+@router.get("/event-writer")
+async def get_event_writer_metrics():
+    """Get event chronicle writer queue and flush metrics"""
+    return event_log_writer.get_metrics()
+
+@router.get("/event-dispatch")
+async def get_event_dispatch_metrics():
+    """Get event bus dispatcher load and per-listener latency histograms"""
+    return event_bus.dispatcher.get_metrics()
+
+@router.get("/event-consumer")
+async def get_event_consumer_metrics():
+    """Get projection consumer-group metrics (disabled unless consumer-group mode is on)"""
+    if event_bus.stream_consumer is None:
+        return {"enabled": False}
+    return {"enabled": True, **event_bus.stream_consumer.get_metrics()}
+
+@router.get("/websocket")
+async def get_websocket_metrics():
+    """Get WebSocket fan-out queue depth, evictions and per-channel latency"""
+    from app.api.events import manager
+    return manager.get_metrics()
+
+@router.get("/event-archive")
+async def get_event_archive_metrics():
+    """Get cold-tier compaction and read metrics"""
+    from app.core.event_archive import event_archive
+    return event_archive.get_metrics()
@@ -4,34 +4,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
-from temporalio.client import Client
 from uuid import uuid4
 from app.core.database import get_db
-from app.core.config import settings
+from app.core.temporal_client import get_temporal_client, temporal_client_manager
 from app.models.workflow import Workflow, Execution
 from app.schemas.workflow import WorkflowCreateSchema, WorkflowExecuteSchema, WorkflowUpdateSchema
-from app.temporal.workflows import OrchestrationWorkflow
+from app.temporal.workflows import OrchestrationWorkflow, continue_as_new_limits
 from app.services.validation import validate_workflow
 
 router = APIRouter(prefix="/workflows", tags=["workflows"])
 
-async def get_temporal_client() -> Client:
-    """Get Temporal client with proper authentication"""
-    if settings.TEMPORAL_API_KEY:
-        # Temporal Cloud with API Key (recommended)
-        return await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE,
-            api_key=settings.TEMPORAL_API_KEY,
-            tls=True
-        )
-    else:
-        # Local Temporal or self-hosted
-        return await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE
-        )
-
 # --- [NEW ENDPOINT] ---
 @router.get("/")
 async def list_workflows(
@@ -155,15 +137,19 @@ async def execute_workflow(
     db.add(execution)
     db.commit()
     
-    # Start Temporal workflow
+    # Start Temporal workflow on the shared client
     client = await get_temporal_client()
     
-    handle = await client.start_workflow(
-        OrchestrationWorkflow.run,
-        args=[workflow_id, workflow.definition, execute_request.input_data],
-        id=execution_id,
-        task_queue="orchestration-queue"
-    )
+    try:
+        handle = await client.start_workflow(
+            OrchestrationWorkflow.run,
+            args=[workflow_id, workflow.definition, execute_request.input_data, {"limits": continue_as_new_limits()}],
+            id=execution_id,
+            task_queue="orchestration-queue"
+        )
+    except Exception as e:
+        temporal_client_manager.report_failure(e)
+        raise
     
     return {
         "execution_id": execution_id,
@@ -180,6 +166,7 @@ async def pause_execution(workflow_id: str, execution_id: str):
         await handle.signal("pause")
         return {"status": "pause_signal_sent", "execution_id": execution_id}
     except Exception as e:
+        temporal_client_manager.report_failure(e)
         raise HTTPException(500, f"Failed to send pause signal: {str(e)}")
 
 @router.post("/{workflow_id}/resume")
@@ -191,6 +178,7 @@ async def resume_execution(workflow_id: str, execution_id: str):
         await handle.signal("resume")
         return {"status": "resume_signal_sent", "execution_id": execution_id}
     except Exception as e:
+        temporal_client_manager.report_failure(e)
         raise HTTPException(500, f"Failed to send resume signal: {str(e)}")
 
 @router.get("/{workflow_id}/history")
@@ -219,6 +207,7 @@ async def get_workflow_history(workflow_id: str, execution_id: str):
             "history": history
         }
     except Exception as e:
+        temporal_client_manager.report_failure(e)
         raise HTTPException(500, f"Failed to get history: {str(e)}")
 
 @router.post("/{workflow_id}/compensate")
@@ -232,6 +221,7 @@ async def trigger_compensation(workflow_id: str, execution_id: str):
         await handle.terminate(reason="Manual compensation triggered")
         return {"status": "compensating", "execution_id": execution_id}
     except Exception as e:
+        temporal_client_manager.report_failure(e)
         raise HTTPException(500, f"Failed to compensate: {str(e)}")
 
 @router.put("/{workflow_id}")
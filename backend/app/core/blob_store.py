@@ -0,0 +1,215 @@
+#core/blob_store.py
+"""Content-addressed store for large node outputs, referenced from workflow state by digest"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+from uuid import uuid4
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.database import engine
+from app.models.blob import Blob
+
+# A reference is a plain string so it fits any str/Any field of the node output schemas
+BLOB_REF_PREFIX = "blob:sha256:"
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX) and bool(_DIGEST.fullmatch(value, len(BLOB_REF_PREFIX)))
+
+
+def ref_digest(ref: str) -> str:
+    return ref[len(BLOB_REF_PREFIX):]
+
+
+def encode_value(value: Any) -> bytes:
+    """Canonical JSON encoding; equal values always hash to the same digest."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class PostgresBlobBackend:
+    """Blobs as zlib-compressed rows of the blobs table."""
+
+    def __init__(self, bind: Optional[Engine] = None):
+        self._bind = bind or engine
+
+    def put(self, digest: str, data: bytes) -> bool:
+        """Store `data` under `digest`. Returns False when it was already stored."""
+        table = Blob.__table__
+        try:
+            with self._bind.begin() as conn:
+                if conn.execute(select(table.c.digest).where(table.c.digest == digest)).first():
+                    return False
+                conn.execute(insert(table), [{"digest": digest, "size_bytes": len(data), "payload": zlib.compress(data)}])
+        except IntegrityError:
+            return False  # Another worker stored the same content first
+        return True
+
+    def get(self, digest: str) -> Optional[bytes]:
+        table = Blob.__table__
+        with self._bind.connect() as conn:
+            payload = conn.execute(select(table.c.payload).where(table.c.digest == digest)).scalar()
+        return zlib.decompress(payload) if payload is not None else None
+
+
+class FilesystemBlobBackend:
+    """Local stand-in: one zlib-compressed file per digest, fanned out by its first two characters."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.BLOB_STORE_PATH
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, digest: str, data: bytes) -> bool:
+        path = self._path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        tmp_path = f"{path}.{uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data))
+        os.replace(tmp_path, path)
+        return True
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+
+def _default_backend():
+    if settings.BLOB_STORE_BACKEND == "filesystem":
+        return FilesystemBlobBackend()
+    return PostgresBlobBackend()
+
+
+class BlobStore:
+    """
+    Keeps large node outputs out of Temporal payloads.
+
+    Activities call `offload` on their result: any top-level value whose JSON
+    encoding exceeds the inline threshold is stored once, by content hash, and
+    replaced with a "blob:sha256:<hex>" reference. Workflow state, history and
+    the contexts sent to later activities then only carry references. Activities
+    call `resolve` on just the values they read, so other references are never fetched.
+    """
+
+    def __init__(self, backend=None, threshold_bytes: Optional[int] = None, cache_size: Optional[int] = None):
+        self.backend = backend or _default_backend()
+        self.threshold = threshold_bytes or settings.BLOB_INLINE_THRESHOLD_BYTES
+        self.cache_size = cache_size or settings.BLOB_CACHE_SIZE
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self.metrics: Dict[str, Any] = {
+            "blobs_written": 0,
+            "blobs_deduplicated": 0,
+            "bytes_offloaded": 0,
+            "blobs_resolved": 0,
+            "cache_hits": 0,
+        }
+
+    def _remember(self, digest: str, value: Any) -> None:
+        self._cache[digest] = value
+        self._cache.move_to_end(digest)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def put(self, value: Any, data: Optional[bytes] = None) -> str:
+        """Store a value and return its reference."""
+        data = data if data is not None else encode_value(value)
+        digest = hashlib.sha256(data).hexdigest()
+        if await asyncio.to_thread(self.backend.put, digest, data):
+            self.metrics["blobs_written"] += 1
+            self.metrics["bytes_offloaded"] += len(data)
+        else:
+            self.metrics["blobs_deduplicated"] += 1
+        self._remember(digest, value)
+        return BLOB_REF_PREFIX + digest
+
+    async def get(self, ref: str) -> Any:
+        """Load the value behind a reference."""
+        if not is_blob_ref(ref):
+            raise LookupError(f"Not a blob reference: {ref[:80]}")
+        digest = ref_digest(ref)
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            self.metrics["cache_hits"] += 1
+            return self._cache[digest]
+        data = await asyncio.to_thread(self.backend.get, digest)
+        if data is None:
+            raise LookupError(f"Blob {digest} not found")
+        value = json.loads(data)
+        self.metrics["blobs_resolved"] += 1
+        self._remember(digest, value)
+        return value
+
+    async def offload(self, result: Any) -> Any:
+        """Replace the oversized parts of an activity result with references."""
+        if result is None or is_blob_ref(result):
+            return result
+        data = encode_value(result)
+        if len(data) <= self.threshold:
+            return result
+        if not isinstance(result, dict):
+            return await self.put(result, data)
+
+        # Keep the small fields (status, model, cost...) inline so the workflow can still branch on them
+        offloaded = {}
+        for key, value in result.items():
+            value_data = encode_value(value)
+            offloaded[key] = await self.put(value, value_data) if len(value_data) > self.threshold else value
+        return offloaded
+
+    async def resolve(self, value: Any) -> Any:
+        """Return `value` with every reference inside it replaced by the stored content."""
+        refs: Set[str] = set()
+        _collect_refs(value, refs)
+        if not refs:
+            return value
+        ordered = list(refs)
+        loaded = await asyncio.gather(*(self.get(ref) for ref in ordered))
+        return _substitute(value, dict(zip(ordered, loaded)))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, "threshold_bytes": self.threshold, "cached": len(self._cache)}
+
+
+def has_blob_refs(value: Any) -> bool:
+    """True when `value` holds a blob reference anywhere inside it."""
+    refs: Set[str] = set()
+    _collect_refs(value, refs)
+    return bool(refs)
+
+
+def _collect_refs(value: Any, refs: Set[str]) -> None:
+    if is_blob_ref(value):
+        refs.add(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_refs(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_refs(item, refs)
+
+
+def _substitute(value: Any, loaded: Dict[str, Any]) -> Any:
+    if is_blob_ref(value):
+        return loaded[value]
+    if isinstance(value, dict):
+        return {key: _substitute(item, loaded) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute(item, loaded) for item in value]
+    return value
+
+
+blob_store = BlobStore()
@@ -0,0 +1,172 @@
+#core/codec.py
+"""Event payload codecs, the versioned event envelope and lazily decoded events"""
+import dataclasses
+import datetime
+import enum
+import json
+import re
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Union
+from app.core.config import settings
+
+try:  # Optional: faster JSON
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:  # Optional: compact binary encoding for the Postgres archive
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+# Bumped whenever the pub/sub or stream envelope layout changes; readers accept older versions
+ENVELOPE_VERSION = 1
+
+
+def _default(obj: Any) -> Any:
+    """
+    Fallback for values JSON has no type for, shared by every codec so they encode alike.
+    Matches what orjson does natively where it has a native encoding.
+    """
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def _json_key(key: Any) -> str:
+    """A non-str dict key as stdlib json writes it (1 -> "1", None -> "null", True -> "true")."""
+    if isinstance(key, (bool, int, float)) or key is None:
+        return json.dumps(key)
+    return str(_default(key))
+
+
+def _with_json_keys(obj: Any) -> Any:
+    """Copy of `obj` with every dict key a str, the way it would come back from JSON."""
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else _json_key(key): _with_json_keys(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_with_json_keys(value) for value in obj]
+    return obj
+
+
+class JsonCodec:
+    """stdlib json - always available."""
+    name = "json"
+    binary = False
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, default=_default)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson - same JSON text on the wire, several times faster to encode and decode."""
+    name = "orjson"
+    binary = False
+
+    def dumps(self, obj: Any) -> str:
+        # Non-str keys are written the way stdlib json writes them instead of raising
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    """msgpack - compact binary; only used where bytes are stored (the event archive)."""
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, obj: Any) -> bytes:
+        # msgpack keeps int/None keys as they are; stringify them so a round trip matches JSON's
+        return msgpack.packb(_with_json_keys(obj), default=_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+CODECS: Dict[str, Any] = {"json": JsonCodec()}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+
+def get_codec(name: str, binary_ok: bool = False):
+    """Look up a codec by name, falling back to stdlib json when it is unavailable or unsuitable."""
+    codec = CODECS.get(name)
+    if codec is None:
+        print(f"⚠️ Event codec '{name}' is not installed, using json")
+        return CODECS["json"]
+    if codec.binary and not binary_ok:
+        print(f"⚠️ Event codec '{name}' is binary and cannot be used for Redis text payloads, using json")
+        return CODECS["json"]
+    return codec
+
+
+# Redis messages and stream fields are text (the client decodes responses), so only JSON codecs fit there
+text_codec = get_codec(settings.EVENT_CODEC)
+archive_codec = get_codec(settings.EVENT_ARCHIVE_CODEC, binary_ok=True)
+
+# The stream ID the publish script appends as the last envelope field
+_TRAILING_ID = re.compile(r'\d+-\d+')
+_ID_MARKER = ', "id": "'
+
+
+class LazyEvent(Mapping):
+    """
+    A pub/sub event kept as the raw envelope text it arrived as.
+
+    It behaves like the decoded dict (event_type, data, timestamp, id), but the
+    text is only parsed on first access. Fan-out paths forward `raw` untouched,
+    and `id` is read from the tail of the text without decoding.
+    """
+    __slots__ = ("raw", "channel", "_decoded")
+
+    def __init__(self, raw: str, channel: str = ""):
+        self.raw = raw
+        self.channel = channel
+        self._decoded: Optional[Dict[str, Any]] = None
+
+    @property
+    def decoded(self) -> Dict[str, Any]:
+        if self._decoded is None:
+            decoded = text_codec.loads(self.raw)
+            # v0 publishers sent "data" as a nested JSON string
+            if isinstance(decoded.get("data"), str):
+                decoded["data"] = text_codec.loads(decoded["data"])
+            self._decoded = decoded
+        return self._decoded
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._decoded is not None
+
+    @property
+    def id(self) -> Optional[str]:
+        if self._decoded is not None:
+            return self._decoded.get("id")
+        start = self.raw.rfind(_ID_MARKER)
+        if start == -1 or not self.raw.endswith('"}'):
+            return None
+        candidate = self.raw[start + len(_ID_MARKER):-2]
+        # An "id" inside the payload is never followed directly by the closing brace
+        return candidate if _TRAILING_ID.fullmatch(candidate) else None
+
+    def __getitem__(self, key: str) -> Any:
+        return self.decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.decoded)
+
+    def __len__(self) -> int:
+        return len(self.decoded)
+
+    def __repr__(self) -> str:
+        return f"LazyEvent(channel={self.channel!r}, decoded={self.is_decoded})"
@@ -43,6 +43,80 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str
 
+    # Event chronicle writer (batched inserts into event_logs)
+    EVENT_LOG_BATCH_SIZE: int = 500  # Flush after this many events...
+    EVENT_LOG_FLUSH_INTERVAL_MS: int = 200  # ...or this long after the first queued event
+    EVENT_LOG_QUEUE_SIZE: int = 10000  # Publishers wait when this many events are pending
+
+    # Event bus dispatch (listener callbacks run concurrently across executions)
+    EVENT_DISPATCH_MAX_IN_FLIGHT: int = 1000  # The listen loop waits when this many messages are pending
+
+    # Consumer-group mode: projection listeners read a shared stream, split across API instances
+    EVENT_CONSUMER_GROUP_ENABLED: bool = False
+    EVENT_CONSUMER_GROUP: str = "lyzr-projections"
+    EVENT_CONSUMER_NAME: str | None = None  # Defaults to <hostname>-<pid>
+    EVENT_CONSUMER_CLAIM_IDLE_MS: int = 30000  # Reclaim entries another instance left pending this long
+    EVENT_PROJECTION_STREAM_MAXLEN: int = 100000
+
+    # Event payload codecs: "json" (stdlib) or "orjson" for Redis; "json" or "msgpack" for the archive.
+    # Unavailable codecs fall back to json.
+    EVENT_CODEC: str = "json"
+    EVENT_ARCHIVE_CODEC: str = "json"
+
+    # Tiered event storage: Redis keeps a time-bounded hot window, older execution
+    # events are compacted into compressed Postgres blocks (event_archive_blocks)
+    EVENT_HOT_WINDOW_SECONDS: int = 3600  # Execution stream entries older than this are trimmed (MINID ~)
+    EVENT_WORKFLOW_STREAM_MAXLEN: int = 10000  # Workflow streams are not archived; they keep their latest entries
+    EVENT_ARCHIVE_AFTER_SECONDS: int = 300  # Archive a stream once it has been quiet this long
+    EVENT_ARCHIVE_BLOCK_SIZE: int = 1000  # Max entries per compressed block
+    EVENT_ARCHIVE_INTERVAL_SECONDS: int = 60
+
+    # Blob store for large node outputs: workflow state keeps a "blob:sha256:<hex>" reference instead
+    BLOB_STORE_BACKEND: str = "postgres"  # "postgres" (blobs table) or "filesystem"
+    BLOB_STORE_PATH: str = "/tmp/lyzr-blobs"  # Root directory for the filesystem backend
+    BLOB_INLINE_THRESHOLD_BYTES: int = 16384  # Output values larger than this (JSON-encoded) are offloaded
+    BLOB_CACHE_SIZE: int = 128  # Resolved blobs kept in memory per worker
+
+    # Shared HTTP client (API call nodes, compensation callbacks, notifications): one keep-alive pool per process
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST: int = 20  # Requests beyond this wait for a slot on that host
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CLIENT_TIMEOUT_SECONDS: float = 60.0  # Default read/write/pool timeout; callers can pass their own
+    HTTP_CLIENT_HTTP2: bool = False  # Needs the optional h2 package
+
+    # API call node responses: bodies are streamed in, capped, and kept inline only when small
+    API_RESPONSE_MAX_BYTES: int = 50 * 1024 * 1024  # Larger responses fail the node; per node: max_response_bytes
+    API_RESPONSE_INLINE_BYTES: int = 16384  # Larger bodies go to the blob store as a reference; per node: max_inline_bytes
+    API_RESPONSE_HEADERS: List[str] = [  # Response headers kept in the node output; per node: response_headers
+        "content-type", "content-length", "etag", "last-modified", "cache-control", "location", "retry-after",
+    ]
+
+    # Response cache for API call nodes with "cache": true (keys are request hashes, LRU-bounded)
+    HTTP_CACHE_BACKEND: str = "redis"  # "redis" (shared by all workers) or "local" (per process)
+    HTTP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    HTTP_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024  # Larger responses are not cached
+    HTTP_CACHE_STALE_RETENTION_SECONDS: int = 86400  # Stale entries with an ETag/Last-Modified kept for revalidation
+
+    # Exact-match response cache for agent nodes with "cache": true (keys hash the full provider request)
+    LLM_CACHE_BACKEND: str = "redis"  # "redis" (shared by all workers) or "local" (per process)
+    LLM_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    LLM_CACHE_MAX_ENTRY_BYTES: int = 256 * 1024  # Larger responses are not cached
+    LLM_CACHE_TTL_SECONDS: int = 86400  # Per node: cache_ttl_seconds
+
+    # Single-flight for agent nodes with "coalesce" (or "cache"): identical concurrent requests share one call
+    LLM_SINGLE_FLIGHT_REDIS: bool = False  # Also coordinate across workers through Redis
+    LLM_SINGLE_FLIGHT_LOCK_TTL_SECONDS: float = 300.0  # A crashed holder's lock expires after this
+    LLM_SINGLE_FLIGHT_POLL_INTERVAL_SECONDS: float = 0.05  # How often other workers check for the outcome
+
+    # WebSocket fan-out
+    WS_SEND_QUEUE_SIZE: int = 256  # Per-client outbound queue; overflow sends a "resync" instead
+    WS_MAX_RESYNCS: int = 3  # Evict a client after this many overflows
+
+    # Workers publish their HTTP pool metrics to Redis this often, for /metrics/http-client
+    WORKER_METRICS_INTERVAL_SECONDS: float = 15.0
+
     # Temporal Cloud
     TEMPORAL_HOST: str  # Format: <region>.<cloud_provider>.api.temporal.io:7233
     TEMPORAL_NAMESPACE: str  # Format: <namespace>.<account_id>
@@ -52,6 +126,17 @@ class Settings(BaseSettings):
     TEMPORAL_TLS_CERT: str | None = None  # Path to client cert
     TEMPORAL_TLS_KEY: str | None = None   # Path to client key
 
+    # Payload compression (workflow/activity inputs and results in history). Decoding of
+    # compressed payloads is always on, so this can be switched off again safely.
+    TEMPORAL_PAYLOAD_COMPRESSION: bool = False
+    TEMPORAL_PAYLOAD_COMPRESSION_THRESHOLD_BYTES: int = 4096  # Smaller payloads are sent as-is
+    TEMPORAL_PAYLOAD_COMPRESSION_LEVEL: int = 6  # zlib level
+
+    # Continue-as-new: a run checkpoints and restarts with compact state once its history passes either limit
+    # (Temporal's hard limits are 51,200 events / 50 MB). Limits are fixed per execution when it starts.
+    WORKFLOW_MAX_HISTORY_LENGTH: int = 10000
+    WORKFLOW_MAX_HISTORY_BYTES: int = 20 * 1024 * 1024
+
     # APIs
     OPENAI_API_KEY: str
     LYZR_API_KEY: str | None = None
@@ -0,0 +1,114 @@
+#core/dispatcher.py
+"""Keyed event dispatcher - concurrent across keys, ordered within a key"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cumulative counts like Prometheus)."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, latency_ms: float, failed: bool = False) -> None:
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        if failed:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip([*map(str, LATENCY_BUCKETS_MS), "+Inf"], self.buckets):
+            running += bucket_count
+            cumulative[bound] = running
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "buckets_ms": cumulative,
+        }
+
+
+class KeyedDispatcher:
+    """
+    Runs listener callbacks off the Redis listen loop.
+
+    Messages that share a key (an execution ID) are handled strictly in arrival
+    order by one short-lived per-key task; different keys run concurrently.
+    At most `max_in_flight` messages are queued or running at once - `submit`
+    waits beyond that, which pushes back on the listen loop.
+    A failing callback is logged and recorded; it never affects other callbacks.
+    """
+
+    def __init__(self, max_in_flight: int = 1000):
+        self.max_in_flight = max_in_flight
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.in_flight = 0
+
+    async def submit(self, key: str, callbacks: List[Callable[[Any], Awaitable[Any]]], message: Any) -> None:
+        """Queue `message` for `callbacks` behind earlier messages with the same key."""
+        await self._slots.acquire()
+        self.in_flight += 1
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[key] = queue
+        queue.put_nowait((callbacks, message))
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key, queue))
+
+    async def _drain(self, key: str, queue: asyncio.Queue) -> None:
+        try:
+            while not queue.empty():
+                callbacks, message = queue.get_nowait()
+                try:
+                    await asyncio.gather(*[self._invoke(callback, message) for callback in callbacks])
+                finally:
+                    self.in_flight -= 1
+                    self._slots.release()
+        finally:
+            # Nothing is awaited between the empty() check and here, so no message can be stranded
+            self._queues.pop(key, None)
+            self._workers.pop(key, None)
+
+    async def _invoke(self, callback: Callable[[Any], Awaitable[Any]], message: Any) -> None:
+        name = getattr(callback, "__qualname__", repr(callback))
+        start = time.perf_counter()
+        failed = False
+        try:
+            await callback(message)
+        except Exception as e:
+            failed = True
+            print(f"❌ Listener {name} failed: {e}")
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.histograms.setdefault(name, LatencyHistogram()).observe(latency_ms, failed)
+
+    async def drain(self) -> None:
+        """Wait for every queued message to be handled."""
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "active_keys": len(self._workers),
+            "listeners": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
@@ -0,0 +1,273 @@
+#core/event_archive.py
+"""Cold tier for execution events - compressed Postgres blocks behind the Redis hot window"""
+import asyncio
+import json
+import time
+import zlib
+from typing import Any, AsyncIterator, Collection, Dict, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from app.core.codec import archive_codec, get_codec, text_codec
+from app.core.config import settings
+from app.core.database import engine
+from app.core.events import ARCHIVE_INDEX_KEY, EventBus, event_bus, parse_stream_id
+from app.models.event_log import EventArchiveBlock
+
+# Hash of execution ID -> last archived stream ID
+ARCHIVE_CURSOR_KEY = "events:archive:cursor"
+# Only one instance compacts at a time
+ARCHIVE_LOCK_KEY = "events:archive:lock"
+
+StreamId = Tuple[int, int]
+
+
+def encode_block(entries: List[Tuple[str, Dict[str, str]]], codec=None) -> Tuple[bytes, str]:
+    """
+    Stream entries -> compressed rows. Returns the payload and its codec label.
+    JSON blocks keep each payload as its original JSON text; binary codecs store the decoded
+    payload so it is encoded compactly rather than as an opaque string.
+    """
+    codec = codec or archive_codec
+    if codec.binary:
+        rows = [[entry_id, f.get("event_type"), text_codec.loads(f.get("data") or "{}"), f.get("timestamp")] for entry_id, f in entries]
+        encoded = codec.dumps(rows)
+    else:
+        rows = [[entry_id, f.get("event_type"), f.get("data"), f.get("timestamp")] for entry_id, f in entries]
+        encoded = codec.dumps(rows).encode("utf-8")
+    return zlib.compress(encoded), f"zlib-{codec.name}-v1"
+
+
+def decode_block(payload: bytes, codec_label: str = "zlib-json-v1") -> List[Tuple[str, Dict[str, Any]]]:
+    """Inverse of encode_block; "data" is JSON text for JSON blocks and already decoded for binary ones."""
+    _, codec_name, _ = codec_label.split("-")
+    rows = get_codec(codec_name, binary_ok=True).loads(zlib.decompress(payload))
+    return [(entry_id, {"event_type": event_type, "data": data, "timestamp": timestamp})
+            for entry_id, event_type, data, timestamp in rows]
+
+
+def format_stream_id(stream_id: StreamId) -> str:
+    return f"{stream_id[0]}-{stream_id[1]}"
+
+
+class EventArchive:
+    """
+    Moves execution stream entries from Redis into compressed Postgres blocks and
+    reads both tiers as one stream.
+
+    The Redis stream trims entries older than EVENT_HOT_WINDOW_SECONDS (MINID ~ on
+    every XADD). The archiver must copy them out first. It archives a stream once
+    the stream has been quiet for EVENT_ARCHIVE_AFTER_SECONDS. For a still-active
+    stream, it archives whatever is older than half the hot window. Once the
+    whole window has passed, it deletes the fully archived stream.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[EventBus] = None,
+        bind: Optional[Engine] = None,
+        block_size: Optional[int] = None,
+        archive_after_seconds: Optional[int] = None,
+        hot_window_seconds: Optional[int] = None,
+    ):
+        self.bus = bus or event_bus
+        self._bind = bind or engine
+        self.block_size = block_size or settings.EVENT_ARCHIVE_BLOCK_SIZE
+        self.archive_after = archive_after_seconds or settings.EVENT_ARCHIVE_AFTER_SECONDS
+        self.hot_window = hot_window_seconds or settings.EVENT_HOT_WINDOW_SECONDS
+        self.metrics: Dict[str, Any] = {
+            "passes": 0,
+            "events_archived": 0,
+            "blocks_written": 0,
+            "bytes_written": 0,
+            "streams_deleted": 0,
+            "archive_failures": 0,
+            "cold_reads": 0,
+        }
+
+    @property
+    def redis(self):
+        return self.bus.redis_client
+
+    # ---- compaction -------------------------------------------------------
+
+    async def run(self, interval_seconds: Optional[int] = None) -> None:
+        interval = interval_seconds or settings.EVENT_ARCHIVE_INTERVAL_SECONDS
+        print(f"🧊 Event archiver started (hot window {self.hot_window}s, every {interval}s)")
+        while True:
+            try:
+                # Lock expires on its own, so a crashed instance never blocks the others
+                if await self.redis.set(ARCHIVE_LOCK_KEY, str(uuid4()), nx=True, px=interval * 1000):
+                    await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["archive_failures"] += 1
+                print(f"⚠️ Event archive pass failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def archive_once(self, now: Optional[float] = None) -> int:
+        """One compaction pass over every execution stream with recorded activity."""
+        now = now or time.time()
+        archived = 0
+        for execution_id, last_activity in await self.redis.zrange(ARCHIVE_INDEX_KEY, 0, -1, withscores=True):
+            archived += await self.archive_execution(execution_id, last_activity, now)
+        self.metrics["passes"] += 1
+        return archived
+
+    async def archive_execution(self, execution_id: str, last_activity: float, now: float) -> int:
+        stream_key = f"execution:{execution_id}:events"
+        cursor = await self.redis.hget(ARCHIVE_CURSOR_KEY, execution_id)
+        if cursor is None:
+            upto = await asyncio.to_thread(self._archived_upto, execution_id)
+            cursor = format_stream_id(upto) if upto else None
+
+        quiet = now - last_activity >= self.archive_after
+        # Active streams only give up entries that are getting close to the trim point
+        upper = "+" if quiet else str(int((now - self.hot_window / 2) * 1000))
+
+        archived = 0
+        while True:
+            entries = await self.redis.xrange(stream_key, min=f"({cursor}" if cursor else "-", max=upper, count=self.block_size)
+            if not entries:
+                break
+            await asyncio.to_thread(self._write_block, execution_id, entries)
+            cursor = entries[-1][0]
+            await self.redis.hset(ARCHIVE_CURSOR_KEY, execution_id, cursor)
+            archived += len(entries)
+            if len(entries) < self.block_size:
+                break
+
+        if quiet and now - last_activity >= self.hot_window and \
+                await self.redis.zscore(ARCHIVE_INDEX_KEY, execution_id) == last_activity:
+            # Everything is archived and out of the hot window (and no event arrived meanwhile);
+            # nothing else would trim this stream
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(stream_key)
+                pipe.zrem(ARCHIVE_INDEX_KEY, execution_id)
+                pipe.hdel(ARCHIVE_CURSOR_KEY, execution_id)
+                await pipe.execute()
+            self.metrics["streams_deleted"] += 1
+
+        self.metrics["events_archived"] += archived
+        return archived
+
+    def _write_block(self, execution_id: str, entries: List[Tuple[str, Dict[str, str]]]) -> None:
+        try:
+            workflow_id = json.loads(entries[0][1].get("data") or "{}").get("workflow_id", "")
+        except json.JSONDecodeError:
+            workflow_id = ""
+        payload, codec_label = encode_block(entries)
+        first_id, last_id = entries[0][0], entries[-1][0]
+        with self._bind.begin() as conn:
+            conn.execute(insert(EventArchiveBlock.__table__), [{
+                "id": str(uuid4()),
+                "execution_id": execution_id,
+                "workflow_id": workflow_id,
+                "first_event_id": first_id,
+                "last_event_id": last_id,
+                "first_ms": parse_stream_id(first_id)[0],
+                "last_ms": parse_stream_id(last_id)[0],
+                "event_count": len(entries),
+                "codec": codec_label,
+                "payload": payload,
+            }])
+        self.metrics["blocks_written"] += 1
+        self.metrics["bytes_written"] += len(payload)
+
+    # ---- tiered reads -----------------------------------------------------
+
+    def _archived_upto(self, execution_id: str) -> Optional[StreamId]:
+        table = EventArchiveBlock.__table__
+        with self._bind.connect() as conn:
+            last_ids = conn.execute(
+                select(table.c.last_event_id)
+                .where(table.c.execution_id == execution_id)
+                .order_by(table.c.last_ms.desc())
+                .limit(8)  # Same-millisecond ties are resolved below
+            ).scalars().all()
+        return max((parse_stream_id(i) for i in last_ids), default=None)
+
+    def _read_archived(
+        self,
+        execution_id: str,
+        after: Optional[StreamId],
+        start: Optional[StreamId],
+        limit: int,
+        event_types: Optional[Collection[str]],
+    ) -> Tuple[List[Dict[str, Any]], Optional[StreamId]]:
+        table = EventArchiveBlock.__table__
+        lower_ms = max((after or (0, 0))[0], (start or (0, 0))[0])
+        events: List[Dict[str, Any]] = []
+        with self._bind.connect() as conn:
+            blocks = conn.execute(
+                select(table.c.payload, table.c.codec)
+                .where(table.c.execution_id == execution_id, table.c.last_ms >= lower_ms)
+                .order_by(table.c.first_ms)
+                .execution_options(yield_per=4)
+            )
+            # Blocks are decoded one at a time and reading stops as soon as the page is full
+            for payload, codec_label in blocks:
+                for entry_id, fields in decode_block(payload, codec_label):
+                    stream_id = parse_stream_id(entry_id)
+                    if (after is not None and stream_id <= after) or (start is not None and stream_id < start):
+                        continue
+                    if event_types and fields.get("event_type") not in event_types:
+                        continue
+                    events.append(EventBus._parse_stream_entry(entry_id, fields))
+                    if len(events) == limit:
+                        return events, None
+        return events, self._archived_upto(execution_id)
+
+    async def read_execution_page(
+        self,
+        execution_id: str,
+        cursor: Optional[str] = None,
+        start_id: str = "-",
+        limit: int = 100,
+        event_types: Optional[Collection[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Same contract as EventBus.read_page, over the archive followed by the Redis stream.
+        Stream IDs are preserved across tiers, so cursors work regardless of where a page came from.
+        """
+        after = parse_stream_id(cursor) if cursor else None
+        start = parse_stream_id(start_id) if start_id != "-" else None
+        events, archived_upto = await asyncio.to_thread(
+            self._read_archived, execution_id, after, start, limit, event_types
+        )
+        if events:
+            self.metrics["cold_reads"] += 1
+        if len(events) == limit:
+            return events, events[-1]["id"]
+
+        # Continue in Redis past whatever the archive covered (entries may still exist in both tiers)
+        redis_cursor = cursor
+        if archived_upto is not None and (after is None or archived_upto > after) and (start is None or archived_upto >= start):
+            redis_cursor = format_stream_id(archived_upto)
+        more, next_cursor = await self.bus.read_page(
+            f"execution:{execution_id}:events", redis_cursor, start_id, limit - len(events), event_types
+        )
+        return events + more, next_cursor
+
+    async def iter_execution_events(
+        self,
+        execution_id: str,
+        start_id: str = "-",
+        event_types: Optional[Collection[str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every event of an execution from both tiers, one page in memory at a time."""
+        cursor: Optional[str] = None
+        while True:
+            page, cursor = await self.read_execution_page(execution_id, cursor, start_id, page_size, event_types)
+            for event in page:
+                yield event
+            if cursor is None:
+                return
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, "hot_window_seconds": self.hot_window, "block_size": self.block_size}
+
+
+event_archive = EventArchive()
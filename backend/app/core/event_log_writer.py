@@ -0,0 +1,167 @@
+#core/event_log_writer.py
+"""Background writer that batches event chronicle rows into multi-row Postgres inserts"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.database import engine
+from app.models.event_log import EventLog
+
+
+class EventLogWriter:
+    """
+    Buffers EventLog rows in a bounded queue and writes them in batches.
+
+    A batch is flushed when it reaches `batch_size` rows or `flush_interval_ms`
+    after its first row, whichever comes first. When the queue is full,
+    `enqueue` waits (backpressure) instead of dropping events.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        bind: Optional[Engine] = None,
+    ):
+        self.batch_size = batch_size or settings.EVENT_LOG_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.EVENT_LOG_FLUSH_INTERVAL_MS) / 1000
+        self.max_queue_size = max_queue_size or settings.EVENT_LOG_QUEUE_SIZE
+        self._bind = bind or engine
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None  # Flush in progress, shielded from stop()
+        self._pending: List[Dict[str, Any]] = []  # Batch being assembled by the writer task
+        self.metrics: Dict[str, Any] = {
+            "events_enqueued": 0,
+            "events_written": 0,
+            "events_dropped": 0,
+            "batches_flushed": 0,
+            "flush_failures": 0,
+            "backpressure_waits": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the writer task on the running loop (no-op if already running)."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._pending = []
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, event_type: str, data: Dict[str, Any], timestamp: float) -> None:
+        """Queue one event for persistence, waiting if the queue is full."""
+        self.start()
+        assert self._queue is not None
+        row = {
+            "id": str(uuid4()),
+            "workflow_id": data.get("workflow_id", ""),
+            "execution_id": data.get("execution_id", ""),
+            "node_id": data.get("node_id"),
+            "event_type": event_type,
+            "event_data": data,
+            "timestamp": datetime.fromtimestamp(timestamp),
+        }
+        if self._queue.full():
+            self.metrics["backpressure_waits"] += 1
+        await self._queue.put(row)
+        self.metrics["events_enqueued"] += 1
+
+    async def stop(self) -> None:
+        """Stop the writer task and flush everything still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight is not None and not self._inflight.done():
+            await self._inflight
+
+        remaining = self._pending
+        self._pending = []
+        while self._queue is not None and not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+        print(f"✅ Event log writer drained ({len(remaining)} events flushed on shutdown)")
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending.append(await self._queue.get())
+            deadline = loop.time() + self.flush_interval
+
+            while len(self._pending) < self.batch_size:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Hand the batch over before awaiting so a shutdown drain never writes it twice
+            batch, self._pending = self._pending, []
+            # Shielded so a stop() during the insert waits for it instead of losing the batch
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._insert_batch, batch)
+        except Exception as e:
+            self.metrics["flush_failures"] += 1
+            self.metrics["events_dropped"] += len(batch)
+            print(f"⚠️ Failed to persist {len(batch)} events to DB: {e}")
+            return
+
+        flush_ms = (time.perf_counter() - start) * 1000
+        self.metrics["events_written"] += len(batch)
+        self.metrics["batches_flushed"] += 1
+        self.metrics["last_batch_size"] = len(batch)
+        self.metrics["last_flush_ms"] = round(flush_ms, 2)
+        self.metrics["max_flush_ms"] = round(max(self.metrics["max_flush_ms"], flush_ms), 2)
+        self.metrics["total_flush_ms"] += flush_ms
+
+    def _insert_batch(self, batch: List[Dict[str, Any]]) -> None:
+        # executemany on a single INSERT; SQLAlchemy sends it as multi-row VALUES batches
+        with self._bind.begin() as conn:
+            conn.execute(insert(EventLog.__table__), batch)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        batches = self.metrics["batches_flushed"]
+        return {
+            **{k: v for k, v in self.metrics.items() if k != "total_flush_ms"},
+            "running": self.is_running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "avg_batch_size": round(self.metrics["events_written"] / batches, 2) if batches else 0,
+            "avg_flush_ms": round(self.metrics["total_flush_ms"] / batches, 2) if batches else 0.0,
+        }
+
+
+event_log_writer = EventLogWriter()
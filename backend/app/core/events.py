@@ -3,12 +3,45 @@ import redis.asyncio as redis
 import json
 import asyncio
 import time
-from typing import Callable, Dict, Any, List, Optional, Union, cast
-from datetime import datetime
-from uuid import uuid4
+from typing import AsyncIterator, Callable, Collection, Dict, Any, List, Optional, Tuple, Union, cast
 from app.core.config import settings
-from app.core.database import SessionLocal
-from app.models.event_log import EventLog
+from app.core.event_log_writer import event_log_writer
+from app.core.dispatcher import KeyedDispatcher
+from app.core.stream_consumer import PROJECTION_STREAM, StreamConsumer
+from app.core.codec import ENVELOPE_VERSION, LazyEvent, text_codec
+
+# Appends one event to each entity stream in KEYS and publishes it on that entity's
+# channel with the new stream ID spliced in, so live messages carry the same ID that
+# XRANGE returns and reconnecting clients can resume without gaps or duplicates.
+# ARGV: event_type, data, timestamp, pub/sub message, envelope version, then
+# (channel, trim strategy, threshold) per key. Execution streams trim entries older than
+# the hot window (MINID), which the archiver moves to Postgres first; workflow streams are
+# not archived and keep their latest entries (MAXLEN).
+PUBLISH_TO_STREAMS_SCRIPT = """
+local envelope = string.sub(ARGV[4], 1, -2)
+for i, key in ipairs(KEYS) do
+    local id = redis.call('XADD', key, ARGV[4 + 3 * i], '~', ARGV[5 + 3 * i], '*',
+        'v', ARGV[5], 'event_type', ARGV[1], 'data', ARGV[2], 'timestamp', ARGV[3])
+    redis.call('PUBLISH', ARGV[3 + 3 * i], envelope .. ', "id": "' .. id .. '"}')
+end
+return #KEYS
+"""
+
+
+# Sorted set of execution IDs scored by their latest event timestamp
+ARCHIVE_INDEX_KEY = "events:archive:executions"
+
+
+def parse_stream_id(stream_id: str) -> Tuple[int, int]:
+    """Redis stream IDs ("<ms>-<seq>") as a comparable tuple."""
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def entity_channel(channel: str) -> str:
+    """Pub/sub channel carrying every event of one entity, e.g. "execution:<id>" -> "events:execution:<id>"."""
+    return f"events:{channel}"
+
 
 class EventBus:
     def __init__(self):
@@ -17,79 +50,164 @@ class EventBus:
         )
         self.pubsub = self.redis_client.pubsub()
         self.listeners: Dict[str, List[Callable]] = {}
+        self._has_subscriptions = asyncio.Event()
+        self.dispatcher = KeyedDispatcher(settings.EVENT_DISPATCH_MAX_IN_FLIGHT)
+        self.stream_consumer: Optional[StreamConsumer] = None
+        if settings.EVENT_CONSUMER_GROUP_ENABLED:
+            self.stream_consumer = StreamConsumer(
+                self.redis_client,
+                group=settings.EVENT_CONSUMER_GROUP,
+                consumer=settings.EVENT_CONSUMER_NAME,
+                claim_idle_ms=settings.EVENT_CONSUMER_CLAIM_IDLE_MS,
+            )
 
-    async def publish(self, event_type: str, data: Dict[str, Any]):
-        timestamp = time.time()
-        # Ensure data is a JSON string
-        data_str = json.dumps(data)
+    def _encode_event(self, event_type: str, data: Dict[str, Any], timestamp: float) -> Tuple[Dict[str, str], str]:
+        """Encode the payload once and build both the stream fields and the pub/sub envelope."""
+        data_str = text_codec.dumps(data)
         timestamp_str = str(timestamp)
 
-        # Explicitly type the message for xadd
         # Redis stream fields must be Dict[str | bytes, str | bytes]
         # Our redis client decodes responses, so we should provide strings.
         message_fields: Dict[str, str] = {
+            "v": str(ENVELOPE_VERSION),
             "event_type": event_type,
             "data": data_str,
             "timestamp": timestamp_str,
         }
-        print(f"📤 Publishing event to Redis pub/sub: {event_type}")
-        await self.redis_client.publish(event_type, json.dumps(message_fields)) 
+        # Splice the already-encoded payload into the envelope instead of re-serializing it
+        # (listeners receive "data" as an object rather than a nested JSON string)
+        pubsub_message = (
+            f'{{"v": {ENVELOPE_VERSION}, "event_type": {json.dumps(event_type)}, '
+            f'"data": {data_str}, "timestamp": {json.dumps(timestamp_str)}}}'
+        )
+        return message_fields, pubsub_message
+
+    def live_envelope(self, event: Dict[str, Any]) -> str:
+        """The pub/sub text a stored event (as read_page returns it) was delivered with, stream ID included."""
+        _, pubsub_message = self._encode_event(event["event_type"], event["data"], event["timestamp"])
+        # Same tail PUBLISH_TO_STREAMS_SCRIPT appends
+        return f'{pubsub_message[:-1]}, "id": {json.dumps(event["id"])}}}'
+
+    def _queue_event(self, pipe: Any, event_type: str, data: Dict[str, Any], timestamp: float) -> None:
+        """Queue the PUBLISH and stream XADDs for one event on a pipeline."""
+        message_fields, pubsub_message = self._encode_event(event_type, data, timestamp)
+        pipe.publish(event_type, pubsub_message)
+
         workflow_id = data.get("workflow_id")
         execution_id = data.get("execution_id")
-
+        # Per-entity streams + channels: instances only subscribe to the channels a client is watching
+        keys: List[str] = []
+        args: List[Any] = [event_type, message_fields["data"], message_fields["timestamp"], pubsub_message, ENVELOPE_VERSION]
+        min_id = f"{int((timestamp - settings.EVENT_HOT_WINDOW_SECONDS) * 1000)}-0"
         if workflow_id:
-            stream_key = f"workflow:{workflow_id}:events"
-            # Pass the correctly typed dictionary to xadd (cast to Any to satisfy redis-py generics)
-            await self.redis_client.xadd(stream_key, cast(Any, message_fields), maxlen=10000)
-            print(f"📤 Added to workflow stream: {stream_key}")
-
+            keys.append(f"workflow:{workflow_id}:events")
+            args += [entity_channel(f"workflow:{workflow_id}"), "MAXLEN", settings.EVENT_WORKFLOW_STREAM_MAXLEN]
         if execution_id:
-            stream_key = f"execution:{execution_id}:events"
-            # Pass the correctly typed dictionary to xadd (cast to Any to satisfy redis-py generics)
-            await self.redis_client.xadd(stream_key, cast(Any, message_fields), maxlen=5000)
-            print(f"📤 Added to execution stream: {stream_key}")
+            keys.append(f"execution:{execution_id}:events")
+            args += [entity_channel(f"execution:{execution_id}"), "MINID", min_id]
+            # Lets the archiver find streams with activity without scanning keys
+            pipe.zadd(ARCHIVE_INDEX_KEY, {execution_id: timestamp})
+        if keys:
+            # EVAL rather than EVALSHA: no NOSCRIPT handling, and Redis caches the compiled script
+            pipe.eval(PUBLISH_TO_STREAMS_SCRIPT, len(keys), *keys, *args)
+        if settings.EVENT_CONSUMER_GROUP_ENABLED:
+            pipe.xadd(PROJECTION_STREAM, cast(Any, message_fields),
+                      maxlen=settings.EVENT_PROJECTION_STREAM_MAXLEN, approximate=True)
+
+    async def publish(self, event_type: str, data: Dict[str, Any]):
+        timestamp = time.time()
+
+        # One non-transactional round trip for PUBLISH + both stream XADDs
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            self._queue_event(pipe, event_type, data, timestamp)
+            await pipe.execute()
+        print(f"📤 Published event to Redis: {event_type}")
 
-        # Persist original data (not the double-stringified one)
-        await asyncio.to_thread(self._persist_to_db, event_type, data, timestamp)
+        # Persist original data (not the serialized one) through the batched writer
+        await event_log_writer.enqueue(event_type, data, timestamp)
         print(f"✅ Event published successfully: {event_type}")
 
-    def _persist_to_db(self, event_type: str, data: Dict[str, Any], timestamp: float):
-        try:
-            db = SessionLocal()
-            event_log = EventLog(id=str(uuid4()), workflow_id=data.get("workflow_id", ""), execution_id=data.get("execution_id", ""), node_id=data.get("node_id"), event_type=event_type, event_data=data, timestamp=datetime.fromtimestamp(timestamp))
-            db.add(event_log)
-            db.commit()
-            db.close()
-        except Exception as e:
-            print(f"⚠️ Failed to persist event to DB: {e}")
+    async def publish_many(self, events: List[Tuple[str, Dict[str, Any]]]):
+        """Publish a batch of (event_type, data) pairs in one pipelined round trip, preserving order."""
+        if not events:
+            return
+        timestamped = [(event_type, data, time.time()) for event_type, data in events]
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for event_type, data, timestamp in timestamped:
+                self._queue_event(pipe, event_type, data, timestamp)
+            await pipe.execute()
+        print(f"📤 Published {len(events)} events to Redis in one pipeline")
+
+        for event_type, data, timestamp in timestamped:
+            await event_log_writer.enqueue(event_type, data, timestamp)
 
     async def subscribe(self, event_type: str, callback: Callable):
+        """Listen on a pub/sub channel - an event type, or an entity_channel() for interest-based routing."""
         if event_type not in self.listeners:
             self.listeners[event_type] = []
             await self.pubsub.subscribe(event_type)
+            self._has_subscriptions.set()
         self.listeners[event_type].append(callback)
         print(f"📥 Subscribed to: {event_type}")
 
+    async def unsubscribe(self, event_type: str, callback: Callable):
+        """Remove a listener; the Redis subscription is dropped with the last one."""
+        callbacks = self.listeners.get(event_type)
+        if not callbacks or callback not in callbacks:
+            return
+        callbacks.remove(callback)
+        if not callbacks:
+            del self.listeners[event_type]
+            await self.pubsub.unsubscribe(event_type)
+            print(f"📤 Unsubscribed from: {event_type}")
+
+    async def subscribe_projection(self, event_type: str, callback: Callable):
+        """
+        Subscribe a listener that updates shared state (e.g. the DB) and must run once per event.
+        In consumer-group mode it reads the projection stream and each event is handled by
+        one instance; otherwise it is a regular pub/sub listener.
+        """
+        if self.stream_consumer is None:
+            await self.subscribe(event_type, callback)
+            return
+        self.stream_consumer.add_handler(event_type, callback)
+        print(f"📥 Subscribed projection to: {event_type} (group {self.stream_consumer.group})")
+
+    @staticmethod
+    def _dispatch_key(event: LazyEvent) -> str:
+        """Events of one execution share a key so they are handled in publish order."""
+        if event.channel.startswith("events:"):
+            # Entity channels already name the execution/workflow - no need to decode
+            return event.channel[len("events:"):]
+        data = event.get("data")
+        if isinstance(data, dict):
+            key = data.get("execution_id") or data.get("workflow_id")
+            if key:
+                return str(key)
+        return event.get("event_type", "")
+
     async def listen(self):
         """Main event listener loop - processes Redis pub/sub messages"""
         print(f"🎧 Event bus listener starting... Subscribed to: {list(self.listeners.keys())}")
         try:
-            async for message in self.pubsub.listen():
-                print(f"📬 Raw message received: type={message.get('type')}, channel={message.get('channel')}")
-                if message["type"] == "message":
+            while True:
+                # pubsub.listen() returns once nothing is subscribed (e.g. the last watcher left)
+                if not self.pubsub.subscribed:
+                    self._has_subscriptions.clear()
+                    await self._has_subscriptions.wait()
+                    continue
+                async for message in self.pubsub.listen():
+                    if message["type"] != "message":
+                        continue
                     try:
-                        # Message data is the full structure published now
-                        full_data = json.loads(message["data"])
-                        event_type = full_data["event_type"]
-                        print(f"🔔 Event bus received: {event_type} with {len(self.listeners.get(event_type, []))} listeners")
-                        if event_type in self.listeners:
-                            for callback in self.listeners[event_type]:
-                                if asyncio.iscoroutinefunction(callback):
-                                    # Pass the full data structure including timestamp etc.
-                                    print(f"📞 Calling listener callback for {event_type}")
-                                    await callback(full_data)
-                        else:
-                            print(f"⚠️ No listeners registered for event type: {event_type}")
+                        # Route on the channel name; messages are only decoded when someone listens
+                        callbacks = [c for c in self.listeners.get(message["channel"], []) if asyncio.iscoroutinefunction(c)]
+                        if not callbacks:
+                            continue
+                        event = LazyEvent(message["data"], message["channel"])
+                        # Hand off to the dispatcher; waits only when the in-flight cap is reached
+                        await self.dispatcher.submit(self._dispatch_key(event), callbacks, event)
                     except Exception as e:
                         print(f"❌ Event listener error processing message: {e}")
                         import traceback
@@ -100,30 +218,76 @@ class EventBus:
             traceback.print_exc()
             raise
 
+    @staticmethod
+    def _parse_stream_entry(event_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        parsed_data = {}
+        try:
+            if isinstance(data.get("data"), str):
+                parsed_data = text_codec.loads(data.get("data") or "{}")
+            elif isinstance(data.get("data"), dict): # If already a dict (unlikely with decode_responses=True)
+                parsed_data = data.get("data", {})
+        except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
+             parsed_data = {"error": "Failed to parse data field"}
+
+        return {
+             "id": event_id,
+             "timestamp": float(data.get("timestamp", 0)),
+             "event_type": data.get("event_type"),
+             "data": parsed_data # Use the parsed data
+        }
+
+    async def read_stream(self, stream_key: str, start_id: str = "-", end_id: str = "+", count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """XRANGE with parsed entries; unlike replay_from_stream, Redis errors propagate."""
+        events = await self.redis_client.xrange(stream_key, min=start_id, max=end_id, count=count)
+        return [self._parse_stream_entry(event_id, data) for event_id, data in events]
+
+    async def read_page(
+        self,
+        stream_key: str,
+        cursor: Optional[str] = None,
+        start_id: str = "-",
+        limit: int = 100,
+        event_types: Optional[Collection[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Read up to `limit` events after `cursor` (exclusive; `start_id` is used when there is
+        no cursor). Entries are filtered on their event_type field before the payload is decoded.
+        Returns the events and the cursor for the next page, or None once the stream is exhausted.
+        """
+        events: List[Dict[str, Any]] = []
+        scan_size = max(limit, 100)
+        start = f"({cursor}" if cursor else start_id
+        while True:
+            entries = await self.redis_client.xrange(stream_key, min=start, max="+", count=scan_size)
+            for event_id, fields in entries:
+                if event_types and fields.get("event_type") not in event_types:
+                    continue
+                events.append(self._parse_stream_entry(event_id, fields))
+                if len(events) == limit:
+                    return events, event_id
+            if len(entries) < scan_size:
+                return events, None
+            start = f"({entries[-1][0]}"
+
+    async def iter_stream(
+        self,
+        stream_key: str,
+        start_id: str = "-",
+        event_types: Optional[Collection[str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every (matching) event of a stream, holding at most one page in memory."""
+        cursor: Optional[str] = None
+        while True:
+            page, cursor = await self.read_page(stream_key, cursor, start_id, page_size, event_types)
+            for event in page:
+                yield event
+            if cursor is None:
+                return
 
     async def replay_from_stream(self, stream_key: str, start_id: str = "-", end_id: str = "+", count: Optional[int] = None) -> List[Dict[str, Any]]:
-        # ... (implementation as before) ...
         try:
-            events = await self.redis_client.xrange(stream_key, min=start_id, max=end_id, count=count)
-            # Ensure data field is parsed correctly
-            parsed_events = []
-            for event_id, data in events:
-                parsed_data = {}
-                try:
-                    if isinstance(data.get("data"), str):
-                        parsed_data = json.loads(data.get("data", "{}"))
-                    elif isinstance(data.get("data"), dict): # If already a dict (unlikely with decode_responses=True)
-                        parsed_data = data.get("data", {})
-                except json.JSONDecodeError:
-                     parsed_data = {"error": "Failed to parse data field"}
-
-                parsed_events.append({
-                     "id": event_id,
-                     "timestamp": float(data.get("timestamp", 0)),
-                     "event_type": data.get("event_type"),
-                     "data": parsed_data # Use the parsed data
-                })
-            return parsed_events
+            return await self.read_stream(stream_key, start_id, end_id, count)
         except Exception as e:
             print(f"❌ Failed to replay stream {stream_key}: {e}")
             return []
@@ -135,10 +299,14 @@ class EventBus:
         return await self.replay_from_stream(stream_key, start_id=start_id)
 
     async def replay_execution_events(self, execution_id: str, from_timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
-        # ... (implementation as before) ...
-        stream_key = f"execution:{execution_id}:events"
+        """Every event of an execution, including those already moved to the Postgres archive."""
+        from app.core.event_archive import event_archive
         start_id = f"{int(from_timestamp * 1000)}-0" if from_timestamp else "-"
-        return await self.replay_from_stream(stream_key, start_id=start_id)
+        try:
+            return [event async for event in event_archive.iter_execution_events(execution_id, start_id)]
+        except Exception as e:
+            print(f"❌ Failed to replay execution {execution_id}: {e}")
+            return []
 
 
 event_bus = EventBus()
\ No newline at end of file
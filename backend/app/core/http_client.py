@@ -0,0 +1,166 @@
+#core/http_client.py
+"""Process-wide pooled HTTP client - keep-alive connections shared by API nodes, compensation and notifications"""
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from app.core.config import settings
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """
+    Owns one httpx.AsyncClient per process (each worker has its own).
+
+    Connections stay open between calls, so repeated calls to the same host skip
+    DNS, TCP and TLS setup. A per-host limit keeps one slow upstream from holding
+    every connection in the pool. The client is opened on first use, or from the
+    worker/API startup, and closed on shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        max_connections_per_host: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections or settings.HTTP_CLIENT_MAX_CONNECTIONS
+        self.max_keepalive_connections = max_keepalive_connections or settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS
+        self.max_connections_per_host = max_connections_per_host or settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST
+        self.keepalive_expiry = keepalive_expiry if keepalive_expiry is not None else settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS
+        self.connect_timeout = connect_timeout or settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS
+        self.timeout = timeout or settings.HTTP_CLIENT_TIMEOUT_SECONDS
+        self.http2 = settings.HTTP_CLIENT_HTTP2 if http2 is None else http2
+        if self.http2 and not http2_available():
+            print("⚠️  HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            self.http2 = False
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.metrics: Dict[str, Any] = {
+            "requests": 0,
+            "errors": 0,
+            "in_use": 0,  # Requests holding a host slot
+            "peak_in_use": 0,
+            "waiting": 0,  # Requests queued behind their host's limit
+            "peak_waiting": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,  # Requests served over an already open connection
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    def start(self) -> httpx.AsyncClient:
+        """Open the client (idempotent)."""
+        if not self.is_open:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close every pooled connection on shutdown."""
+        client, self._client = self._client, None
+        self._host_slots = {}
+        if client is not None:
+            await client.aclose()
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        parts = urlsplit(str(url))
+        host = f"{parts.scheme}://{parts.netloc}"
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return slot
+
+    @asynccontextmanager
+    async def _host_slot_held(self, url: str) -> AsyncIterator[None]:
+        """Wait for a slot on the URL's host and hold it, with queue/in-use accounting."""
+        slot = self._host_slot(url)
+        self.metrics["requests"] += 1
+        self.metrics["waiting"] += 1
+        self.metrics["peak_waiting"] = max(self.metrics["peak_waiting"], self.metrics["waiting"])
+        try:
+            await slot.acquire()
+        finally:
+            self.metrics["waiting"] -= 1
+        self.metrics["in_use"] += 1
+        self.metrics["peak_in_use"] = max(self.metrics["peak_in_use"], self.metrics["in_use"])
+        try:
+            yield
+        except httpx.HTTPError:
+            self.metrics["errors"] += 1
+            raise
+        finally:
+            self.metrics["in_use"] -= 1
+            slot.release()
+
+    def _traced(self, kwargs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, bool]]:
+        """Request kwargs with a trace hook that records whether a new connection was opened."""
+        state = {"opened": False}
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                state["opened"] = True
+
+        return {**kwargs, "extensions": {**kwargs.get("extensions", {}), "trace": trace}}, state
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request over the shared pool; keyword arguments are passed to httpx."""
+        client = self.start()
+        kwargs, state = self._traced(kwargs)
+        async with self._host_slot_held(url):
+            response = await client.request(method, url, **kwargs)
+        self.metrics["connections_opened" if state["opened"] else "connections_reused"] += 1
+        return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """
+        Like request(), but the body is not read: iterate it with response.aiter_bytes()
+        inside the block. The host slot is held until the block exits.
+        """
+        client = self.start()
+        kwargs, state = self._traced(kwargs)
+        async with self._host_slot_held(url):
+            async with client.stream(method, url, **kwargs) as response:
+                self.metrics["connections_opened" if state["opened"] else "connections_reused"] += 1
+                yield response
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        served = self.metrics["connections_opened"] + self.metrics["connections_reused"]
+        return {
+            **self.metrics,
+            "open": self.is_open,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_connections_per_host": self.max_connections_per_host,
+            "hosts": len(self._host_slots),
+            "reuse_ratio": round(self.metrics["connections_reused"] / served, 3) if served else None,
+        }
+
+
+http_client = HttpClientPool()
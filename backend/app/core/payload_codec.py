@@ -0,0 +1,84 @@
+#core/payload_codec.py
+"""Compressing Temporal payload codec shared by the API client and the worker"""
+import dataclasses
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+import temporalio.converter
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+from app.core.config import settings
+
+# Marks a payload whose data is a zlib-compressed serialized Payload
+COMPRESSED_ENCODING = b"binary/zlib"
+
+
+class CompressionCodec(PayloadCodec):
+    """
+    Compresses payloads larger than `threshold_bytes` (workflow inputs and results,
+    activity arguments and results, signals, queries).
+
+    Decoding only touches payloads tagged with COMPRESSED_ENCODING and passes
+    everything else through. That keeps histories written before compression was
+    enabled readable, and the codec can stay installed with compression switched
+    off, so histories written while it was on stay readable too.
+    """
+
+    def __init__(self, compress: bool = True, threshold_bytes: int = 4096, level: int = 6):
+        self.compress = compress
+        self.threshold = threshold_bytes
+        self.level = level
+        self.metrics: Dict[str, Any] = {
+            "payloads_compressed": 0,
+            "payloads_skipped": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "payloads_decompressed": 0,
+        }
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [self._encode_one(payload) for payload in payloads]
+
+    def _encode_one(self, payload: Payload) -> Payload:
+        if not self.compress or payload.ByteSize() <= self.threshold:
+            self.metrics["payloads_skipped"] += 1
+            return payload
+        raw = payload.SerializeToString()
+        compressed = zlib.compress(raw, self.level)
+        if len(compressed) >= len(raw):  # Already dense (e.g. encrypted or compressed upstream)
+            self.metrics["payloads_skipped"] += 1
+            return payload
+        self.metrics["payloads_compressed"] += 1
+        self.metrics["bytes_in"] += len(raw)
+        self.metrics["bytes_out"] += len(compressed)
+        return Payload(metadata={"encoding": COMPRESSED_ENCODING}, data=compressed)
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        decoded = []
+        for payload in payloads:
+            if payload.metadata.get("encoding") == COMPRESSED_ENCODING:
+                self.metrics["payloads_decompressed"] += 1
+                payload = Payload.FromString(zlib.decompress(payload.data))
+            decoded.append(payload)
+        return decoded
+
+    def get_metrics(self) -> Dict[str, Any]:
+        saved = self.metrics["bytes_in"] - self.metrics["bytes_out"]
+        return {
+            **self.metrics,
+            "enabled": self.compress,
+            "threshold_bytes": self.threshold,
+            "bytes_saved": saved,
+            "ratio": round(self.metrics["bytes_out"] / self.metrics["bytes_in"], 3) if self.metrics["bytes_in"] else None,
+        }
+
+
+payload_codec = CompressionCodec(
+    compress=settings.TEMPORAL_PAYLOAD_COMPRESSION,
+    threshold_bytes=settings.TEMPORAL_PAYLOAD_COMPRESSION_THRESHOLD_BYTES,
+    level=settings.TEMPORAL_PAYLOAD_COMPRESSION_LEVEL,
+)
+
+
+def build_data_converter(codec: Optional[PayloadCodec] = None) -> DataConverter:
+    """Default JSON data converter with the compression codec in front of it."""
+    return dataclasses.replace(temporalio.converter.default(), payload_codec=codec or payload_codec)
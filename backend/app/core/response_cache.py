@@ -0,0 +1,125 @@
+#core/response_cache.py
+"""Size-bounded LRU caches for reusable responses, in Redis (shared by every worker) or in process"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import redis.asyncio as redis
+from app.core.config import settings
+
+# Stores one entry and evicts least-recently-used entries until the namespace fits in max_bytes.
+# KEYS: entry key, LRU sorted set (score = last access), sizes hash, total bytes counter
+# ARGV: value, now, max bytes, ttl seconds
+PUT_SCRIPT = """
+local previous = redis.call('HGET', KEYS[3], KEYS[1])
+if previous then redis.call('DECRBY', KEYS[4], previous) end
+local size = string.len(ARGV[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[2], KEYS[1])
+redis.call('HSET', KEYS[3], KEYS[1], size)
+local total = redis.call('INCRBY', KEYS[4], size)
+local evicted = 0
+while total > tonumber(ARGV[3]) do
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if not oldest or oldest == KEYS[1] then break end
+    local oldest_size = tonumber(redis.call('HGET', KEYS[3], oldest) or '0')
+    redis.call('ZREM', KEYS[2], oldest)
+    redis.call('HDEL', KEYS[3], oldest)
+    redis.call('DEL', oldest)
+    total = redis.call('DECRBY', KEYS[4], oldest_size)
+    evicted = evicted + 1
+end
+return evicted
+"""
+
+
+class LocalLRUCache:
+    """In-process LRU bounded by total value size; for single-worker setups and tests."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (value, expires_at)
+        self._bytes = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> int:
+        """Store `value`; returns how many entries were evicted to make room."""
+        self._remove(key)
+        self._entries[key] = (value, time.time() + ttl_seconds)
+        self._bytes += len(value)
+        evicted = 0
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            evicted += 1
+        return evicted
+
+    async def delete(self, key: str) -> None:
+        self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    async def size(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class RedisLRUCache:
+    """
+    LRU cache in Redis under `namespace`, shared by every worker. Each entry also
+    carries a Redis TTL, so abandoned entries go away without an eviction pass.
+    """
+
+    def __init__(self, namespace: str, max_bytes: int, redis_client=None):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._lru_key = f"{namespace}:lru"
+        self._sizes_key = f"{namespace}:sizes"
+        self._bytes_key = f"{namespace}:bytes"
+        self._put = self.redis.register_script(PUT_SCRIPT)
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.namespace}:entry:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        entry_key = self._entry_key(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(entry_key)
+            pipe.zadd(self._lru_key, {entry_key: time.time()}, xx=True)  # Touch, only if still tracked
+            value, _ = await pipe.execute()
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> int:
+        """Store `value`; returns how many entries were evicted to make room."""
+        return int(await self._put(
+            keys=[self._entry_key(key), self._lru_key, self._sizes_key, self._bytes_key],
+            args=[value, time.time(), self.max_bytes, max(1, int(ttl_seconds))],
+        ))
+
+    async def delete(self, key: str) -> None:
+        # Size accounting is settled when the LRU pass reaches the key
+        await self.redis.delete(self._entry_key(key))
+
+    async def size(self) -> Dict[str, int]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(self._lru_key)
+            pipe.get(self._bytes_key)
+            entries, total = await pipe.execute()
+        return {"entries": int(entries or 0), "bytes": int(total or 0)}
+
+
+def build_cache(namespace: str, backend: str, max_bytes: int):
+    """"redis" (shared across workers) or "local" (per process)."""
+    if backend == "local":
+        return LocalLRUCache(max_bytes)
+    return RedisLRUCache(namespace, max_bytes)
@@ -0,0 +1,172 @@
+#core/single_flight.py
+"""Single-flight execution - identical concurrent calls share one outstanding call, per worker or across workers"""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import uuid4
+import redis.asyncio as redis
+from app.core.config import settings
+
+# Deletes the lock only if this caller still holds it (it may have expired and been taken over)
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Call:
+    """One outstanding call and how many callers are waiting on it."""
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time in this process; callers arriving while it is
+    outstanding wait for it and get the same result or the same exception.
+
+    The call runs in its own task, so a waiter that is cancelled only stops waiting; the
+    call is cancelled when its last waiter goes away. With a Redis client, the one call
+    per key is also coordinated across workers: the worker holding the key's lock makes
+    the call and publishes the outcome, the others poll for it (results must be JSON).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        redis_client=None,
+        lock_ttl_seconds: Optional[float] = None,
+        poll_interval_seconds: Optional[float] = None,
+        result_ttl_seconds: int = 60,
+    ):
+        self.namespace = namespace
+        self.redis = redis_client
+        self.lock_ttl_seconds = lock_ttl_seconds or settings.LLM_SINGLE_FLIGHT_LOCK_TTL_SECONDS
+        self.poll_interval = poll_interval_seconds or settings.LLM_SINGLE_FLIGHT_POLL_INTERVAL_SECONDS
+        self.result_ttl_seconds = result_ttl_seconds
+        self._release = self.redis.register_script(RELEASE_SCRIPT) if self.redis is not None else None
+        self._calls: Dict[str, _Call] = {}
+        self.metrics: Dict[str, int] = {
+            "calls": 0,  # Calls actually made by this worker
+            "coalesced": 0,  # Callers that joined a call already outstanding in this worker
+            "remote_results": 0,  # Calls answered by another worker's call (Redis coordination)
+            "failures": 0,  # Calls that raised; every waiter got the exception
+            "cancelled": 0,  # Calls cancelled because every waiter went away
+            "peak_waiters": 0,
+            "redis_errors": 0,
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared); `shared` is True when another caller's call produced the result."""
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            call = self._calls[key] = _Call(asyncio.ensure_future(self._run_coordinated(key, fn)))
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        else:
+            self.metrics["coalesced"] += 1
+        call.waiters += 1
+        self.metrics["peak_waiters"] = max(self.metrics["peak_waiters"], call.waiters)
+        try:
+            result, remote = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()  # Nobody is left to use the result
+            raise
+        finally:
+            call.waiters -= 1
+        return result, remote or not leader
+
+    def _finish(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.task.cancelled():
+            self.metrics["cancelled"] += 1
+        elif call.task.exception() is not None:
+            self.metrics["failures"] += 1
+
+    async def _run_coordinated(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(result, remote): `remote` when another worker made the call."""
+        if self.redis is None:
+            self.metrics["calls"] += 1
+            return await fn(), False
+
+        lock_key = f"{self.namespace}:lock:{key}"
+        token = uuid4().hex
+        while True:
+            try:
+                acquired = await self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl_seconds * 1000))
+                holder = token if acquired else await self.redis.get(lock_key)
+            except Exception as e:
+                # Coordination is an optimization: without Redis each worker makes its own call
+                self.metrics["redis_errors"] += 1
+                print(f"⚠️  Single-flight lock failed, calling directly: {e}")
+                self.metrics["calls"] += 1
+                return await fn(), False
+            if holder is None:
+                continue  # Released between the two commands
+
+            # Each holder publishes under its own token, so an earlier call's outcome is never reused
+            result_key = f"{self.namespace}:result:{key}:{holder}"
+            if acquired:
+                self.metrics["calls"] += 1
+                try:
+                    result = await fn()
+                except asyncio.CancelledError:
+                    await self._publish(lock_key, token, result_key, None)  # Let another worker take over
+                    raise
+                except Exception as e:
+                    await self._publish(lock_key, token, result_key, {"error": f"{type(e).__name__}: {e}"})
+                    raise
+                await self._publish(lock_key, token, result_key, {"result": result})
+                return result, False
+
+            outcome = await self._wait_for_remote(lock_key, holder, result_key)
+            if outcome is None:
+                continue  # The holder went away without an outcome: try to make the call here
+            self.metrics["remote_results"] += 1
+            if "error" in outcome:
+                raise RuntimeError(f"Shared call failed in another worker: {outcome['error']}")
+            return outcome["result"], True
+
+    async def _wait_for_remote(self, lock_key: str, holder: str, result_key: str) -> Optional[Dict[str, Any]]:
+        """The holder's outcome, or None once it no longer holds the lock (released or expired) without one."""
+        while True:
+            try:
+                raw = await self.redis.get(result_key)
+                if raw is not None:
+                    return json.loads(raw)
+                if await self.redis.get(lock_key) != holder:
+                    raw = await self.redis.get(result_key)  # Published just before the release
+                    return json.loads(raw) if raw is not None else None
+            except Exception as e:
+                self.metrics["redis_errors"] += 1
+                print(f"⚠️  Single-flight wait failed: {e}")
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    async def _publish(self, lock_key: str, token: str, result_key: str, outcome: Optional[Dict[str, Any]]) -> None:
+        try:
+            if outcome is not None:
+                await self.redis.set(result_key, json.dumps(outcome, default=str), ex=self.result_ttl_seconds)
+            await self._release(keys=[lock_key], args=[token])
+        except Exception as e:
+            self.metrics["redis_errors"] += 1
+            print(f"⚠️  Single-flight publish failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, "in_flight": self.in_flight, "coordinated": self.redis is not None}
+
+
+def build_single_flight(namespace: str, coordinate: bool) -> SingleFlight:
+    """Per-worker single flight, coordinated through Redis when `coordinate` is set."""
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True) if coordinate else None
+    return SingleFlight(namespace, redis_client=client)
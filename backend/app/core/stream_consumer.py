@@ -0,0 +1,173 @@
+#core/stream_consumer.py
+"""Redis Streams consumer group - splits projection work across API instances"""
+import asyncio
+import os
+import socket
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+from app.core.codec import text_codec
+
+# Shared stream every instance reads through the group. The per-entity
+# execution:{id}:events / workflow:{id}:events streams have unbounded keys that
+# XREADGROUP cannot enumerate, so events are also appended here.
+PROJECTION_STREAM = "events:projection"
+DEAD_LETTER_STREAM = "events:projection:dead"
+
+
+def default_consumer_name() -> str:
+    """Unique per process, stable across one process lifetime."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StreamConsumer:
+    """
+    Consumes PROJECTION_STREAM as one member of a consumer group.
+
+    Each entry is delivered to exactly one instance and acked only after every
+    handler succeeded (at-least-once). Entries left pending by a crashed or slow
+    instance are claimed once idle longer than `claim_idle_ms`; entries that keep
+    failing are moved to DEAD_LETTER_STREAM after `max_deliveries` attempts.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        group: str,
+        consumer: Optional[str] = None,
+        stream: str = PROJECTION_STREAM,
+        batch_size: int = 100,
+        block_ms: int = 2000,
+        claim_idle_ms: int = 30000,
+        max_deliveries: int = 5,
+    ):
+        self.redis = redis_client
+        self.group = group
+        self.consumer = consumer or default_consumer_name()
+        self.stream = stream
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.handlers: Dict[str, List[Callable]] = {}
+        self._group_ready = False
+        self.metrics: Dict[str, Any] = {
+            "consumed": 0,
+            "acked": 0,
+            "handler_failures": 0,
+            "reclaimed": 0,
+            "dead_lettered": 0,
+        }
+
+    def add_handler(self, event_type: str, callback: Callable) -> None:
+        self.handlers.setdefault(event_type, []).append(callback)
+
+    async def ensure_group(self) -> None:
+        """Create the group at the stream tail; an existing group keeps its position."""
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="$", mkstream=True)
+            print(f"✅ Created consumer group {self.group} on {self.stream}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def run(self) -> None:
+        """Main loop: reclaim stale pending entries, then read new ones."""
+        await self.ensure_group()
+        print(f"🎧 Stream consumer {self.consumer} joined group {self.group}")
+        while True:
+            try:
+                await self.reclaim_pending()
+                await self.read_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Stream consumer error: {e}")
+                await asyncio.sleep(1)
+
+    async def read_batch(self) -> int:
+        """Read and handle up to `batch_size` new entries. Returns how many were read."""
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms
+        )
+        entries = [entry for _, stream_entries in (response or []) for entry in stream_entries]
+        await self._handle_entries(entries)
+        return len(entries)
+
+    async def reclaim_pending(self) -> int:
+        """Take over entries other consumers left unacked for too long. Returns how many were claimed."""
+        pending = await self.redis.xpending_range(
+            self.stream, self.group, min="-", max="+", count=self.batch_size, idle=self.claim_idle_ms
+        )
+        if not pending:
+            return 0
+
+        retry_ids: List[str] = []
+        for entry in pending:
+            if entry["times_delivered"] >= self.max_deliveries:
+                await self._dead_letter(entry["message_id"], entry["times_delivered"])
+            else:
+                retry_ids.append(entry["message_id"])
+        if not retry_ids:
+            return 0
+
+        claimed = await self.redis.xclaim(self.stream, self.group, self.consumer, self.claim_idle_ms, retry_ids)
+        # Entries trimmed from the stream come back empty; ack them so they leave the PEL
+        live = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        trimmed = [entry_id for entry_id, fields in claimed if not fields]
+        if trimmed:
+            await self.redis.xack(self.stream, self.group, *trimmed)
+        self.metrics["reclaimed"] += len(live)
+        await self._handle_entries(live)
+        return len(live)
+
+    async def _handle_entries(self, entries: List[Tuple[str, Dict[str, str]]]) -> None:
+        acked: List[str] = []
+        for entry_id, fields in entries:
+            self.metrics["consumed"] += 1
+            if await self._handle(fields):
+                acked.append(entry_id)
+        if acked:
+            await self.redis.xack(self.stream, self.group, *acked)
+            self.metrics["acked"] += len(acked)
+
+    async def _handle(self, fields: Dict[str, str]) -> bool:
+        event_type = fields.get("event_type", "")
+        try:
+            data = text_codec.loads(fields.get("data") or "{}")
+        except ValueError:  # json and orjson decode errors are both ValueErrors
+            print(f"⚠️ Undecodable stream entry for {event_type}, acking")
+            return True
+
+        # Same shape pub/sub listeners receive
+        full_data = {"event_type": event_type, "data": data, "timestamp": fields.get("timestamp")}
+        ok = True
+        for callback in self.handlers.get(event_type, []):
+            try:
+                await callback(full_data)
+            except Exception as e:
+                ok = False
+                self.metrics["handler_failures"] += 1
+                print(f"❌ Projection handler failed for {event_type}: {e}")
+        return ok
+
+    async def _dead_letter(self, entry_id: str, times_delivered: int) -> None:
+        entries = await self.redis.xrange(self.stream, min=entry_id, max=entry_id)
+        if entries:
+            fields = dict(entries[0][1])
+            fields["original_id"] = entry_id
+            fields["times_delivered"] = str(times_delivered)
+            await self.redis.xadd(DEAD_LETTER_STREAM, fields, maxlen=10000)
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.metrics["dead_lettered"] += 1
+        print(f"☠️ Moved {entry_id} to {DEAD_LETTER_STREAM} after {times_delivered} deliveries")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "stream": self.stream,
+            "group": self.group,
+            "consumer": self.consumer,
+        }
@@ -0,0 +1,149 @@
+#core/temporal_client.py
+"""Process-wide Temporal client - one connection shared by every router"""
+import asyncio
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from temporalio.client import Client
+from temporalio.service import RPCError, RPCStatusCode, TLSConfig
+from app.core.config import settings
+from app.core.payload_codec import build_data_converter
+
+# RPC failures that mean the channel itself is gone rather than a bad request
+CHANNEL_FAILURE_CODES = {RPCStatusCode.UNAVAILABLE, RPCStatusCode.UNKNOWN}
+
+
+async def connect_temporal() -> Client:
+    """Open a Temporal client using whichever authentication mode is configured."""
+    # Workers share the client's data converter, so this covers both sides
+    data_converter = build_data_converter()
+
+    # Modern approach: API Key authentication (recommended)
+    if settings.TEMPORAL_API_KEY:
+        return await Client.connect(
+            settings.TEMPORAL_HOST,
+            namespace=settings.TEMPORAL_NAMESPACE,
+            api_key=settings.TEMPORAL_API_KEY,
+            tls=True,  # Enable TLS for Temporal Cloud
+            data_converter=data_converter,
+        )
+
+    # Legacy approach: mTLS certificates
+    if settings.TEMPORAL_TLS_CERT and settings.TEMPORAL_TLS_KEY:
+        try:
+            with open(settings.TEMPORAL_TLS_CERT, 'rb') as f:
+                client_cert = f.read()
+            with open(settings.TEMPORAL_TLS_KEY, 'rb') as f:
+                client_key = f.read()
+        except FileNotFoundError as e:
+            print(f"❌ TLS certificate files not found: {e}")
+            print("⚠️  Falling back to unauthenticated connection (local dev only)")
+        else:
+            return await Client.connect(
+                settings.TEMPORAL_HOST,
+                namespace=settings.TEMPORAL_NAMESPACE,
+                tls=TLSConfig(client_cert=client_cert, client_private_key=client_key),
+                data_converter=data_converter,
+            )
+
+    # Local development: no authentication
+    return await Client.connect(
+        settings.TEMPORAL_HOST,
+        namespace=settings.TEMPORAL_NAMESPACE,
+        data_converter=data_converter,
+    )
+
+
+class TemporalClientManager:
+    """
+    Owns the single Temporal client of this process.
+
+    The client is connected lazily (or eagerly from the FastAPI lifespan), reused by
+    every request, and dropped after a channel failure so the next caller reconnects.
+    """
+
+    def __init__(self):
+        self._client: Optional[Client] = None
+        self._lock = asyncio.Lock()
+        self._connected_at: Optional[float] = None
+        self.metrics: Dict[str, Any] = {
+            "connects": 0,
+            "reconnects": 0,
+            "connect_failures": 0,
+            "channel_failures": 0,
+            "client_requests": 0,
+            "last_connect_ms": None,
+            "last_error": None,
+        }
+
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None
+
+    async def get_client(self) -> Client:
+        """Return the shared client, connecting on first use or after a failure."""
+        self.metrics["client_requests"] += 1
+        client = self._client
+        if client is not None:
+            return client
+
+        async with self._lock:
+            # Another request may have connected while we waited
+            if self._client is not None:
+                return self._client
+
+            start = time.perf_counter()
+            try:
+                client = await connect_temporal()
+            except Exception as e:
+                self.metrics["connect_failures"] += 1
+                self.metrics["last_error"] = str(e)
+                raise
+
+            if self.metrics["connects"] > 0:
+                self.metrics["reconnects"] += 1
+            self.metrics["connects"] += 1
+            self.metrics["last_connect_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self._connected_at = time.time()
+            self._client = client
+            print(f"✅ Temporal client connected to {settings.TEMPORAL_HOST} in {self.metrics['last_connect_ms']}ms")
+            return client
+
+    def report_failure(self, error: BaseException) -> None:
+        """Drop the client if `error` indicates a broken channel, so the next call reconnects."""
+        if isinstance(error, RPCError) and error.status in CHANNEL_FAILURE_CODES:
+            self.metrics["channel_failures"] += 1
+            self.metrics["last_error"] = str(error)
+            print(f"⚠️  Temporal channel failure, will reconnect: {error}")
+            self._client = None
+
+    async def check_health(self, timeout: float = 5.0) -> bool:
+        """Ping the Temporal frontend over the shared channel."""
+        try:
+            client = await asyncio.wait_for(self.get_client(), timeout=timeout)
+            return await client.service_client.check_health(timeout=timedelta(seconds=timeout))
+        except Exception as e:
+            self.report_failure(e)
+            self.metrics["last_error"] = str(e)
+            return False
+
+    async def close(self) -> None:
+        """Release the client on shutdown (the channel closes once unreferenced)."""
+        async with self._lock:
+            self._client = None
+            self._connected_at = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "connected": self.is_connected,
+            "connected_for_seconds": round(time.time() - self._connected_at, 1) if self._connected_at else None,
+        }
+
+
+temporal_client_manager = TemporalClientManager()
+
+
+async def get_temporal_client() -> Client:
+    """Get the shared Temporal client with proper authentication"""
+    return await temporal_client_manager.get_client()
@@ -0,0 +1,93 @@
+#core/worker_metrics.py
+"""Worker metrics reporting - activity-side pool metrics published to Redis so the API can serve them"""
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+import redis.asyncio as redis
+from app.core.config import settings
+from app.core.stream_consumer import default_consumer_name
+
+# Hash of worker name -> {"reported_at": ..., "<section>": {...}, ...}
+WORKER_METRICS_KEY = "metrics:workers"
+
+
+class WorkerMetricsReporter:
+    """
+    Publishes a snapshot of this worker's metrics to Redis every `interval_seconds`.
+
+    Each section is a callable returning the current metrics (e.g. http_client.get_metrics).
+    Snapshots carry the time they were taken; readers skip those older than a few intervals,
+    so a worker that went away without stopping drops out on its own.
+    """
+
+    def __init__(
+        self,
+        sections: Dict[str, Callable[[], Dict[str, Any]]],
+        redis_client=None,
+        worker_name: Optional[str] = None,
+        interval_seconds: Optional[float] = None,
+    ):
+        self.sections = sections
+        self.redis = redis_client
+        self.worker_name = worker_name or default_consumer_name()
+        self.interval_seconds = interval_seconds or settings.WORKER_METRICS_INTERVAL_SECONDS
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        """Start reporting on the running loop (no-op if already running)."""
+        if self._task is not None:
+            return
+        if self.redis is None:
+            self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def publish(self) -> None:
+        """Write one snapshot; errors are logged, reporting is best effort."""
+        snapshot: Dict[str, Any] = {"reported_at": time.time()}
+        for name, get_metrics in self.sections.items():
+            snapshot[name] = get_metrics()
+        try:
+            await self.redis.hset(WORKER_METRICS_KEY, self.worker_name, json.dumps(snapshot, default=str))
+        except Exception as e:
+            print(f"⚠️  Worker metrics publish failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await self.publish()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def stop(self) -> None:
+        """Stop reporting and remove this worker's snapshot."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.redis.hdel(WORKER_METRICS_KEY, self.worker_name)
+        except Exception as e:
+            print(f"⚠️  Worker metrics cleanup failed: {e}")
+
+
+async def read_worker_metrics(redis_client, section: str, max_age_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    One section of every live worker's latest snapshot, by worker name.
+
+    Snapshots older than `max_age_seconds` (default: three reporting intervals) are
+    skipped and removed.
+    """
+    max_age = max_age_seconds or settings.WORKER_METRICS_INTERVAL_SECONDS * 3
+    now = time.time()
+    workers: Dict[str, Any] = {}
+    for worker_name, raw in (await redis_client.hgetall(WORKER_METRICS_KEY)).items():
+        snapshot = json.loads(raw)
+        if now - snapshot.get("reported_at", 0) > max_age:
+            await redis_client.hdel(WORKER_METRICS_KEY, worker_name)
+            continue
+        if section in snapshot:
+            workers[worker_name] = {**snapshot[section], "reported_at": snapshot["reported_at"]}
+    return workers
@@ -1,6 +1,7 @@
 from app.core.database import engine, Base
 from app.models.workflow import Workflow, Execution, ApprovalRequest
 from app.models.event_log import EventLog, CompensationLog, AgentScore
+from app.models.blob import Blob
 
 def init_db():
     Base.metadata.create_all(bind=engine)
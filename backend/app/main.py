@@ -4,12 +4,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
-from temporalio.client import Client
 from contextlib import asynccontextmanager
 import asyncio
 import re
 from app.api import workflows, approvals, executions, node_types, events, metrics
 from app.core.config import settings
+from app.core.temporal_client import temporal_client_manager
+from app.core.http_client import http_client
 
 
 class CustomCORSMiddleware(BaseHTTPMiddleware):
@@ -130,28 +131,48 @@ async def lifespan(app: FastAPI):
         print(f"❌ Database initialization failed: {e}")
         raise
 
+    # Connect the shared Temporal client up front; requests reconnect lazily if this fails
+    try:
+        await temporal_client_manager.get_client()
+    except Exception as e:
+        print(f"⚠️  Temporal not reachable at startup, will connect on first use: {e}")
+
     from app.core.events import event_bus
-    from app.api.events import push_to_websocket_clients
+    from app.core.event_log_writer import event_log_writer
 
-    # THIS IS THE FIX: Added 'await' to both subscribe calls
-    await event_bus.subscribe("workflow.completed", update_execution_status_on_event)
-    await event_bus.subscribe("workflow.failed", update_execution_status_on_event)
+    event_log_writer.start()
 
-    websocket_events = ["workflow.started", "workflow.completed", "workflow.failed", "node.started", "node.completed", "node.failed", "approval.requested", "approval.granted", "approval.denied", "compensation.started", "compensation.completed", "compensation.failed"]
-    for event_type in websocket_events:
-        await event_bus.subscribe(event_type, push_to_websocket_clients)
+    # DB projection runs once per event (split across instances in consumer-group mode)
+    await event_bus.subscribe_projection("workflow.completed", update_execution_status_on_event)
+    await event_bus.subscribe_projection("workflow.failed", update_execution_status_on_event)
 
-    print(f"✅ Subscribed to {len(websocket_events) + 2} event types")
+    # WebSocket fan-out subscribes per watched execution/workflow (see app/api/events.py)
+    print("✅ Subscribed projection listeners; WebSocket channels subscribe on demand")
     print(f"📋 Event listeners: {list(event_bus.listeners.keys())}")
     
     # Start the event bus listener task
     listener_task = asyncio.create_task(event_bus.listen())
     print("🎧 Event bus listener task created and started")
 
+    from app.core.event_archive import event_archive
+    archive_task = asyncio.create_task(event_archive.run())
+
+    consumer_task = None
+    if event_bus.stream_consumer is not None:
+        consumer_task = asyncio.create_task(event_bus.stream_consumer.run())
+        print(f"🎧 Projection consumer {event_bus.stream_consumer.consumer} started")
+
     print("✅ All routers and event listeners loaded")
     yield
     print("👋 Lyzr Orchestrator API shutting down...")
     listener_task.cancel()  # Clean up the listener on shutdown
+    archive_task.cancel()  # Unarchived entries are picked up by the next pass (any instance)
+    if consumer_task is not None:
+        consumer_task.cancel()  # Unacked entries are reclaimed by another instance
+    await event_bus.dispatcher.drain()  # Let already-received events finish
+    await event_log_writer.stop()  # Drain queued chronicle rows
+    await temporal_client_manager.close()
+    await http_client.close()
 
 app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
 
@@ -217,29 +238,10 @@ async def health():
     except Exception as e:
         print(f"⚠️  Database health check failed: {e}")
 
-    # Check Temporal
-    try:
-        if settings.TEMPORAL_API_KEY:
-            await asyncio.wait_for(
-                Client.connect(
-                    settings.TEMPORAL_HOST,
-                    namespace=settings.TEMPORAL_NAMESPACE,
-                    api_key=settings.TEMPORAL_API_KEY,
-                    tls=True
-                ),
-                timeout=5
-            )
-        else:
-            await asyncio.wait_for(
-                Client.connect(
-                    settings.TEMPORAL_HOST,
-                    namespace=settings.TEMPORAL_NAMESPACE
-                ),
-                timeout=5
-            )
-        temporal_ok = True
-    except Exception as e:
-        print(f"⚠️  Temporal health check failed: {e}")
+    # Check Temporal over the shared client (reconnects if the channel was dropped)
+    temporal_ok = await temporal_client_manager.check_health(timeout=5)
+    if not temporal_ok:
+        print(f"⚠️  Temporal health check failed: {temporal_client_manager.metrics['last_error']}")
 
     # Check Redis
     try:
@@ -265,26 +267,32 @@ async def update_execution_status_on_event(event_data: dict):
     from datetime import datetime, timezone
 
     event_type = event_data.get("event_type")
-    # FIX: The 'data' field is a JSON string and needs to be parsed
-    data = json.loads(event_data.get("data", "{}"))
+    # The 'data' field arrives as an object; older publishers sent a JSON string
+    data = event_data.get("data") or {}
+    if isinstance(data, str):
+        data = json.loads(data)
     execution_id = data.get("execution_id")
 
     if not execution_id or event_type not in ["workflow.completed", "workflow.failed"]:
         return
 
-    db = SessionLocal()
-    try:
-        execution = db.query(Execution).filter(Execution.id == execution_id).first()
-        if execution:
-            if event_type == "workflow.completed":
-                execution.status = "completed"
-                execution.output_data = data.get("result")
-            else: # workflow.failed
-                execution.status = "failed"
-                execution.error = data.get("error")
-
-            execution.completed_at = datetime.now(timezone.utc).isoformat()
-            db.commit()
-            print(f"✅ Updated execution {execution_id} status to {execution.status}")
-    finally:
-        db.close()
\ No newline at end of file
+    def _apply_status() -> None:
+        db = SessionLocal()
+        try:
+            execution = db.query(Execution).filter(Execution.id == execution_id).first()
+            if execution:
+                if event_type == "workflow.completed":
+                    execution.status = "completed"
+                    execution.output_data = data.get("result")
+                else: # workflow.failed
+                    execution.status = "failed"
+                    execution.error = data.get("error")
+
+                execution.completed_at = datetime.now(timezone.utc).isoformat()
+                db.commit()
+                print(f"✅ Updated execution {execution_id} status to {execution.status}")
+        finally:
+            db.close()
+
+    # Sync session - run it off the event loop so other listeners keep flowing
+    await asyncio.to_thread(_apply_status)
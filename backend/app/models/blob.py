@@ -0,0 +1,16 @@
+"""Content-addressed blob model"""
+from sqlalchemy import String, DateTime, Integer, LargeBinary
+from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+from datetime import datetime as dt
+
+
+class Blob(Base):
+    """Large node output kept out of Temporal payloads; workflow state only holds its digest"""
+    __tablename__ = "blobs"
+
+    digest: Mapped[str] = mapped_column(String, primary_key=True)  # sha256 of the JSON encoding
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)  # Uncompressed
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # zlib-compressed JSON
+    created_at: Mapped[dt] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,5 +1,5 @@
 """Event chronicle model"""
-from sqlalchemy import Column, String, JSON, DateTime, Index, Text, Float, Integer
+from sqlalchemy import Column, String, JSON, DateTime, Index, Text, Float, Integer, BigInteger, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import Mapped, mapped_column
 from app.core.database import Base
@@ -22,6 +22,26 @@ class EventLog(Base):
         Index('idx_execution_timestamp', 'execution_id', 'timestamp'),
     )
 
+class EventArchiveBlock(Base):
+    """Compressed run of execution stream entries moved out of the Redis hot tier"""
+    __tablename__ = "event_archive_blocks"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    execution_id: Mapped[str] = mapped_column(String, nullable=False)
+    workflow_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    first_event_id: Mapped[str] = mapped_column(String, nullable=False)  # Redis stream IDs, inclusive
+    last_event_id: Mapped[str] = mapped_column(String, nullable=False)
+    first_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_ms: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    codec: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[dt] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_archive_execution_range', 'execution_id', 'first_ms'),
+    )
+
 class CompensationLog(Base):
     __tablename__ = "compensation_logs"
     
@@ -47,6 +67,9 @@ class AgentScore(Base):
     avg_latency_ms: Mapped[float] = mapped_column(Float, default=0.0)
     total_cost: Mapped[float] = mapped_column(Float, default=0.0)
     reliability_score: Mapped[float] = mapped_column(Float, default=1.0)
+    cache_hits: Mapped[int] = mapped_column(Integer, default=0)  # Responses served by the LLM cache (not in the counts above)
+    cache_misses: Mapped[int] = mapped_column(Integer, default=0)
+    cost_saved: Mapped[float] = mapped_column(Float, default=0.0)
     last_updated: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     __table_args__ = (
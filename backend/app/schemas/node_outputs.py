@@ -71,6 +71,12 @@ class AgentOutput(BaseNodeOutput):
     cost: float
     temperature_used: float
     usage: Dict[str, Any]  # Changed from Dict[str, int] to handle nested token details
+    cache: Optional[Dict[str, Any]] = None  # {"hit", ...} when the node has caching on
+    coalesced: bool = False  # Answered by an identical request's call made at the same time
+    
+    @property
+    def from_cache(self) -> bool:
+        return bool(self.cache and self.cache.get("hit"))
     
     @property
     def text_content(self) -> str:
@@ -121,6 +127,24 @@ class LoopOutput(BaseNodeOutput):
         return f"Iteration {self.iteration}/{self.total_items}: {self.current_item}"
 
 
+class MapOutput(LoopOutput):
+    """Output from map nodes - every item's result, in item order"""
+    node_type: str = "map"
+    merged_data: Any  # {"results": [...]}, or a blob reference when large
+    sources: List[str] = Field(default_factory=list)
+    merge_strategy: str = "map"
+    failed_items: Any = Field(default_factory=list)  # [{"index", "error", "attempts"}], or a blob reference when large
+    failed_count: int = 0
+
+    @property
+    def results(self) -> Any:
+        return self.merged_data.get("results") if isinstance(self.merged_data, dict) else self.merged_data
+
+    @property
+    def text_content(self) -> str:
+        return f"Mapped {self.items_processed}/{self.total_items} items"
+
+
 class MergeOutput(BaseNodeOutput):
     """Output from merge nodes"""
     node_type: str = "merge"
@@ -141,6 +165,12 @@ class APICallOutput(BaseNodeOutput):
     headers: Dict[str, str]
     response_time_ms: float
     url: str
+    cache: Optional[Dict[str, Any]] = None  # {"hit", "status", ...} when the node has caching on
+    body_bytes: Optional[int] = None  # Size of the response body as received
+    
+    @property
+    def from_cache(self) -> bool:
+        return bool(self.cache and self.cache.get("hit"))
     
     @property
     def text_content(self) -> str:
@@ -225,6 +255,7 @@ NodeOutput = Union[
     TimerOutput,
     ConditionOutput,
     LoopOutput,
+    MapOutput,
     MergeOutput,
     APICallOutput,
     EvalOutput,
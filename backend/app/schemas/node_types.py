@@ -1,6 +1,6 @@
 """Node type definitions and JSON schemas"""
 from enum import Enum
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, FrozenSet, List, Optional
 from pydantic import BaseModel, Field
 
 class NodeType(str, Enum):
@@ -13,8 +13,17 @@ class NodeType(str, Enum):
     EVENT = "event"
     TIMER = "timer"
     EVAL = "eval"
+    MAP = "map"
     END = "end"
 
+class InputDependency(str, Enum):
+    """Data a node's activity reads from workflow state"""
+    PREVIOUS_OUTPUT = "previous_output"  # Mapped output of the node that activated it
+    WORKFLOW_INPUT = "workflow_input"  # The execution's input data
+    BRANCH_OUTPUTS = "branch_outputs"  # Raw outputs of the incoming branches that reached it (joins)
+    REFERENCED_NODES = "referenced_nodes"  # Node IDs named in its config (nodes[...] in a condition)
+    ALL_NODE_OUTPUTS = "all_node_outputs"  # Every completed node's output
+
 # --- Specific Node Configs ---
 
 class TriggerConfig(BaseModel):
@@ -33,6 +42,10 @@ class AgentConfig(BaseModel):
     # Legacy fields for backward compatibility
     provider: Optional[str] = Field("openai", description="AI provider (e.g., openai, lyzr)")
     agent_id: Optional[str] = Field("gpt-4o-mini", description="Specific agent/model ID")
+    cache: bool = Field(False, description="Answer identical requests from the LLM response cache (temperature 0 only, unless cache_sampled)")
+    cache_ttl_seconds: Optional[int] = Field(None, description="How long cached responses are reused (default: LLM_CACHE_TTL_SECONDS)")
+    cache_sampled: bool = Field(False, description="Also cache above temperature 0: every later identical request gets the first sampled answer")
+    coalesce: Optional[bool] = Field(None, description="Share one provider call between identical concurrent requests (default: whether the cache applies)")
 
 class ApiCallConfig(BaseModel):
     """API Call node - Integrates external APIs or internal services"""
@@ -41,6 +54,13 @@ class ApiCallConfig(BaseModel):
     method: str = Field("POST", description="HTTP method (GET, POST, PUT, DELETE, etc.)")
     headers: Optional[Dict[str, str]] = Field(default_factory=dict, description="Support auth/content-type")
     body: Optional[Dict[str, Any]] = Field(None, description="Passes payload data (optional for GET)")
+    cache: bool = Field(False, description="Reuse responses across executions (GET/HEAD; other methods also need cache_ttl_seconds)")
+    cache_ttl_seconds: Optional[int] = Field(None, description="Serve cached responses this long; defaults to the response's Cache-Control")
+    cache_vary_headers: Optional[List[str]] = Field(None, description="Request headers that select a different cached response (default: accept, accept-language, authorization)")
+    response_path: Optional[str] = Field(None, description="JSONPath selecting the part of the response body to keep, e.g. $.data.items[*].id")
+    response_headers: Optional[List[str]] = Field(None, description="Response headers kept in the output (default: content-type, etag, caching and redirect headers)")
+    max_inline_bytes: Optional[int] = Field(None, description="Bodies larger than this are stored as a blob reference (default: API_RESPONSE_INLINE_BYTES)")
+    max_response_bytes: Optional[int] = Field(None, description="Responses larger than this fail the node (default: API_RESPONSE_MAX_BYTES)")
 
 class ConditionalConfig(BaseModel):
     """Conditional node - Branches workflow based on logic"""
@@ -81,6 +101,17 @@ class TimerConfig(BaseModel):
     name: str = Field(..., description="Name identifies the timer step")
     duration_seconds: int = Field(..., description="Controls delay timing")
 
+class MapConfig(BaseModel):
+    """Map node - Runs a chain of agent/API steps over every item of a list"""
+    name: str = Field(..., description="Name identifies the map step")
+    items_expression: str = Field("output", description="Selects the list to map over from output (incoming result), nodes and input")
+    steps: List[Dict[str, Any]] = Field(..., description="Nodes (agent, api_call, eval, event) run in order for each item")
+    max_concurrency: int = Field(10, description="Items processed at the same time")
+    batch_size: int = Field(10, description="Items handled per activity")
+    item_max_attempts: int = Field(3, description="Attempts per item before it counts as failed")
+    on_item_failure: str = Field("fail", description="fail the node, or continue with partial results")
+    shard_size: int = Field(1000, description="Lists longer than this are split across child workflows")
+
 # --- Update the Master Registry ---
 NODE_TYPE_SCHEMAS = {
     NodeType.TRIGGER: TriggerConfig,
@@ -92,9 +123,33 @@ NODE_TYPE_SCHEMAS = {
     NodeType.TIMER: TimerConfig,
     NodeType.EVENT: EventConfig,
     NodeType.EVAL: EvalConfig,
+    NodeType.MAP: MapConfig,
     NodeType.END: EndConfig,
 }
 
+# --- Data dependencies: the workflow only sends a node what it declares here ---
+NODE_INPUT_DEPENDENCIES: Dict[NodeType, FrozenSet[InputDependency]] = {
+    NodeType.TRIGGER: frozenset({InputDependency.WORKFLOW_INPUT}),
+    NodeType.AGENT: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    NodeType.API_CALL: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    NodeType.APPROVAL: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    NodeType.CONDITIONAL: frozenset({InputDependency.REFERENCED_NODES}),
+    NodeType.MERGE: frozenset({InputDependency.BRANCH_OUTPUTS}),
+    NodeType.TIMER: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    NodeType.EVENT: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    NodeType.EVAL: frozenset({InputDependency.PREVIOUS_OUTPUT}),
+    # items_expression reads the raw incoming result as `output`, plus any nodes it names
+    NodeType.MAP: frozenset({InputDependency.BRANCH_OUTPUTS, InputDependency.WORKFLOW_INPUT, InputDependency.REFERENCED_NODES}),
+    NodeType.END: frozenset(),
+}
+
+def get_input_dependencies(node_type: str) -> FrozenSet[InputDependency]:
+    """Declared dependencies of a node type; undeclared types get everything, as before"""
+    try:
+        return NODE_INPUT_DEPENDENCIES[NodeType(node_type)]
+    except (ValueError, KeyError):
+        return frozenset({InputDependency.PREVIOUS_OUTPUT, InputDependency.WORKFLOW_INPUT, InputDependency.ALL_NODE_OUTPUTS})
+
 def get_node_type_info(node_type: str) -> Dict[str, Any]:
     """Get JSON schema for node type"""
     try:
@@ -107,6 +162,7 @@ def get_node_type_info(node_type: str) -> Dict[str, Any]:
         "type": node_type,
         "name": node_type.capitalize().replace("_", " "),
         "schema": schema_class.model_json_schema(),
+        "input_dependencies": sorted(dep.value for dep in get_input_dependencies(node_type)),
         "description": schema_class.__doc__ or f"{node_type} node"
     }
 
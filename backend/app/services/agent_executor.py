@@ -1,12 +1,17 @@
 """Agent executor with parameter auto-tuning"""
-from typing import Optional, Dict, Any
-import httpx
+from typing import Optional, Dict, Any, List
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.http_client import http_client
+from app.core.single_flight import build_single_flight
+from app.services.llm_cache import llm_request_key, llm_response_cache
 from app.services.self_healing import SelfHealingService
 import time
 import logging
 
+# Outstanding provider calls of this worker, shared by every AgentExecutor
+agent_single_flight = build_single_flight("llmflight", settings.LLM_SINGLE_FLIGHT_REDIS)
+
 class AgentExecutor:
     def __init__(self):
         self.openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
@@ -29,11 +34,19 @@ class AgentExecutor:
         provider: str = "openai",
         agent_id: str = "gpt-4o-mini",
         enable_auto_tuning: bool = False,
-        previous_eval_score: Optional[float] = None
+        previous_eval_score: Optional[float] = None,
+        cache: bool = False,
+        cache_ttl_seconds: Optional[int] = None,
+        coalesce: Optional[bool] = None,
+        cache_sampled: bool = False
     ) -> dict:
-        """Execute agent with new schema support"""
-        start_time = time.time()
-        
+        """
+        Execute agent with new schema support.
+        With `cache`, an identical earlier request (same provider, model, messages,
+        temperature and format) is answered from the LLM response cache; only at
+        temperature 0 unless `cache_sampled` is set. With `coalesce` (default: whether
+        the cache applies), identical requests made at the same time share one provider call.
+        """
         # Auto-tune temperature based on previous eval score
         if enable_auto_tuning and previous_eval_score is not None:
             if previous_eval_score < 0.5:
@@ -42,7 +55,58 @@ class AgentExecutor:
                 temperature = self.temperature_ranges["low"]  # More deterministic
             else:
                 temperature = self.temperature_ranges["medium"]
-        
+
+        if cache and temperature != 0 and not cache_sampled:
+            # A sampled answer is one of many; caching it would give every later run the same one.
+            # No temperature means the provider's default, which samples too (1.0 for OpenAI)
+            cache = False
+        if coalesce is None:
+            coalesce = cache
+
+        request_key = None
+        if cache or coalesce:
+            request_key = llm_request_key(
+                provider, agent_id,
+                self._build_messages(system_instructions, input_data, expected_output_format) if provider == "openai" else input_data,
+                temperature, expected_output_format
+            )
+        if cache:
+            entry = await llm_response_cache.get(request_key)
+            if entry is not None:
+                result = llm_response_cache.cached_result(entry)
+                # Counted apart from executions, so cache hits don't skew latency or reliability
+                self.self_healing.record_cache_hit(provider, agent_id, cost_saved=result["cache"]["cost_saved"])
+                return result
+
+        def call():
+            return self._call_provider(
+                provider, agent_id, system_instructions, input_data, temperature, expected_output_format,
+                cache_key=request_key if cache else None, cache_ttl_seconds=cache_ttl_seconds
+            )
+
+        if not coalesce:
+            return await call()
+        # Identical requests already in flight (in this worker, or in any worker with
+        # LLM_SINGLE_FLIGHT_REDIS) wait for that call instead of making their own
+        result, shared = await agent_single_flight.run(request_key, call)
+        if shared:
+            # The caller that made the call recorded it and filled the cache
+            return {**{k: v for k, v in result.items() if k != "cache"}, "cost": 0.0, "coalesced": True}
+        return result
+
+    async def _call_provider(
+        self,
+        provider: str,
+        agent_id: str,
+        system_instructions: str,
+        input_data: Dict[str, Any],
+        temperature: Optional[float],
+        expected_output_format: Optional[str],
+        cache_key: Optional[str] = None,
+        cache_ttl_seconds: Optional[int] = None
+    ) -> dict:
+        """Call the provider, record the execution for scoring, and store the result when caching"""
+        start_time = time.time()
         try:
             if provider == "openai":
                 result = await self._execute_openai(
@@ -67,9 +131,13 @@ class AgentExecutor:
                 agent_id=agent_id,
                 success=True,
                 latency_ms=latency_ms,
-                cost=result.get("cost", 0.0)
+                cost=result.get("cost", 0.0),
+                cache_miss=cache_key is not None
             )
             
+            if cache_key is not None:
+                stored = await llm_response_cache.put(cache_key, result, cache_ttl_seconds)
+                result = {**result, "cache": {"hit": False, "stored": stored}}
             return result
         
         except Exception as e:
@@ -80,7 +148,8 @@ class AgentExecutor:
                 provider=provider,
                 agent_id=agent_id,
                 success=False,
-                latency_ms=latency_ms
+                latency_ms=latency_ms,
+                cache_miss=cache_key is not None
             )
             
             raise
@@ -94,6 +163,36 @@ class AgentExecutor:
         expected_output_format: Optional[str] = None
     ) -> dict:
         """Execute OpenAI agent with new schema"""
+        messages = self._build_messages(system_instructions, input_data, expected_output_format)
+
+        params = {
+            "model": agent_id,
+            "messages": messages
+        }
+
+        if temperature is not None:
+            params["temperature"] = temperature
+
+        response = await self.openai_client.chat.completions.create(**params)
+        cost = 0
+        if response.usage:
+            cost = ((response.usage.prompt_tokens * 0.15) + (response.usage.completion_tokens * 0.6)) / 1_000_000
+
+        return {
+            "output": response.choices[0].message.content,
+            "model": agent_id,
+            "cost": cost,
+            "usage": response.usage.model_dump() if response.usage else {},
+            "temperature_used": temperature
+        }
+    
+    @staticmethod
+    def _build_messages(
+        system_instructions: str,
+        input_data: Dict[str, Any],
+        expected_output_format: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Chat messages for the OpenAI request (also the cache key material)"""
         # Build messages from input_data
         messages = []
         
@@ -125,42 +224,21 @@ class AgentExecutor:
                 })
         else:
             messages.append({"role": "user", "content": str(input_data)})
+        return messages
 
-        params = {
-            "model": agent_id,
-            "messages": messages
-        }
-
-        if temperature is not None:
-            params["temperature"] = temperature
-
-        response = await self.openai_client.chat.completions.create(**params)
-        cost = 0
-        if response.usage:
-            cost = ((response.usage.prompt_tokens * 0.15) + (response.usage.completion_tokens * 0.6)) / 1_000_000
-
-        return {
-            "output": response.choices[0].message.content,
-            "model": agent_id,
-            "cost": cost,
-            "usage": response.usage.model_dump() if response.usage else {},
-            "temperature_used": temperature
-        }
-    
     async def _execute_lyzr(self, agent_id: str, input_data: dict) -> dict:
         """Execute Lyzr agent"""
         if not settings.LYZR_API_KEY:
             raise ValueError("LYZR_API_KEY not configured")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.lyzr.ai/v1/agents/{agent_id}/execute",
-                json=input_data,
-                headers={"Authorization": f"Bearer {settings.LYZR_API_KEY}"},
-                timeout=300
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await http_client.post(
+            f"https://api.lyzr.ai/v1/agents/{agent_id}/execute",
+            json=input_data,
+            headers={"Authorization": f"Bearer {settings.LYZR_API_KEY}"},
+            timeout=300
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def _execute_custom(self, provider: str, agent_id: str, input_data: dict) -> dict:
         """Execute custom agent via HTTP"""
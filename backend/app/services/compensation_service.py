@@ -5,7 +5,8 @@ from datetime import datetime, timezone
 from app.core.database import SessionLocal
 from app.models.event_log import CompensationLog
 from app.core.events import event_bus
-import httpx
+from app.core.blob_store import blob_store
+from app.core.http_client import http_client
 
 class CompensationService:
     def __init__(self):
@@ -99,8 +100,8 @@ class CompensationService:
         cleanup_url = node_data.get("cleanup_url")
         if cleanup_url:
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.post(cleanup_url, json=state, timeout=30)
+                # Node outputs in the state are blob references until something actually sends them
+                await http_client.post(cleanup_url, json=await blob_store.resolve(state), timeout=30)
                 return {"status": "cleaned_up", "url": cleanup_url}
             except Exception as e:
                 return {"status": "cleanup_failed", "error": str(e)}
@@ -117,13 +118,12 @@ class CompensationService:
             compensation_method = node_data.get("compensation_method", "DELETE")
             
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.request(
-                        method=compensation_method,
-                        url=url,
-                        json={"action": "compensate", "state": state},
-                        timeout=30
-                    )
+                await http_client.request(
+                    method=compensation_method,
+                    url=url,
+                    json={"action": "compensate", "state": await blob_store.resolve(state)},
+                    timeout=30
+                )
                 return {"status": "http_compensated", "url": url}
             except Exception as e:
                 return {"status": "http_compensation_failed", "error": str(e)}
@@ -0,0 +1,157 @@
+"""Compiled workflow graph - indexed edge lookup built once per definition"""
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.services.expression_engine import CompiledExpression, compile_expression
+from app.services.input_projection import NodeInputSpec, input_spec_for
+
+# Handles that select a single outgoing edge instead of following all of them
+BRANCH_HANDLES = ("true", "false", "approve", "reject")
+
+# Compiled graphs are immutable, so a small per-process cache is enough
+_CACHE_MAX_SIZE = 256
+_compiled_cache: "OrderedDict[str, CompiledWorkflow]" = OrderedDict()
+
+
+def definition_hash(workflow_definition: Dict[str, Any]) -> str:
+    """Stable content hash of the nodes and edges of a workflow definition."""
+    canonical = json.dumps(
+        {
+            "nodes": workflow_definition.get("nodes", []),
+            "edges": workflow_definition.get("edges", []),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CompiledWorkflow:
+    """
+    Read-only, indexed view of a workflow definition.
+    Every lookup the orchestration loop needs is O(1) or O(out-degree).
+    """
+    definition_hash: str
+    node_map: Dict[str, Dict[str, Any]]
+    node_order: List[str]
+    outgoing: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    incoming: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    handle_map: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    in_degree: Dict[str, int] = field(default_factory=dict)
+    input_specs: Dict[str, NodeInputSpec] = field(default_factory=dict)
+    conditions: Dict[str, CompiledExpression] = field(default_factory=dict)
+    start_node_id: Optional[str] = None
+
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        return self.node_map.get(node_id)
+
+    def successors(self, node_id: str) -> List[str]:
+        """Targets of every outgoing edge, in definition order."""
+        return [edge.get("target") for edge in self.outgoing.get(node_id, [])]
+
+    def predecessors(self, node_id: str) -> List[str]:
+        """Sources of every incoming edge, in definition order."""
+        return [edge.get("source") for edge in self.incoming.get(node_id, [])]
+
+    def handle_target(self, node_id: str, handle_id: str) -> Optional[str]:
+        """Target of the first edge leaving `node_id` through `handle_id`."""
+        return self.handle_map.get(node_id, {}).get(handle_id)
+
+    def condition(self, node_id: str) -> CompiledExpression:
+        """Compiled condition_expression of a conditional node (missing expressions evaluate to False)."""
+        compiled = self.conditions.get(node_id)
+        return compiled if compiled is not None else compile_expression("False")
+
+    def find_cycle(self) -> Optional[List[str]]:
+        """
+        Node ids along one cycle (first node repeated at the end), or None when the graph is
+        acyclic. The scheduler starts each node at most once, so a back edge could never run.
+        """
+        visiting: Dict[str, int] = {}  # Node -> position on the current DFS path
+        done = set()
+        path: List[str] = []
+        for root in self.node_order:
+            if root in done:
+                continue
+            stack = [(root, iter(self.successors(root)))]
+            visiting[root] = 0
+            path.append(root)
+            while stack:
+                node_id, targets = stack[-1]
+                target = next(targets, None)
+                if target is None:
+                    stack.pop()
+                    path.pop()
+                    del visiting[node_id]
+                    done.add(node_id)
+                elif target in visiting:
+                    return path[visiting[target]:] + [target]
+                elif target not in done and target in self.node_map:
+                    visiting[target] = len(path)
+                    path.append(target)
+                    stack.append((target, iter(self.successors(target))))
+        return None
+
+    def input_spec(self, node_id: str) -> NodeInputSpec:
+        """What the node reads from workflow state; unknown nodes get everything."""
+        spec = self.input_specs.get(node_id)
+        return spec if spec is not None else NodeInputSpec(previous_output=True, workflow_input=True, all_node_outputs=True)
+
+
+def _build(workflow_definition: Dict[str, Any], content_hash: str) -> CompiledWorkflow:
+    nodes: List[Dict[str, Any]] = workflow_definition.get("nodes", [])
+    edges: List[Dict[str, Any]] = workflow_definition.get("edges", [])
+
+    node_map = {node.get("id"): node for node in nodes}
+    compiled = CompiledWorkflow(
+        definition_hash=content_hash,
+        node_map=node_map,
+        node_order=[node.get("id") for node in nodes],
+    )
+
+    for node_id, node in node_map.items():
+        compiled.outgoing[node_id] = []
+        compiled.incoming[node_id] = []
+        compiled.in_degree[node_id] = 0
+        compiled.input_specs[node_id] = input_spec_for(node)
+        if node.get("type") == "conditional":
+            expression = node.get("data", {}).get("config", {}).get("condition_expression", "False")
+            compiled.conditions[node_id] = compile_expression(expression)
+
+    for edge in edges:
+        source_id = edge.get("source")
+        target_id = edge.get("target")
+        compiled.outgoing.setdefault(source_id, []).append(edge)
+        compiled.incoming.setdefault(target_id, []).append(edge)
+        compiled.in_degree[target_id] = compiled.in_degree.get(target_id, 0) + 1
+
+        handle_id = edge.get("sourceHandle")
+        if handle_id in BRANCH_HANDLES:
+            # Keep the first edge per handle, matching the previous next(...) scan
+            compiled.handle_map.setdefault(source_id, {}).setdefault(handle_id, target_id)
+
+    # First 'trigger' node, falling back to the first node (should be validated earlier)
+    compiled.start_node_id = next(
+        (node.get("id") for node in nodes if node.get("type") == "trigger"),
+        nodes[0].get("id") if nodes else None,
+    )
+    return compiled
+
+
+def compile_workflow(workflow_definition: Dict[str, Any]) -> CompiledWorkflow:
+    """Return the compiled graph for a definition, reusing a cached copy when the content matches."""
+    content_hash = definition_hash(workflow_definition)
+    compiled = _compiled_cache.get(content_hash)
+    if compiled is not None:
+        _compiled_cache.move_to_end(content_hash)
+        return compiled
+
+    compiled = _build(workflow_definition, content_hash)
+    _compiled_cache[content_hash] = compiled
+    if len(_compiled_cache) > _CACHE_MAX_SIZE:
+        _compiled_cache.popitem(last=False)
+    return compiled
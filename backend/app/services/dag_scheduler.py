@@ -0,0 +1,100 @@
+"""DAG scheduler - fan-out, join barriers and dead-path elimination over a CompiledWorkflow"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.services.compiled_workflow import CompiledWorkflow
+
+# Node types that wait for every incoming branch before running (AND-join)
+JOIN_NODE_TYPES = {"merge"}
+
+# (node_id, ids of the upstream nodes whose output feeds it)
+ReadyNode = Tuple[str, List[str]]
+
+
+class DagScheduler:
+    """
+    Tracks which incoming edges of each node have been resolved during one run.
+
+    An edge is resolved either live (its source completed and selected it) or dead
+    (its source was skipped, or a conditional/approval chose another handle).
+    Regular nodes start on their first live edge; join nodes start once every
+    incoming edge is resolved. Nodes whose incoming edges are all dead are skipped
+    and propagate dead edges downstream, so joins never wait on a branch that
+    cannot run.
+    """
+
+    def __init__(self, graph: CompiledWorkflow):
+        self.graph = graph
+        self.resolved: Dict[str, int] = {}
+        self.live_sources: Dict[str, List[str]] = {}
+        self.started: Set[str] = set()
+        self.skipped: Set[str] = set()
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-safe snapshot, carried across continue-as-new."""
+        return {
+            "resolved": dict(self.resolved),
+            "live_sources": {node_id: list(sources) for node_id, sources in self.live_sources.items()},
+            "started": sorted(self.started),
+            "skipped": sorted(self.skipped),
+        }
+
+    @classmethod
+    def from_state(cls, graph: CompiledWorkflow, state: Dict[str, Any]) -> "DagScheduler":
+        scheduler = cls(graph)
+        scheduler.resolved = dict(state.get("resolved", {}))
+        scheduler.live_sources = {node_id: list(sources) for node_id, sources in state.get("live_sources", {}).items()}
+        scheduler.started = set(state.get("started", []))
+        scheduler.skipped = set(state.get("skipped", []))
+        return scheduler
+
+    def start(self, node_id: str) -> ReadyNode:
+        """Mark the entry node as started."""
+        self.started.add(node_id)
+        return node_id, []
+
+    def complete(self, node_id: str, taken_targets: Optional[List[str]] = None) -> List[ReadyNode]:
+        """
+        Record that `node_id` finished. `taken_targets` limits which successors
+        receive a live edge (None means all of them). Returns nodes that became ready.
+        """
+        ready: List[ReadyNode] = []
+        for edge in self.graph.outgoing.get(node_id, []):
+            target_id = edge.get("target")
+            is_live = taken_targets is None or target_id in taken_targets
+            ready.extend(self._resolve_edge(target_id, node_id, is_live))
+        return ready
+
+    def skip(self, node_id: str) -> List[ReadyNode]:
+        """Mark `node_id` as never running and resolve its outgoing edges as dead."""
+        self.skipped.add(node_id)
+        ready: List[ReadyNode] = []
+        for edge in self.graph.outgoing.get(node_id, []):
+            ready.extend(self._resolve_edge(edge.get("target"), node_id, False))
+        return ready
+
+    def _resolve_edge(self, target_id: str, source_id: str, is_live: bool) -> List[ReadyNode]:
+        if target_id in self.started or target_id in self.skipped:
+            # Already decided (e.g. a second branch reaching a non-join node); back edges
+            # never get here, validate_workflow rejects cycles
+            return []
+
+        self.resolved[target_id] = self.resolved.get(target_id, 0) + 1
+        live_sources = self.live_sources.setdefault(target_id, [])
+        if is_live:
+            live_sources.append(source_id)
+        all_resolved = self.resolved[target_id] >= self.graph.in_degree.get(target_id, 0)
+
+        target = self.graph.get_node(target_id) or {}
+        if target.get("type") in JOIN_NODE_TYPES:
+            if not all_resolved:
+                return []
+            if live_sources:
+                self.started.add(target_id)
+                return [(target_id, list(live_sources))]
+            return self.skip(target_id)
+
+        if is_live:
+            self.started.add(target_id)
+            return [(target_id, [source_id])]
+        if all_resolved and not live_sources:
+            return self.skip(target_id)
+        return []
@@ -0,0 +1,98 @@
+"""Safe expression engine for conditional nodes - validated once, evaluated many times"""
+import ast
+from typing import Any, Dict, FrozenSet, Optional, Set
+from app.services.input_projection import ExpressionDependencies, analyze_expression
+
+# Names an expression can read
+CONTEXT_NAMES = ("output", "nodes", "input")
+
+SAFE_BUILTINS: Dict[str, Any] = {
+    "True": True, "False": False, "None": None,
+    "len": len, "str": str, "int": int, "float": float, "list": list, "dict": dict,
+    "abs": abs, "round": round, "max": max, "min": min, "sum": sum, "any": any, "all": all,
+}
+
+# Methods callable on values (dict/list/str). Anything that formats or reflects (format, mro...) is excluded.
+SAFE_METHODS: FrozenSet[str] = frozenset({
+    "get", "keys", "values", "items", "count", "index",
+    "lower", "upper", "strip", "lstrip", "rstrip", "startswith", "endswith", "split", "find", "replace", "join",
+    "isdigit", "isalpha", "isalnum", "title",
+})
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,  # no Pow: 9**9**9 never finishes
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Constant, ast.Name, ast.Load, ast.Store, ast.Attribute, ast.Subscript, ast.Slice,
+    ast.Call, ast.keyword, ast.List, ast.Tuple, ast.Dict, ast.Set,
+    ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp, ast.comprehension,
+)
+
+
+class ExpressionError(ValueError):
+    """An expression that uses syntax or names outside the whitelist."""
+
+
+class CompiledExpression:
+    """
+    A condition parsed and validated once. `evaluate` runs the compiled code
+    against output/nodes/input with only SAFE_BUILTINS in scope.
+    """
+    __slots__ = ("source", "dependencies", "error", "_code")
+
+    def __init__(self, source: str):
+        self.source = source
+        self.dependencies: ExpressionDependencies = analyze_expression(source)
+        self.error: Optional[str] = None
+        self._code = None
+        try:
+            tree = ast.parse(source, mode="eval")
+            _validate(tree)
+            self._code = compile(tree, "<condition>", "eval")
+        except SyntaxError as e:
+            self.error = f"Invalid syntax: {e.msg}"
+        except ExpressionError as e:
+            self.error = str(e)
+
+    @property
+    def node_refs(self) -> FrozenSet[str]:
+        """Node IDs the expression reads statically (see dependencies.all_nodes for dynamic access)."""
+        return self.dependencies.node_ids
+
+    def evaluate(self, output: Any = None, nodes: Optional[Dict[str, Any]] = None, input: Any = None) -> Any:
+        if self._code is None:
+            raise ExpressionError(self.error)
+        # Context goes in globals so comprehensions (their own scope) can see it too
+        return eval(self._code, {"__builtins__": SAFE_BUILTINS, "output": output, "nodes": nodes or {}, "input": input})
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.source!r}{', invalid' if self.error else ''})"
+
+
+def compile_expression(source: str) -> CompiledExpression:
+    return CompiledExpression(source)
+
+
+def _validate(tree: ast.Expression) -> None:
+    bound: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.comprehension):
+            for target in ast.walk(node.target):
+                if isinstance(target, ast.Name):
+                    bound.add(target.id)
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ExpressionError(f"'{type(node).__name__}' is not allowed in conditions")
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            if node.id not in CONTEXT_NAMES and node.id not in SAFE_BUILTINS and node.id not in bound:
+                raise ExpressionError(f"Unknown name '{node.id}'")
+        elif isinstance(node, ast.Attribute):
+            if node.attr.startswith("_") or node.attr not in SAFE_METHODS:
+                raise ExpressionError(f"Attribute '{node.attr}' is not allowed")
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if not (isinstance(func, ast.Name) and func.id in SAFE_BUILTINS) and not isinstance(func, ast.Attribute):
+                raise ExpressionError("Only the listed builtins and value methods can be called")
+            if any(kw.arg is None for kw in node.keywords):
+                raise ExpressionError("** arguments are not allowed")
@@ -0,0 +1,211 @@
+"""HTTP response cache for API call nodes - Cache-Control/ETag aware, opt-in per node"""
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+from app.core.config import settings
+from app.core.response_cache import build_cache
+
+# Request headers that change the response by default (the key hashes them, never stores them)
+DEFAULT_VARY_HEADERS = ("accept", "accept-language", "authorization")
+
+# Methods whose responses are cacheable without the node saying so; others may change state on every call
+SAFE_METHODS = ("GET", "HEAD")
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl_seconds: Optional[int] = None  # Explicit freshness; overrides the response's Cache-Control
+    vary_headers: Tuple[str, ...] = DEFAULT_VARY_HEADERS
+
+
+def cache_method_error(node_config: Dict[str, Any]) -> Optional[str]:
+    """Why the node's cache setting can't apply to its method, or None when it can."""
+    method = (node_config.get("method") or "POST").upper()
+    if node_config.get("cache") and method not in SAFE_METHODS and not node_config.get("cache_ttl_seconds"):
+        return f"caches {method} responses; only GET and HEAD are cached unless cache_ttl_seconds is set explicitly"
+    return None
+
+
+def cache_policy(node_config: Dict[str, Any]) -> Optional[CachePolicy]:
+    """
+    The node's cache policy, or None when caching is off for it. A POST/PUT/... is only
+    cached when the node also sets cache_ttl_seconds, declaring the request idempotent.
+    """
+    if not node_config.get("cache") or cache_method_error(node_config):
+        return None
+    vary = node_config.get("cache_vary_headers")
+    return CachePolicy(
+        ttl_seconds=node_config.get("cache_ttl_seconds"),
+        vary_headers=tuple(h.lower() for h in vary) if vary is not None else DEFAULT_VARY_HEADERS,
+    )
+
+
+def request_key(method: str, url: str, headers: Mapping[str, str], body: Any, vary_headers: Iterable[str]) -> str:
+    """Method, URL, the varying request headers and a hash of the body."""
+    lowered = {k.lower(): v for k, v in (headers or {}).items()}
+    body_hash = hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+    material = json.dumps({
+        "method": method.upper(),
+        "url": url,
+        "headers": {name: lowered.get(name) for name in sorted(vary_headers)},
+        "body": body_hash,
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def freshness_seconds(response_headers: Mapping[str, str], policy: CachePolicy) -> Optional[int]:
+    """
+    How long a response may be served without asking the origin, or None if it must not be stored.
+    A response with a validator but no freshness is stored as stale, so later calls revalidate it.
+    """
+    headers = {k.lower(): v for k, v in response_headers.items()}
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if policy.ttl_seconds is not None:
+        return max(0, int(policy.ttl_seconds))
+    if "no-cache" in directives:
+        return 0 if has_validator(headers) else None
+    max_age = directives.get("s-maxage") or directives.get("max-age")
+    if max_age is not None and max_age.isdigit():
+        return int(max_age)
+    return 0 if has_validator(headers) else None
+
+
+def has_validator(headers: Mapping[str, str]) -> bool:
+    return "etag" in headers or "last-modified" in headers
+
+
+class HttpResponseCache:
+    """
+    Cached API responses, keyed by request_key. Entries hold what the API node returns
+    (status, body, headers) plus validators; stale entries are kept for revalidation.
+    """
+
+    def __init__(self, store=None, max_entry_bytes: Optional[int] = None, stale_retention_seconds: Optional[int] = None):
+        self.store = store or build_cache("httpcache", settings.HTTP_CACHE_BACKEND, settings.HTTP_CACHE_MAX_BYTES)
+        self.max_entry_bytes = max_entry_bytes or settings.HTTP_CACHE_MAX_ENTRY_BYTES
+        self.stale_retention = stale_retention_seconds or settings.HTTP_CACHE_STALE_RETENTION_SECONDS
+        self.metrics: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,  # Stale entries confirmed by a 304
+            "stored": 0,
+            "not_storable": 0,  # no-store, no validator/freshness, non-200 or too large
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.store.get(key)
+        except Exception as e:
+            # The cache is an optimization: an unavailable store means a normal request
+            self.metrics["errors"] += 1
+            print(f"⚠️  HTTP cache lookup failed: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def put(self, key: str, status_code: int, body: Any, headers: Mapping[str, str],
+                  response_time_ms: float, policy: CachePolicy) -> bool:
+        """Store a response if its status and Cache-Control allow it."""
+        fresh_for = freshness_seconds(headers, policy) if status_code == 200 else None
+        if fresh_for is None:
+            self.metrics["not_storable"] += 1
+            return False
+        lowered = {k.lower(): v for k, v in headers.items()}
+        now = time.time()
+        entry = {
+            "status_code": status_code,
+            "body": body,
+            "headers": dict(headers),
+            "etag": lowered.get("etag"),
+            "last_modified": lowered.get("last-modified"),
+            "stored_at": now,
+            "fresh_until": now + fresh_for,
+            "response_time_ms": response_time_ms,
+        }
+        return await self._write(key, entry, fresh_for)
+
+    async def refresh(self, key: str, entry: Dict[str, Any], headers: Mapping[str, str], policy: CachePolicy) -> Dict[str, Any]:
+        """A 304 confirmed `entry`: restart its freshness from the new response headers."""
+        fresh_for = freshness_seconds({**entry["headers"], **headers}, policy) or 0
+        now = time.time()
+        entry = {**entry, "stored_at": now, "fresh_until": now + fresh_for}
+        await self._write(key, entry, fresh_for)
+        return entry
+
+    async def _write(self, key: str, entry: Dict[str, Any], fresh_for: int) -> bool:
+        value = json.dumps(entry, separators=(",", ":"), default=str)
+        if len(value) > self.max_entry_bytes:
+            self.metrics["not_storable"] += 1
+            return False
+        # Entries with a validator outlive their freshness so they can be revalidated
+        retention = fresh_for + (self.stale_retention if entry.get("etag") or entry.get("last_modified") else 0)
+        if retention <= 0:
+            self.metrics["not_storable"] += 1
+            return False
+        try:
+            self.metrics["evictions"] += await self.store.set(key, value, retention)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            print(f"⚠️  HTTP cache store failed: {e}")
+            return False
+        self.metrics["stored"] += 1
+        return True
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        return time.time() < entry.get("fresh_until", 0)
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def cached_result(entry: Dict[str, Any], status: str, url: str, response_time_ms: float) -> Dict[str, Any]:
+        """An API node result served from `entry`; `cache` marks it as a hit."""
+        return {
+            "status_code": entry["status_code"],
+            "body": entry["body"],
+            "headers": entry["headers"],
+            "url": url,
+            "response_time_ms": response_time_ms,
+            "cache": {
+                "hit": True,
+                "status": status,  # "hit" (fresh) or "revalidated" (304 from the origin)
+                "age_seconds": round(time.time() - entry["stored_at"], 3),
+                "origin_response_time_ms": entry.get("response_time_ms"),
+            },
+        }
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["revalidated"] + self.metrics["misses"]
+        try:
+            size = await self.store.size()
+        except Exception:
+            size = {}
+        return {
+            **self.metrics,
+            **size,
+            "hit_ratio": round((self.metrics["hits"] + self.metrics["revalidated"]) / lookups, 3) if lookups else None,
+        }
+
+
+http_response_cache = HttpResponseCache()
@@ -0,0 +1,116 @@
+"""Per-node input projection - the slice of workflow state each node actually reads"""
+import ast
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+from app.schemas.node_types import InputDependency, get_input_dependencies
+
+# Config key (and default) of the expression a REFERENCED_NODES node evaluates
+EXPRESSION_CONFIG_KEYS = {
+    "conditional": ("condition_expression", "False"),
+    "map": ("items_expression", "output"),
+}
+
+
+@dataclass(frozen=True)
+class NodeInputSpec:
+    """What to put in a node's activity context besides the execution identity."""
+    previous_output: bool = False
+    workflow_input: bool = False
+    branch_outputs: bool = False  # Outputs of the incoming branches, known only at run time
+    node_ids: FrozenSet[str] = frozenset()  # Specific upstream outputs
+    all_node_outputs: bool = False
+
+    def project_outputs(self, node_outputs: Dict[str, Any], branch_ids: Iterable[str] = ()) -> Dict[str, Any]:
+        """The subset of `node_outputs` this node may read."""
+        if self.all_node_outputs:
+            return node_outputs
+        wanted = set(self.node_ids)
+        if self.branch_outputs:
+            wanted.update(branch_ids)
+        return {node_id: node_outputs[node_id] for node_id in wanted if node_id in node_outputs}
+
+
+@dataclass(frozen=True)
+class ExpressionDependencies:
+    node_ids: FrozenSet[str] = frozenset()
+    all_nodes: bool = False  # `nodes` used in a way that can't be resolved statically
+    uses_output: bool = False
+    uses_input: bool = False
+
+
+def analyze_expression(expression: str) -> ExpressionDependencies:
+    """
+    Find the state a condition expression reads.
+    nodes["id"] and nodes.get("id") name a node statically; any other use of `nodes`
+    (a computed key, iteration, passing it to a function) depends on all outputs.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return ExpressionDependencies(all_nodes=True, uses_output=True, uses_input=True)
+
+    parents: Dict[ast.AST, ast.AST] = {}
+    for parent in ast.walk(tree):
+        for child in ast.iter_child_nodes(parent):
+            parents[child] = parent
+
+    node_ids = set()
+    all_nodes = uses_output = uses_input = False
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Name):
+            continue
+        if node.id == "output":
+            uses_output = True
+        elif node.id == "input":
+            uses_input = True
+        elif node.id == "nodes":
+            node_id = _static_node_key(node, parents)
+            if node_id is None:
+                all_nodes = True
+            else:
+                node_ids.add(node_id)
+    return ExpressionDependencies(frozenset(node_ids), all_nodes, uses_output, uses_input)
+
+
+def _static_node_key(name: ast.Name, parents: Dict[ast.AST, ast.AST]) -> Optional[str]:
+    parent = parents.get(name)
+    # nodes["id"]
+    if isinstance(parent, ast.Subscript) and parent.value is name:
+        key = parent.slice
+        return key.value if isinstance(key, ast.Constant) and isinstance(key.value, str) else None
+    # nodes.get("id"[, default])
+    if isinstance(parent, ast.Attribute) and parent.attr == "get":
+        call = parents.get(parent)
+        if isinstance(call, ast.Call) and call.func is parent and call.args:
+            key = call.args[0]
+            return key.value if isinstance(key, ast.Constant) and isinstance(key.value, str) else None
+    return None
+
+
+def input_spec_for(node: Dict[str, Any]) -> NodeInputSpec:
+    """Build the input spec of one node from its type's declared dependencies and its config."""
+    node_type = node.get("type", "unknown")
+    dependencies = get_input_dependencies(node_type)
+    node_ids: FrozenSet[str] = frozenset()
+    all_node_outputs = InputDependency.ALL_NODE_OUTPUTS in dependencies
+    previous_output = InputDependency.PREVIOUS_OUTPUT in dependencies
+    workflow_input = InputDependency.WORKFLOW_INPUT in dependencies
+    branch_outputs = InputDependency.BRANCH_OUTPUTS in dependencies
+
+    if InputDependency.REFERENCED_NODES in dependencies:
+        key, default = EXPRESSION_CONFIG_KEYS.get(node_type, EXPRESSION_CONFIG_KEYS["conditional"])
+        expression = node.get("data", {}).get("config", {}).get(key) or default
+        analysis = analyze_expression(expression)
+        node_ids = analysis.node_ids
+        all_node_outputs = all_node_outputs or analysis.all_nodes
+        # With branch outputs, `output` is the raw incoming result, which is already included
+        previous_output = previous_output or (analysis.uses_output and not branch_outputs)
+        workflow_input = workflow_input or analysis.uses_input
+
+    return NodeInputSpec(
+        previous_output=previous_output,
+        workflow_input=workflow_input,
+        branch_outputs=branch_outputs,
+        node_ids=node_ids,
+        all_node_outputs=all_node_outputs,
+    )
@@ -0,0 +1,41 @@
+"""JSONPath selection of parts of node outputs (e.g. the fields a node needs from a large API response)"""
+from functools import lru_cache
+from typing import Any, Optional
+from jsonpath_ng.ext import parse
+
+# Path syntax that can match more than one value; such paths always select a list
+MULTI_MATCH_TOKENS = ("*", "..", "?(", ":", ",")
+
+
+class JsonPathError(ValueError):
+    """Raised for paths that do not parse."""
+
+
+@lru_cache(maxsize=256)
+def compile_path(path: str):
+    """Parsed once per distinct path, per worker."""
+    try:
+        return parse(path)
+    except Exception as e:  # Lexer/parser errors, and ValueErrors for some malformed filters
+        raise JsonPathError(f"Invalid JSONPath '{path}': {e}") from e
+
+
+def path_error(path: str) -> Optional[str]:
+    """The parse error for `path`, or None if it is valid."""
+    try:
+        compile_path(path)
+    except JsonPathError as e:
+        return str(e)
+    return None
+
+
+def select(value: Any, path: str) -> Any:
+    """
+    The part of `value` at `path`. A path that names one field ("$.data.user.name")
+    gives that value, or None when it is missing; wildcards, filters, slices and
+    recursive descent give the list of matches.
+    """
+    matches = [match.value for match in compile_path(path).find(value)]
+    if any(token in path for token in MULTI_MATCH_TOKENS):
+        return matches
+    return matches[0] if matches else None
@@ -0,0 +1,102 @@
+"""Exact-match response cache for agent nodes - opt-in per node, for deterministic requests"""
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.response_cache import build_cache
+
+
+def llm_request_key(provider: str, model: str, request: Any, temperature: Optional[float],
+                    expected_output_format: Optional[str]) -> str:
+    """
+    Everything that shapes the provider's answer. `request` is what is sent: the chat
+    messages for OpenAI, the input payload for Lyzr and custom providers.
+    """
+    material = json.dumps({
+        "provider": provider,
+        "model": model,
+        "request": request,
+        "temperature": temperature,
+        "expected_output_format": expected_output_format,
+    }, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Agent results keyed by llm_request_key. Only successful calls are stored; a hit
+    returns the stored result with no new cost and a `cache` block saying what it saved.
+    """
+
+    def __init__(self, store=None, ttl_seconds: Optional[int] = None, max_entry_bytes: Optional[int] = None):
+        self.store = store or build_cache("llmcache", settings.LLM_CACHE_BACKEND, settings.LLM_CACHE_MAX_BYTES)
+        self.ttl_seconds = ttl_seconds or settings.LLM_CACHE_TTL_SECONDS
+        self.max_entry_bytes = max_entry_bytes or settings.LLM_CACHE_MAX_ENTRY_BYTES
+        self.metrics: Dict[str, Any] = {
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "not_storable": 0,  # Over max_entry_bytes
+            "evictions": 0,
+            "errors": 0,
+            "cost_saved": 0.0,  # Provider cost of the responses served from the cache
+        }
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self.store.get(key)
+        except Exception as e:
+            # The cache is an optimization: an unavailable store means a normal provider call
+            self.metrics["errors"] += 1
+            print(f"⚠️  LLM cache lookup failed: {e}")
+            return None
+        if raw is None:
+            self.metrics["misses"] += 1
+            return None
+        self.metrics["hits"] += 1
+        return json.loads(raw)
+
+    async def put(self, key: str, result: Dict[str, Any], ttl_seconds: Optional[int] = None) -> bool:
+        value = json.dumps({"result": result, "stored_at": time.time()}, separators=(",", ":"), default=str)
+        if len(value) > self.max_entry_bytes:
+            self.metrics["not_storable"] += 1
+            return False
+        try:
+            self.metrics["evictions"] += await self.store.set(key, value, ttl_seconds or self.ttl_seconds)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            print(f"⚠️  LLM cache store failed: {e}")
+            return False
+        self.metrics["stored"] += 1
+        return True
+
+    def cached_result(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """The agent result served from `entry`; its original cost is counted as saved."""
+        cost_saved = entry["result"].get("cost") or 0.0
+        self.metrics["cost_saved"] += cost_saved
+        return {
+            **entry["result"],
+            "cost": 0.0,
+            "cache": {
+                "hit": True,
+                "age_seconds": round(time.time() - entry["stored_at"], 3),
+                "cost_saved": cost_saved,
+            },
+        }
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        try:
+            size = await self.store.size()
+        except Exception:
+            size = {}
+        return {
+            **self.metrics,
+            **size,
+            "cost_saved": round(self.metrics["cost_saved"], 6),
+            "hit_ratio": round(self.metrics["hits"] / lookups, 3) if lookups else None,
+        }
+
+
+llm_response_cache = LLMResponseCache()
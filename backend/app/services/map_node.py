@@ -0,0 +1,126 @@
+"""Map node - runs a chain of steps over every item of a list, in batches"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.output_mapper import output_mapper
+
+# Node types a map step can be (each runs through its activity function, per item)
+MAP_STEP_TYPES = ("agent", "api_call", "eval", "event")
+
+# Defaults are constants rather than settings: the workflow plans batches and shards
+# from them, and replays must see the same values.
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_ITEM_MAX_ATTEMPTS = 3
+DEFAULT_ITEM_RETRY_INTERVAL_SECONDS = 1.0
+DEFAULT_SHARD_SIZE = 1000  # Items per child workflow once a list is larger than this
+DEFAULT_MAX_CONCURRENT_SHARDS = 4
+
+
+@dataclass(frozen=True)
+class MapSettings:
+    items_expression: str = "output"
+    steps: Tuple[Dict[str, Any], ...] = ()
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY  # Items in flight at once, across all batches
+    batch_size: int = DEFAULT_BATCH_SIZE  # Items per batch activity
+    item_max_attempts: int = DEFAULT_ITEM_MAX_ATTEMPTS
+    item_retry_interval_seconds: float = DEFAULT_ITEM_RETRY_INTERVAL_SECONDS
+    on_item_failure: str = "fail"  # "fail" the node, or "continue" with partial results
+    shard_size: int = DEFAULT_SHARD_SIZE
+    max_concurrent_shards: int = DEFAULT_MAX_CONCURRENT_SHARDS
+
+    @property
+    def batches_in_flight(self) -> int:
+        """Concurrent batch activities; each runs up to item_concurrency items at once."""
+        return max(1, self.max_concurrency // self.batch_size)
+
+    @property
+    def item_concurrency(self) -> int:
+        return max(1, min(self.batch_size, self.max_concurrency))
+
+    @property
+    def batches_per_shard(self) -> int:
+        return max(1, self.shard_size // self.batch_size)
+
+
+def map_settings(node: Dict[str, Any]) -> MapSettings:
+    config = node.get("data", {}).get("config", {})
+    return MapSettings(
+        items_expression=config.get("items_expression") or "output",
+        steps=tuple(config.get("steps") or ()),
+        max_concurrency=max(1, int(config.get("max_concurrency") or DEFAULT_MAX_CONCURRENCY)),
+        batch_size=max(1, int(config.get("batch_size") or DEFAULT_BATCH_SIZE)),
+        item_max_attempts=max(1, int(config.get("item_max_attempts") or DEFAULT_ITEM_MAX_ATTEMPTS)),
+        item_retry_interval_seconds=float(config.get("item_retry_interval_seconds", DEFAULT_ITEM_RETRY_INTERVAL_SECONDS)),
+        on_item_failure=config.get("on_item_failure", "fail"),
+        shard_size=max(1, int(config.get("shard_size") or DEFAULT_SHARD_SIZE)),
+        max_concurrent_shards=max(1, int(config.get("max_concurrent_shards") or DEFAULT_MAX_CONCURRENT_SHARDS)),
+    )
+
+
+def validate_map_node(node: Dict[str, Any]) -> List[str]:
+    """Config problems of a map node, as messages without the node label."""
+    config = node.get("data", {}).get("config", {})
+    steps = config.get("steps") or []
+    if not steps:
+        return ["has no steps to run for each item"]
+    errors = []
+    for index, step in enumerate(steps):
+        if step.get("type") not in MAP_STEP_TYPES:
+            errors.append(f"step {index + 1} has unsupported type '{step.get('type')}' (use one of {', '.join(MAP_STEP_TYPES)})")
+    return errors
+
+
+def split_batches(items: List[Any], batch_size: int) -> List[List[Any]]:
+    return [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+
+def plan_shards(batch_count: int, batches_per_shard: int) -> List[Tuple[int, int]]:
+    """(first_batch, batch_count) of each child workflow, in order."""
+    return [
+        (start, min(batches_per_shard, batch_count - start))
+        for start in range(0, batch_count, batches_per_shard)
+    ]
+
+
+def step_node(map_node_id: str, step: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """A step as a regular node, so the node type's activity can run it."""
+    step_id = step.get("id") or f"step-{index + 1}"
+    return {**step, "id": f"{map_node_id}.{step_id}", "data": step.get("data") or {"config": step.get("config", {})}}
+
+
+def item_input(node_id: str, index: int, item: Any, total_items: int, step_type: str) -> Any:
+    """Input of an item's first step: the item as a loop iteration, mapped like any loop output."""
+    loop_output = output_mapper.map_output(
+        node_type="loop",
+        raw_output={"iteration": index + 1, "current_item": item, "has_more": index + 1 < total_items,
+                     "total_items": total_items, "items_processed": index},
+        node_id=node_id,
+    )
+    return output_mapper.extract_for_target(loop_output, step_type)
+
+
+def step_input(step: Dict[str, Any], result: Any, next_type: str) -> Any:
+    """Input of the next step from the previous step's raw result."""
+    mapped = output_mapper.map_output(node_type=step.get("type", "unknown"), raw_output=result, node_id=step.get("id", ""))
+    return output_mapper.extract_for_target(mapped, next_type)
+
+
+def build_map_output(results: List[Any], failed_items: List[Dict[str, Any]], total_items: int,
+                     sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Results in item order, shaped for both LoopOutput (iteration fields) and
+    MergeOutput (merged_data/sources/merge_strategy). Failed items have a None result.
+    """
+    return {
+        "iteration": total_items,
+        "current_item": None,
+        "has_more": False,
+        "total_items": total_items,
+        "items_processed": total_items - len(failed_items),
+        "merged_data": {"results": results},
+        "sources": sources or [],
+        "merge_strategy": "map",
+        "failed_items": failed_items,
+        "failed_count": len(failed_items),
+        "status": "partial" if failed_items else "success",
+    }
@@ -1,5 +1,5 @@
-import httpx
 from app.core.config import settings
+from app.core.http_client import http_client
 
 class NotificationService:
     async def send_approval(
@@ -23,48 +23,46 @@ class NotificationService:
         if not settings.SLACK_WEBHOOK_URL:
             raise ValueError("SLACK_WEBHOOK_URL not configured")
         
-        async with httpx.AsyncClient() as client:
-            await client.post(settings.SLACK_WEBHOOK_URL, 
-                json={
-                    "text": f"🔔 {title}",
-                    "blocks": [
-                        {
-                            "type": "section",
-                            "text": {"type": "mrkdwn", "text": f"*{title}*\n{description}"}
-                        },
-                        {
-                            "type": "actions",
-                            "elements": [
-                                {
-                                    "type": "button",
-                                    "text": {"type": "plain_text", "text": "✅ Approve"},
-                                    "style": "primary",
-                                    "url": f"{settings.FRONTEND_URL}/approve/{workflow_id}/{node_id}?action=approve"
-                                },
-                                {
-                                    "type": "button",
-                                    "text": {"type": "plain_text", "text": "❌ Reject"},
-                                    "style": "danger",
-                                    "url": f"{settings.FRONTEND_URL}/approve/{workflow_id}/{node_id}?action=reject"
-                                }
-                            ]
-                        }
-                    ]
-                }
-            )
+        await http_client.post(settings.SLACK_WEBHOOK_URL,
+            json={
+                "text": f"🔔 {title}",
+                "blocks": [
+                    {
+                        "type": "section",
+                        "text": {"type": "mrkdwn", "text": f"*{title}*\n{description}"}
+                    },
+                    {
+                        "type": "actions",
+                        "elements": [
+                            {
+                                "type": "button",
+                                "text": {"type": "plain_text", "text": "✅ Approve"},
+                                "style": "primary",
+                                "url": f"{settings.FRONTEND_URL}/approve/{workflow_id}/{node_id}?action=approve"
+                            },
+                            {
+                                "type": "button",
+                                "text": {"type": "plain_text", "text": "❌ Reject"},
+                                "style": "danger",
+                                "url": f"{settings.FRONTEND_URL}/approve/{workflow_id}/{node_id}?action=reject"
+                            }
+                        ]
+                    }
+                ]
+            }
+        )
     
     async def _send_email(self, approvers: list[str], title: str, description: str, workflow_id: str, node_id: str):
         """Send email via Resend"""
-        async with httpx.AsyncClient() as client:
-            for approver in approvers:
-                await client.post(
-                    "https://api.resend.com/emails",
-                    headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
-                    json={
-                        "from": settings.FROM_EMAIL,
-                        "to": [approver],
-                        "subject": title,
-                        "html": f"""
+        for approver in approvers:
+            await http_client.post(
+                "https://api.resend.com/emails",
+                headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
+                json={
+                    "from": settings.FROM_EMAIL,
+                    "to": [approver],
+                    "subject": title,
+                    "html": f"""
                         <h2>{title}</h2>
                         <p>{description}</p>
                         <a href="{settings.FRONTEND_URL}/approve/{workflow_id}/{node_id}?action=approve">
@@ -74,5 +72,5 @@ class NotificationService:
                             Reject
                         </a>
                         """
-                    }
-                )
+                }
+            )
\ No newline at end of file
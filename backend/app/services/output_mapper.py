@@ -5,11 +5,12 @@ from typing import Any, Dict, Type, Optional
 from datetime import datetime, timedelta
 from app.schemas.node_outputs import (
     BaseNodeOutput, TriggerOutput, AgentOutput, TimerOutput,
-    ConditionOutput, LoopOutput, MergeOutput, APICallOutput,
+    ConditionOutput, LoopOutput, MapOutput, MergeOutput, APICallOutput,
     EvalOutput, ApprovalOutput, EndOutput, EventOutput, MetaOutput, NodeOutput
 )
 import json
 import re
+from app.core.blob_store import is_blob_ref
 # from dateutil import parser as date_parser  # Temporarily disabled - Docker image doesn't have it
 
 
@@ -25,6 +26,7 @@ class OutputMapper:
         "timer": TimerOutput,
         "conditional": ConditionOutput,
         "loop": LoopOutput,
+        "map": MapOutput,
         "merge": MergeOutput,
         "api_call": APICallOutput,
         "eval": EvalOutput,
@@ -141,6 +143,10 @@ class OutputMapper:
                 "api_call": cls._loop_to_api,
                 "conditional": cls._loop_to_condition,
             },
+            "map": {
+                "agent": cls._map_to_agent,
+                "api_call": cls._map_to_api,
+            },
             "api_call": {
                 "agent": cls._api_to_agent,
                 "conditional": cls._api_to_condition,
@@ -348,11 +354,32 @@ class OutputMapper:
         """Loop → Condition: Check if has more items"""
         return output.has_more
     
+    # ==================== MAP CONVERSIONS ====================
+
+    @staticmethod
+    def _map_to_agent(output: MapOutput, config: Optional[Dict] = None) -> Any:
+        """Map → Agent: Pass every item's result"""
+        if isinstance(output.merged_data, str):
+            # Offloaded results: the agent activity resolves the reference and prompts with the JSON
+            return output.merged_data
+        return {
+            "prompt": f"Results for {output.total_items} items: {json.dumps(output.merged_data, indent=2, default=str)}",
+            "merged_data": output.merged_data
+        }
+
+    @staticmethod
+    def _map_to_api(output: MapOutput, config: Optional[Dict] = None) -> Dict[str, Any]:
+        """Map → API: Send the results"""
+        return {"body": output.merged_data}
+
     # ==================== API CALL CONVERSIONS ====================
     
     @staticmethod
     def _api_to_agent(output: APICallOutput, config: Optional[Dict] = None) -> Dict[str, Any]:
         """API → Agent: Pass response as context"""
+        if is_blob_ref(output.body):
+            # A large body stays a reference until the agent activity resolves it into the prompt
+            return {"api_response": output.body, "status_code": output.status_code}
         return {
             "prompt": f"API response (status {output.status_code}): {output.text_content}",
             "api_response": output.body,
@@ -34,29 +34,12 @@ class SelfHealingService:
         agent_id: str,
         success: bool,
         latency_ms: float,
-        cost: float = 0.0
+        cost: float = 0.0,
+        cache_miss: bool = False
     ):
-        """Record agent execution for scoring"""
+        """Record agent execution for scoring. `cache_miss`: the call went out after a cache lookup."""
         db = SessionLocal()
-        
-        score = db.query(AgentScore).filter(
-            AgentScore.provider == provider,
-            AgentScore.agent_id == agent_id
-        ).first()
-        
-        if not score:
-            score = AgentScore(
-                id=str(uuid4()),
-                provider=provider,
-                agent_id=agent_id,
-                execution_count=0,
-                success_count=0,
-                failure_count=0,
-                avg_latency_ms=0.0,
-                total_cost=0.0,
-                reliability_score=1.0
-            )
-            db.add(score)
+        score = self._get_or_create_score(db, provider, agent_id)
         
         # Update counts
         score.execution_count += 1
@@ -64,6 +47,8 @@ class SelfHealingService:
             score.success_count += 1
         else:
             score.failure_count += 1
+        if cache_miss:
+            score.cache_misses = (score.cache_misses or 0) + 1
         
         # Update average latency
         score.avg_latency_ms = (
@@ -80,6 +65,39 @@ class SelfHealingService:
         db.commit()
         db.close()
     
+    def record_cache_hit(self, provider: str, agent_id: str, cost_saved: float = 0.0):
+        """Record a response served from the LLM cache; it leaves latency and reliability alone."""
+        db = SessionLocal()
+        score = self._get_or_create_score(db, provider, agent_id)
+        score.cache_hits = (score.cache_hits or 0) + 1
+        score.cost_saved = (score.cost_saved or 0.0) + cost_saved
+        db.commit()
+        db.close()
+    
+    def _get_or_create_score(self, db, provider: str, agent_id: str) -> AgentScore:
+        score = db.query(AgentScore).filter(
+            AgentScore.provider == provider,
+            AgentScore.agent_id == agent_id
+        ).first()
+        
+        if not score:
+            score = AgentScore(
+                id=str(uuid4()),
+                provider=provider,
+                agent_id=agent_id,
+                execution_count=0,
+                success_count=0,
+                failure_count=0,
+                avg_latency_ms=0.0,
+                total_cost=0.0,
+                reliability_score=1.0,
+                cache_hits=0,
+                cache_misses=0,
+                cost_saved=0.0
+            )
+            db.add(score)
+        return score
+    
     def should_reroute(self, provider: str, agent_id: str) -> bool:
         """Check if agent should be replaced due to failures"""
         db = SessionLocal()
@@ -1,6 +1,11 @@
 # backend/app/services/validation.py
 
 from typing import List, Dict, Any
+from app.services.compiled_workflow import compile_workflow
+from app.services.expression_engine import compile_expression
+from app.services.http_cache import cache_method_error
+from app.services.json_path import path_error
+from app.services.map_node import validate_map_node
 
 def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
     """
@@ -10,8 +15,8 @@ def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
     errors = []
     nodes = workflow_definition.get("nodes", [])
     edges = workflow_definition.get("edges", [])
-    node_ids = {node.get("id") for node in nodes}
-    node_map = {node.get("id"): node for node in nodes} # For easier lookup
+    graph = compile_workflow(workflow_definition)
+    node_ids = set(graph.node_map)
 
     if not any(node.get("type") == "trigger" for node in nodes):
         errors.append("Workflow must have at least one 'trigger' node.")
@@ -19,20 +24,20 @@ def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
          errors.append("Workflow must have at least one 'end' node.")
 
     # Check for orphaned nodes (nodes with no connections unless trigger/end)
-    connected_node_ids = set()
-    for edge in edges:
-        connected_node_ids.add(edge.get("source"))
-        connected_node_ids.add(edge.get("target"))
-
     for node in nodes:
         node_id = node.get("id")
         node_type = node.get("type")
         label = node.get("data", {}).get("label", node_id)
 
-        if node_type not in ["trigger", "end"] and node_id not in connected_node_ids:
+        is_connected = bool(graph.outgoing.get(node_id)) or graph.in_degree.get(node_id, 0) > 0
+        if node_type not in ["trigger", "end"] and not is_connected:
              # Allow disconnected nodes if explicitly configured? For now, flag them.
              errors.append(f"Node '{label}' ({node_id}) is not connected to the workflow.")
 
+    # Each node runs at most once per execution, so an edge back into the path is never followed
+    cycle = graph.find_cycle()
+    if cycle:
+        errors.append(f"Workflow contains a cycle ({' → '.join(cycle)}); loops are not supported, use a map node to repeat steps.")
 
     for node in nodes:
         node_id = node.get("id")
@@ -45,8 +50,8 @@ def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
             errors.append(f"A node is missing an ID or type: {node}")
             continue
 
-        outgoing_edges = [edge for edge in edges if edge.get("source") == node_id]
-        incoming_edges = [edge for edge in edges if edge.get("target") == node_id]
+        outgoing_edges = graph.outgoing.get(node_id, [])
+        incoming_edges = graph.incoming.get(node_id, [])
 
         # Connectivity checks
         if node_type != "trigger" and not incoming_edges:
@@ -57,12 +62,19 @@ def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
         # if node_type != "end" and not outgoing_edges:
         #     errors.append(f"Node '{label}' ({node_id}) has no outgoing connections.")
 
+        if config.get("input_path") and path_error(config["input_path"]):
+            errors.append(f"Node '{label}' ({node_id}) has an invalid input_path: {path_error(config['input_path'])}")
+
         # Type-specific validation
         if node_type == "api_call":
             if not config.get("url"):
                 errors.append(f"API Call node '{label}' ({node_id}) is missing a URL.")
             if not config.get("method"):
                  errors.append(f"API Call node '{label}' ({node_id}) is missing an HTTP method.")
+            if cache_method_error(config):
+                errors.append(f"API Call node '{label}' ({node_id}) {cache_method_error(config)}.")
+            if config.get("response_path") and path_error(config["response_path"]):
+                errors.append(f"API Call node '{label}' ({node_id}) has an invalid response_path: {path_error(config['response_path'])}")
 
         elif node_type == "approval":
             if not config.get("description") and not config.get("message"):
@@ -75,8 +87,17 @@ def validate_workflow(workflow_definition: Dict[str, Any]) -> List[str]:
         elif node_type == "conditional":
             if not config.get("condition_expression"):
                  errors.append(f"Conditional node '{label}' ({node_id}) is missing a condition expression.")
+            elif graph.condition(node_id).error:
+                 errors.append(f"Conditional node '{label}' ({node_id}) has an invalid condition expression: {graph.condition(node_id).error}")
             # Note: sourceHandle validation is optional - conditional nodes can have default paths
 
+        elif node_type == "map":
+            items_expression = compile_expression(config.get("items_expression") or "output")
+            if items_expression.error:
+                errors.append(f"Map node '{label}' ({node_id}) has an invalid items expression: {items_expression.error}")
+            for problem in validate_map_node(node):
+                errors.append(f"Map node '{label}' ({node_id}) {problem}.")
+
         elif node_type == "eval":
             if not config.get("eval_type"):
                 errors.append(f"Eval node '{label}' ({node_id}) is missing an evaluation type.")
@@ -3,8 +3,10 @@ from datetime import datetime, timezone
 import json
 from uuid import uuid4
 from temporalio import activity
+from temporalio.exceptions import ApplicationError
 import httpx
 import asyncio
+import time
 from typing import Any, Counter, Dict, List, Optional
 from app.services.agent_executor import AgentExecutor
 from app.services.eval_service import EvalService
@@ -14,6 +16,15 @@ from app.services.output_mapper import OutputMapper
 from app.core.database import SessionLocal
 from app.models.workflow import ApprovalRequest
 from app.core.events import event_bus
+from app.core.blob_store import blob_store, encode_value
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.services.http_cache import cache_policy, http_response_cache, request_key
+from app.services.expression_engine import compile_expression
+from app.services.json_path import select as select_json
+from app.services.map_node import (
+    build_map_output, item_input, map_settings, split_batches, step_input, step_node
+)
 
 eval_service = EvalService()
 compensation_service = CompensationService()
@@ -21,6 +32,19 @@ self_healing_service = SelfHealingService()
 agent_executor_util = AgentExecutor()
 output_mapper = OutputMapper()
 
+# Error bodies are quoted in the failure message up to this size
+API_ERROR_DETAIL_BYTES = 4096
+
+
+async def _node_input(node_config: dict, activity_context: dict) -> Any:
+    """
+    The node's previous output with blob references resolved. A node with an `input_path`
+    (JSONPath) gets only the selected part, e.g. "$.api_response.data[*].id" after an API call.
+    """
+    previous_output = await blob_store.resolve(activity_context.get("previous_output", {}))
+    input_path = node_config.get("input_path")
+    return select_json(previous_output, input_path) if input_path else previous_output
+
 @activity.defn
 async def execute_agent_node(node: dict, activity_context: dict) -> dict:
     """Execute agent node with intelligent input mapping."""
@@ -39,7 +63,8 @@ async def execute_agent_node(node: dict, activity_context: dict) -> dict:
     
     # ✅ USE OUTPUT MAPPER to intelligently extract input
     # The previous_output is already a mapped BaseNodeOutput from workflow
-    previous_output = activity_context.get("previous_output", {})
+    # Large upstream values arrive as blob references; only this node's input is fetched
+    previous_output = await _node_input(node_config, activity_context)
     
     # 🔍 DEBUG: Log what we received
     print(f"=== DEBUG AGENT {name} ===")
@@ -89,10 +114,15 @@ async def execute_agent_node(node: dict, activity_context: dict) -> dict:
         temperature=temperature,
         expected_output_format=expected_output_format,
         provider=provider,
-        agent_id=agent_id
+        agent_id=agent_id,
+        cache=node_config.get("cache", False),
+        cache_ttl_seconds=node_config.get("cache_ttl_seconds"),
+        cache_sampled=node_config.get("cache_sampled", False),
+        # Unset: nodes whose answers are cached also accept a concurrent identical call's answer
+        coalesce=node_config.get("coalesce")
     )
 
-    return result
+    return await blob_store.offload(result)
 
 @activity.defn
 async def get_fallback_agent(provider: str, failed_agent_id: str, all_agent_ids: List[str]) -> Optional[str]:
@@ -130,7 +160,7 @@ async def execute_api_call_node(node: dict, activity_context: dict) -> dict:
         raise ValueError(f"API Call node '{name}' requires a URL")
 
     # ✅ USE OUTPUT MAPPER to intelligently format request body
-    previous_output = activity_context.get("previous_output", {})
+    previous_output = await _node_input(node_config, activity_context)
     
     # Start with config body as base
     request_body = {**body}
@@ -163,30 +193,104 @@ async def execute_api_call_node(node: dict, activity_context: dict) -> dict:
     activity.logger.info(f"Executing API call '{name}' to {method} {url}")
     activity.logger.debug(f"Request body: {request_body}")
 
+    request_json = request_body if method != "GET" else None
+    max_response_bytes = node_config.get("max_response_bytes") or settings.API_RESPONSE_MAX_BYTES
+    # Opt-in response cache: fresh entries skip the request, stale ones are revalidated
+    policy = cache_policy(node_config)
+    cache_key = request_key(method, url, headers, request_json, policy.vary_headers) if policy else None
+    cached = await http_response_cache.get(cache_key) if policy else None
+    started = time.perf_counter()
+    if cached and http_response_cache.is_fresh(cached):
+        http_response_cache.metrics["hits"] += 1
+        activity.logger.info(f"API call '{name}' served from cache")
+        result = http_response_cache.cached_result(cached, "hit", url, round((time.perf_counter() - started) * 1000, 2))
+        return await _shape_api_result(result, node_config)
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                json=request_body if method != "GET" else None,
-                headers=headers,
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            result = {
-                "status_code": response.status_code,
-                "body": response.json() if response.headers.get("content-type", "").startswith("application/json") else response.text,
-                "headers": dict(response.headers)
-            }
-        activity.logger.info(f"API call '{name}' successful: Status {result['status_code']}")
-        return result
-    except httpx.HTTPStatusError as e:
-        activity.logger.error(f"API call '{name}' failed: Status {e.response.status_code}, Response: {e.response.text}")
-        raise RuntimeError(f"API call failed with status {e.response.status_code}: {e.response.text}") from e
+        # Pooled keep-alive connections, shared by every activity in this worker.
+        # The body is streamed in and capped, so an oversized response never sits in memory whole.
+        async with http_client.stream(
+            method=method,
+            url=url,
+            json=request_json,
+            headers={**headers, **(http_response_cache.conditional_headers(cached) if cached else {})},
+            timeout=60.0,
+        ) as response:
+            response_time_ms = round((time.perf_counter() - started) * 1000, 2)
+            if cached and response.status_code == 304:
+                http_response_cache.metrics["revalidated"] += 1
+                cached = await http_response_cache.refresh(cache_key, cached, response.headers, policy)
+                activity.logger.info(f"API call '{name}' revalidated cached response (304)")
+                return await _shape_api_result(http_response_cache.cached_result(cached, "revalidated", url, response_time_ms), node_config)
+            if response.is_error:
+                detail = await _read_body_prefix(response, API_ERROR_DETAIL_BYTES)
+                activity.logger.error(f"API call '{name}' failed: Status {response.status_code}, Response: {detail}")
+                raise RuntimeError(f"API call failed with status {response.status_code}: {detail}")
+            raw = await _read_capped_body(response, max_response_bytes, name)
+            is_json = response.headers.get("content-type", "").startswith("application/json")
+            body = (json.loads(raw) if raw else None) if is_json else raw.decode(response.encoding or "utf-8", errors="replace")
+            response_headers = dict(response.headers)
     except httpx.RequestError as e:
         activity.logger.error(f"API call '{name}' request error: {e}")
         raise RuntimeError(f"API call request error: {e}") from e
 
+    result = {
+        "status_code": response.status_code,
+        "body": body,
+        "headers": response_headers,
+        "url": url,
+        "response_time_ms": response_time_ms,
+        "body_bytes": len(raw),
+    }
+    if policy:
+        http_response_cache.metrics["misses"] += 1
+        stored = await http_response_cache.put(cache_key, result["status_code"], body, response_headers, response_time_ms, policy)
+        result["cache"] = {"hit": False, "status": "miss", "stored": stored}
+    activity.logger.info(f"API call '{name}' successful: Status {result['status_code']}, {len(raw)} bytes")
+    return await _shape_api_result(result, node_config, raw if is_json else None)
+
+
+async def _read_capped_body(response: httpx.Response, max_bytes: int, name: str) -> bytes:
+    """Read a streamed body, failing as soon as it passes `max_bytes` (retrying would not help)."""
+    declared = response.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise ApplicationError(f"API call '{name}' response is {declared} bytes, over the {max_bytes} byte limit", non_retryable=True)
+    chunks, size = [], 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > max_bytes:
+            raise ApplicationError(f"API call '{name}' response is over the {max_bytes} byte limit", non_retryable=True)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _read_body_prefix(response: httpx.Response, max_bytes: int) -> str:
+    """The start of an error body, for the failure message."""
+    prefix = b""
+    async for chunk in response.aiter_bytes():
+        prefix += chunk
+        if len(prefix) >= max_bytes:
+            break
+    return prefix[:max_bytes].decode(response.encoding or "utf-8", errors="replace")
+
+
+async def _shape_api_result(result: dict, node_config: dict, raw_json: Optional[bytes] = None) -> dict:
+    """
+    What an API node hands to the workflow: the configured headers only, the `response_path`
+    selection of the body, and the body as a blob reference when it is over the inline limit.
+    `raw_json` is the body as received, stored as-is when nothing was selected from it.
+    """
+    keep = {h.lower() for h in (node_config.get("response_headers") or settings.API_RESPONSE_HEADERS)}
+    result = {**result, "headers": {k: v for k, v in result["headers"].items() if k.lower() in keep}}
+    response_path = node_config.get("response_path")
+    if response_path:
+        result["body"] = select_json(result["body"], response_path)
+        raw_json = None
+    data = raw_json if raw_json is not None else encode_value(result["body"])
+    if len(data) > (node_config.get("max_inline_bytes") or settings.API_RESPONSE_INLINE_BYTES):
+        result["body"] = await blob_store.put(result["body"], data)
+    return result
+
 
 @activity.defn
 async def execute_merge_node(node: dict, activity_context: dict) -> dict:
@@ -197,6 +301,7 @@ async def execute_merge_node(node: dict, activity_context: dict) -> dict:
     name = node_config.get("name", "Unnamed Merge")
     merge_strategy = node_config.get("merge_strategy", "combine")
     
+    # Branch results are merged as-is: blob references are content hashes, so "vote" can compare them unresolved
     node_outputs = activity_context.get("node_outputs", {})
     incoming_branch_node_ids = activity_context.get("incoming_branch_node_ids", [])
     branch_results = [node_outputs.get(branch_id) for branch_id in incoming_branch_node_ids if branch_id in node_outputs]
@@ -234,7 +339,111 @@ async def execute_merge_node(node: dict, activity_context: dict) -> dict:
         merged_result = {"merged_results": branch_results}
 
     activity.logger.info(f"Merge '{name}' completed")
-    return merged_result
+    return await blob_store.offload(merged_result)
+
+
+# --- Map node: items are stored in batches, each batch runs as one activity ---
+
+@activity.defn
+async def prepare_map_items(node: dict, activity_context: dict) -> dict:
+    """Select the list to map over and store it in batches, so only references travel through history."""
+    config = map_settings(node)
+    node_outputs = activity_context.get("node_outputs", {})
+    source_ids = activity_context.get("incoming_branch_node_ids", [])
+    incoming = node_outputs.get(source_ids[0]) if source_ids else activity_context.get("input")
+
+    expression = compile_expression(config.items_expression)
+    items = expression.evaluate(
+        output=await blob_store.resolve(incoming),
+        nodes=await blob_store.resolve(node_outputs),
+        input=activity_context.get("input"),
+    )
+    if isinstance(items, tuple):
+        items = list(items)
+    if not isinstance(items, list):
+        raise ValueError(f"Map items expression '{config.items_expression}' returned {type(items).__name__}, expected a list")
+
+    batches = [await blob_store.put(batch) for batch in split_batches(items, config.batch_size)]
+    activity.logger.info(f"🗂️ Map node {node.get('id')}: {len(items)} items in {len(batches)} batches")
+    return {"total_items": len(items), "batches": batches}
+
+
+async def _run_map_step(step: dict, previous_output: Any, activity_context: dict) -> Any:
+    step_type = step.get("type")
+    context = {**activity_context, "current_node_id": step["id"], "previous_output": previous_output}
+    if step_type == "agent":
+        return await execute_agent_node(step, context)
+    if step_type == "api_call":
+        return await execute_api_call_node(step, context)
+    if step_type == "event":
+        return await execute_event_node(step, context)
+    if step_type == "eval":
+        result = await execute_eval_node(step, context)
+        # Same outcomes as an eval node in the workflow: only "warn" lets a failed eval through
+        if not result.get("passed", False) and result.get("on_failure", "block") != "warn":
+            raise ValueError(f"Eval failed: {result.get('reason', 'Evaluation failed')}")
+        return result
+    raise ValueError(f"Unsupported map step type: {step_type}")
+
+
+async def _run_map_item(node: dict, steps: List[dict], index: int, item: Any, total_items: int, activity_context: dict) -> Any:
+    previous_output = item_input(node.get("id", ""), index, item, total_items, steps[0].get("type"))
+    result: Any = None
+    for position, step in enumerate(steps):
+        result = await _run_map_step(step, previous_output, activity_context)
+        if position + 1 < len(steps):
+            previous_output = step_input(step, result, steps[position + 1].get("type"))
+    return result
+
+
+@activity.defn
+async def execute_map_batch(node: dict, batch_ref: str, start_index: int, total_items: int, activity_context: dict) -> dict:
+    """
+    Run the map steps over one batch of items. Each item is retried on its own; an item that
+    still fails is reported rather than raised, so a retry of this activity never redoes the batch.
+    """
+    config = map_settings(node)
+    node_id = node.get("id", "")
+    steps = [step_node(node_id, step, index) for index, step in enumerate(config.steps)]
+    items = await blob_store.get(batch_ref)
+    semaphore = asyncio.Semaphore(config.item_concurrency)
+
+    async def run_item(offset: int, item: Any) -> Dict[str, Any]:
+        index = start_index + offset
+        async with semaphore:
+            for attempt in range(1, config.item_max_attempts + 1):
+                try:
+                    return {"result": await _run_map_item(node, steps, index, item, total_items, activity_context)}
+                except Exception as e:
+                    activity.logger.warning(f"Map node {node_id} item {index} attempt {attempt}/{config.item_max_attempts} failed: {e}")
+                    if attempt == config.item_max_attempts:
+                        return {"failed": {"index": index, "error": str(e), "attempts": attempt}}
+                    await asyncio.sleep(min(config.item_retry_interval_seconds * 2 ** (attempt - 1), 10.0))
+
+    outcomes = await asyncio.gather(*(run_item(offset, item) for offset, item in enumerate(items)))
+    failed = [outcome["failed"] for outcome in outcomes if "failed" in outcome]
+    results = [outcome.get("result") for outcome in outcomes]
+    activity.logger.info(f"Map node {node_id} batch at {start_index}: {len(items) - len(failed)}/{len(items)} items succeeded")
+    # Results always go to the blob store: the workflow only ever holds one reference per batch
+    return {"start_index": start_index, "count": len(items), "results": await blob_store.put(results), "failed": failed}
+
+
+@activity.defn
+async def collect_map_results(node: dict, batch_outputs: List[dict], total_items: int, activity_context: dict) -> dict:
+    """Join the batch results in item order into the map node's output."""
+    results: List[Any] = []
+    failed: List[Dict[str, Any]] = []
+    for batch in sorted(batch_outputs, key=lambda batch: batch["start_index"]):
+        results.extend(await blob_store.get(batch["results"]))
+        failed.extend(batch.get("failed", []))
+    output = build_map_output(results, failed, total_items, activity_context.get("incoming_branch_node_ids", []))
+    return await blob_store.offload(output)
+
+
+@activity.defn
+async def resolve_blob_refs(value: Any) -> Any:
+    """Loads the blob references in `value`, for the few places workflow code needs the content itself."""
+    return await blob_store.resolve(value)
 
 
 # --- NEW: publish_generic_event Activity ---
@@ -252,6 +461,18 @@ async def publish_generic_event(event_type: str, data: Dict[str, Any]):
         # Return a structured failure result rather than raising so workflow can decide retry behavior
         return {"status": "failed", "event_type": event_type, "error": str(e)}
 
+@activity.defn
+async def publish_event_batch(events: List[Dict[str, Any]]) -> dict:
+    """Publishes a batch of buffered workflow events to the event bus, in order."""
+    try:
+        await event_bus.publish_many([(event.get("event_type", ""), event.get("data", {})) for event in events])
+        activity.logger.info(f"✅ Published {len(events)} batched events")
+        return {"status": "published", "published": len(events)}
+    except Exception as e:
+        activity.logger.error(f"❌ Failed to publish batch of {len(events)} events: {e}")
+        # Like publish_generic_event, report failure instead of raising so the workflow isn't blocked on the UI stream
+        return {"status": "failed", "published": 0, "error": str(e)}
+
 @activity.defn
 async def send_approval_request(node: dict, activity_context: dict) -> dict:
     """Send approval request (UI or external). Now uses activity_context."""
@@ -272,7 +493,9 @@ async def send_approval_request(node: dict, activity_context: dict) -> dict:
     approval_id = str(uuid4())
     workflow_id = activity_context.get("workflow_id")
     execution_id = activity_context.get("execution_id")
-    previous_output = activity_context.get("node_outputs", {}).get(activity_context.get("previous_node_id")) # Or get from history
+    previous_output = await blob_store.resolve(
+        activity_context.get("node_outputs", {}).get(activity_context.get("previous_node_id"))  # Or get from history
+    )
 
     # Persist the request state
     db = SessionLocal()
@@ -324,7 +547,7 @@ async def execute_eval_node(node: dict, activity_context: dict) -> dict:
     on_failure = node_config.get("on_failure", "block")
     
     # ✅ USE OUTPUT MAPPER to extract evaluation target
-    previous_output = activity_context.get("previous_output", {})
+    previous_output = await _node_input(node_config, activity_context)
     
     # Extract the actual content to evaluate based on previous node type
     if isinstance(previous_output, dict):
@@ -380,7 +603,7 @@ async def execute_event_node(node: dict, activity_context: dict) -> dict:
     if not channel:
          raise ValueError(f"Event node '{name}' requires a 'channel' in its config")
 
-    previous_output = activity_context.get("previous_output", {})
+    previous_output = await _node_input(node_config, activity_context)
 
     if operation == "publish":
         payload = {
@@ -456,7 +679,7 @@ async def request_ui_approval(node: dict, activity_context: dict) -> dict:
     required_fields = node_config.get("required_fields", [])  # For form type
     
     # ✅ USE OUTPUT MAPPER to format context intelligently
-    previous_output = activity_context.get("previous_output", {})
+    previous_output = await _node_input(node_config, activity_context)
     
     # Build rich context for human reviewer
     context = {"raw": previous_output}
@@ -2,26 +2,33 @@
 
 import asyncio
 import os
-from temporalio.client import Client
-from temporalio.service import TLSConfig
 from temporalio.worker import Worker
 from app.core.config import settings
-from app.temporal.workflows import OrchestrationWorkflow
+from app.core.temporal_client import connect_temporal
+from app.core.event_log_writer import event_log_writer
+from app.core.http_client import http_client
+from app.core.worker_metrics import WorkerMetricsReporter
+from app.temporal.workflows import MapShardWorkflow, OrchestrationWorkflow
 
 # Import ALL necessary activities
 from app.temporal.activities import (
+    collect_map_results,
     compensate_node,
     execute_agent_node,
     execute_api_call_node,
     execute_eval_node,
     execute_event_node,
+    execute_map_batch,
     execute_merge_node,
     execute_meta_node,
     execute_timer_node,
     get_fallback_agent,
+    prepare_map_items,
+    publish_event_batch,
     publish_generic_event,
     publish_workflow_status,
     request_ui_approval,
+    resolve_blob_refs,
 )
 
 async def main():
@@ -30,77 +37,59 @@ async def main():
     print(f"📡 Connecting to: {settings.TEMPORAL_HOST}")
     print(f"🔧 Namespace: {settings.TEMPORAL_NAMESPACE}")
     
-    # Modern approach: API Key authentication (recommended)
-    if settings.TEMPORAL_API_KEY:
-        print("🔑 Using API Key authentication for Temporal Cloud")
-        client = await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE,
-            api_key=settings.TEMPORAL_API_KEY,
-            tls=True,  # Enable TLS for Temporal Cloud
-        )
-    # Legacy approach: mTLS certificates
-    elif settings.TEMPORAL_TLS_CERT and settings.TEMPORAL_TLS_KEY:
-        print("🔐 Using mTLS certificate authentication")
-        try:
-            with open(settings.TEMPORAL_TLS_CERT, 'rb') as f:
-                client_cert = f.read()
-            with open(settings.TEMPORAL_TLS_KEY, 'rb') as f:
-                client_key = f.read()
-            tls_config = TLSConfig(
-                client_cert=client_cert,
-                client_private_key=client_key,
-            )
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE,
-                tls=tls_config
-            )
-        except FileNotFoundError as e:
-            print(f"❌ TLS certificate files not found: {e}")
-            print("⚠️  Falling back to unauthenticated connection (local dev only)")
-            client = await Client.connect(
-                settings.TEMPORAL_HOST,
-                namespace=settings.TEMPORAL_NAMESPACE
-            )
-    # Local development: no authentication
-    else:
-        print("⚠️  Connecting without authentication (local development only)")
-        client = await Client.connect(
-            settings.TEMPORAL_HOST,
-            namespace=settings.TEMPORAL_NAMESPACE
-        )
+    # Same authentication modes as the API (API key, mTLS, or none for local dev)
+    client = await connect_temporal()
     
     print("✅ Connected to Temporal!")
 
     # Define the list of all activities to register
     activities_list = [
+        collect_map_results,
         compensate_node,
         execute_agent_node,
         execute_api_call_node,
         execute_eval_node,
         execute_event_node,
+        execute_map_batch,
         execute_merge_node,
         execute_meta_node,
         execute_timer_node,
         get_fallback_agent,
+        prepare_map_items,
+        publish_event_batch,
+        # Per-event publishing, still scheduled by executions whose history predates the
+        # "batched-events" patch (see OrchestrationWorkflow._publish_status)
         publish_generic_event,
         publish_workflow_status,
         request_ui_approval,
+        resolve_blob_refs,
         # send_approval_request is redundant with request_ui_approval
     ]
 
     worker = Worker(
         client,
         task_queue="orchestration-queue",
-        workflows=[OrchestrationWorkflow],
+        workflows=[OrchestrationWorkflow, MapShardWorkflow],
         activities=activities_list # Pass the full list
     )
 
     print(f"⚡ Registered activities: {[a.__name__ for a in activities_list]}")
+    # One keep-alive pool for every activity this worker runs
+    http_client.start()
+    print(f"🌐 HTTP client pool open (max {http_client.max_connections} connections, "
+          f"{http_client.max_connections_per_host} per host, http2={http_client.http2})")
+    # The pool lives in this process, so report it through Redis for the API's /metrics/http-client
+    metrics_reporter = WorkerMetricsReporter({"http_client": http_client.get_metrics})
+    metrics_reporter.start()
     print("🚀 Worker is now polling for tasks...")
 
-    await worker.run()
+    try:
+        await worker.run()
+    finally:
+        # Flush event chronicle rows published by activities
+        await event_log_writer.stop()
+        await metrics_reporter.stop()
+        await http_client.close()
 
 if __name__ == "__main__":
     try:
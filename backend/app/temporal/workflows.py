@@ -10,15 +10,24 @@ from typing import Dict, Any, List, Optional
 
 with workflow.unsafe.imports_passed_through():
     from app.temporal.activities import (
-        compensate_node, execute_agent_node, execute_api_call_node,
-        execute_eval_node, execute_event_node, execute_merge_node,
-        execute_timer_node, get_fallback_agent, publish_generic_event,
-        publish_workflow_status, request_ui_approval
+        collect_map_results, compensate_node, execute_agent_node,
+        execute_api_call_node, execute_eval_node, execute_event_node,
+        execute_map_batch, execute_merge_node, execute_timer_node,
+        get_fallback_agent, prepare_map_items, publish_event_batch,
+        publish_generic_event, publish_workflow_status, request_ui_approval,
+        resolve_blob_refs
     )
     from app.services.agent_executor import AgentExecutor
     from app.services.output_mapper import output_mapper
     from app.schemas.node_outputs import BaseNodeOutput
     from app.services.execution_context import ExecutionContext
+    from app.services.compiled_workflow import CompiledWorkflow, compile_workflow
+    from app.services.dag_scheduler import DagScheduler, ReadyNode
+    from app.services.input_projection import NodeInputSpec
+    from app.services.expression_engine import CompiledExpression
+    from app.services.map_node import map_settings, plan_shards
+    from app.core.config import settings
+    from app.core.blob_store import has_blob_refs
 
 
 DEFAULT_ACTIVITY_RETRY_POLICY = RetryPolicy(
@@ -28,6 +37,69 @@ DEFAULT_ACTIVITY_RETRY_POLICY = RetryPolicy(
     maximum_attempts=3,
 )
 
+# Nodes resolved inside the workflow itself; they never block, so they don't flush buffered events
+WORKFLOW_ONLY_NODE_TYPES = {"trigger", "conditional", "end"}
+
+
+def continue_as_new_limits() -> Dict[str, int]:
+    """History limits for a new execution; passed in by the starter so replays never depend on current settings."""
+    return {
+        "history_length": settings.WORKFLOW_MAX_HISTORY_LENGTH,
+        "history_bytes": settings.WORKFLOW_MAX_HISTORY_BYTES,
+    }
+
+
+async def run_map_batches(
+    node: Dict[str, Any],
+    batch_refs: List[str],
+    first_batch: int,
+    total_items: int,
+    activity_context: Dict[str, Any],
+    batches_in_flight: int,
+) -> List[Dict[str, Any]]:
+    """Runs map batches with at most `batches_in_flight` activities at a time; outputs come back in batch order."""
+    batch_size = map_settings(node).batch_size
+    semaphore = asyncio.Semaphore(batches_in_flight)
+
+    async def run_batch(batch_index: int, batch_ref: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await workflow.execute_activity(
+                execute_map_batch,
+                args=[node, batch_ref, batch_index * batch_size, total_items, activity_context],
+                start_to_close_timeout=timedelta(minutes=30),
+                retry_policy=DEFAULT_ACTIVITY_RETRY_POLICY,
+            )
+
+    tasks = [
+        asyncio.create_task(run_batch(first_batch + offset, batch_ref))
+        for offset, batch_ref in enumerate(batch_refs)
+    ]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+@workflow.defn
+class MapShardWorkflow:
+    """Child workflow running one shard of a large map node, so no single history grows with the list."""
+
+    @workflow.run
+    async def run(
+        self,
+        node: Dict[str, Any],
+        batch_refs: List[str],
+        first_batch: int,
+        total_items: int,
+        activity_context: Dict[str, Any],
+        batches_in_flight: int,
+    ) -> List[Dict[str, Any]]:
+        return await run_map_batches(node, batch_refs, first_batch, total_items, activity_context, batches_in_flight)
+
 
 @workflow.defn
 class OrchestrationWorkflow:
@@ -42,95 +114,84 @@ class OrchestrationWorkflow:
         self.execution_history: List[Dict[str, Any]] = []
         self._approval_status: Optional[str] = None
         self._approval_data: Optional[Dict[str, Any]] = None
+        self._approval_lock = asyncio.Lock()  # Parallel branches share the single approval signal slot
         self._paused = False
+        self._end_node_id: Optional[str] = None  # End node that was reached (kept out of execution_history)
+        self._end_source_ids: List[str] = []  # Nodes that fed the end node that was reached
+        self._event_buffer: List[Dict[str, Any]] = []  # node.* / workflow.* events awaiting a flush
+        self._dag_scheduling = True  # False only when replaying a pre-scheduler history
+        self._batch_events = True  # False only when replaying a history from before event batching
+        self._workflow_def: Dict[str, Any] = {}
+        self._limits: Dict[str, int] = {}  # Continue-as-new thresholds, fixed for the whole execution
+        self._active_branches = 1  # Branches currently running nodes (not waiting on a fan-out)
+        self._continued_runs = 0  # Continue-as-new count so far
         self.execution_context: Optional[ExecutionContext] = None  # Will be initialized in run()
 
     def _get_full_state(self) -> Dict[str, Any]:
-        """Combines workflow context and node outputs for activities."""
+        """
+        Combines workflow context and node outputs for activities.
+        Large output values are blob references (offloaded by the activity that produced them),
+        so this stays small however many nodes have run.
+        """
         return {
             **self.workflow_context,
             "node_outputs": self.node_outputs,
             "previous_output": self.execution_history[-1].get("result") if self.execution_history else None
         }
 
-    def _get_node_input(self, node_id: str, node_type: str, node_config: Dict[str, Any]) -> Any:
-        """Get intelligent input for a node from previous node using output mapper."""
-        print(f"=== _get_node_input CALLED ===")
-        print(f"Target node: {node_id} ({node_type})")
-        print(f"Execution history length: {len(self.execution_history)}")
-        print(f"Mapped outputs keys: {list(self.mapped_outputs.keys())}")
-        
+    def _get_node_input(self, node_id: str, node_type: str, node_config: Dict[str, Any], source_ids: List[str]) -> Any:
+        """Get intelligent input for a node from the upstream node of its own branch using output mapper."""
         # For trigger nodes, use workflow input
         if node_type == "trigger":
             return self.workflow_context.get("input", {})
-        
-        # Find previous node(s) that lead to this node
-        if len(self.execution_history) > 0:
-            # The current node might already be in history with "running" status
-            # So we need to look at the PREVIOUS completed node, not the last entry
-            last_executed = None
-            for i in range(len(self.execution_history) - 1, -1, -1):
-                entry = self.execution_history[i]
-                # Skip the current node if it's already in history
-                if entry.get("node_id") == node_id:
-                    continue
-                # Found a previous node
-                last_executed = entry
-                break
-            
-            if last_executed is None:
-                workflow.logger.info(f"⚠️ No previous executed node found, using workflow input")
-                return self.workflow_context.get("input", {})
-            
-            last_node_id = last_executed.get("node_id")
-            
-            print(f"Last executed node_id: {last_node_id}")
-            workflow.logger.info(f"🔍 _get_node_input: last_node_id={last_node_id}, has mapped_output={last_node_id in self.mapped_outputs}")
-            
-            # Check if we have mapped output for the previous node
-            if last_node_id in self.mapped_outputs:
-                previous_mapped = self.mapped_outputs[last_node_id]
-                
-                print(f"Found mapped output! Type: {type(previous_mapped)}")
-                print(f"Mapped output value: {previous_mapped}")
-                workflow.logger.info(f"🔍 Mapped output type: {type(previous_mapped)}, node_type: {previous_mapped.node_type}")
-                
-                # Use output mapper to extract appropriate input for current node
-                extracted_input = output_mapper.extract_for_target(
-                    output=previous_mapped,
-                    target_node_type=node_type,
-                    target_config=node_config
-                )
-                
-                print(f"Extracted input: {extracted_input}")
-                workflow.logger.info(f"🔄 Mapped input from {last_node_id} ({previous_mapped.node_type}) → {node_id} ({node_type})")
-                workflow.logger.info(f"🔍 Extracted input: {extracted_input}")
-                return extracted_input
-            
-            # Fallback to raw result
-            raw_result = last_executed.get("result", {})
-            workflow.logger.info(f"⚠️ No mapped output, using raw result: {raw_result}")
-            return raw_result
-        
-        # Ultimate fallback: workflow input
-        workflow.logger.info(f"⚠️ No execution history, using workflow input")
-        return self.workflow_context.get("input", {})
+
+        # Each branch keeps its own previous output: the node that activated this one
+        if not source_ids:
+            workflow.logger.info(f"⚠️ No upstream node for {node_id}, using workflow input")
+            return self.workflow_context.get("input", {})
+
+        source_id = source_ids[0]
+        workflow.logger.info(f"🔍 _get_node_input: source_id={source_id}, has mapped_output={source_id in self.mapped_outputs}")
+
+        # Check if we have mapped output for the upstream node
+        if source_id in self.mapped_outputs:
+            previous_mapped = self.mapped_outputs[source_id]
+
+            # Use output mapper to extract appropriate input for current node
+            extracted_input = output_mapper.extract_for_target(
+                output=previous_mapped,
+                target_node_type=node_type,
+                target_config=node_config
+            )
+            workflow.logger.info(f"🔄 Mapped input from {source_id} ({previous_mapped.node_type}) → {node_id} ({node_type})")
+            return extracted_input
+
+        # Fallback to raw result
+        raw_result = self.node_outputs.get(source_id, {})
+        workflow.logger.info(f"⚠️ No mapped output, using raw result: {raw_result}")
+        return raw_result
 
     @workflow.run
-    async def run(self, workflow_id: str, workflow_def: Dict[str, Any], input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Main workflow execution entry point."""
+    async def run(
+        self,
+        workflow_id: str,
+        workflow_def: Dict[str, Any],
+        input_data: Dict[str, Any],
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Main workflow execution entry point.
+        `checkpoint` is {"limits": ...} from the starter, plus "state" when continued as new.
+        """
         execution_id = workflow.info().workflow_id
-        
-        self.workflow_context = {
-            "input": input_data,
-            "workflow_id": workflow_id,
-            "execution_id": execution_id,
-        }
-        self.node_outputs = {}
-        self.execution_history = []
-        self._paused = False
-        self._approval_status = None
-        self._approval_data = None
+        checkpoint = checkpoint or {}
+        self._workflow_def = workflow_def
+        self._limits = checkpoint.get("limits") or continue_as_new_limits()
+        self._event_buffer = []
+        # Executions started before the DAG scheduler replay through the sequential loop they ran with
+        self._dag_scheduling = "state" in checkpoint or workflow.patched("dag-scheduler")
+        # ...and executions started before event batching publish each event in its own activity
+        self._batch_events = "state" in checkpoint or workflow.patched("batched-events")
         
         # TODO: Re-enable ExecutionContext after fixing datetime serialization
         # self.execution_context = ExecutionContext(
@@ -140,181 +201,360 @@ class OrchestrationWorkflow:
         # )
         # self.execution_context.metadata["initial_input"] = input_data
 
-        nodes: List[Dict] = workflow_def.get("nodes", [])
-        edges: List[Dict] = workflow_def.get("edges", [])
-        node_map = {node["id"]: node for node in nodes}
+        # Indexed graph, built once per definition content and shared across runs
+        graph = compile_workflow(workflow_def)
+        node_map = graph.node_map
 
-        workflow.logger.info(f"🚀 Starting workflow {workflow_id} (Execution ID: {workflow.info().workflow_id})")
-        await self._publish_status("started")
+        next_node: Optional[ReadyNode] = None
+        if "state" in checkpoint:
+            scheduler = self._restore_checkpoint(checkpoint["state"], graph)
+            next_node_id, next_sources = checkpoint["state"]["next_node"]
+            next_node = (next_node_id, next_sources)
+            workflow.logger.info(f"♻️ Resuming workflow {workflow_id} at {next_node_id} (run {self._continued_runs + 1})")
+        else:
+            self.workflow_context = {
+                "input": input_data,
+                "workflow_id": workflow_id,
+                "execution_id": execution_id,
+            }
+            self.node_outputs = {}
+            self.execution_history = []
+            self._paused = False
+            self._approval_status = None
+            self._approval_data = None
+            self._end_node_id = None
+            self._end_source_ids = []
+            scheduler = DagScheduler(graph)
+            if graph.start_node_id:
+                next_node = scheduler.start(graph.start_node_id)
+            workflow.logger.info(f"🚀 Starting workflow {workflow_id} (Execution ID: {workflow.info().workflow_id})")
+            await self._publish_status("started")
 
         try:
-            current_node_id = self._find_start_node_id(nodes)
-
-            while current_node_id:
-                # --- Pause Handling ---
-                await workflow.wait_condition(lambda: not self._paused)
-
-                node = node_map.get(current_node_id)
-                if not node:
-                    raise ApplicationError(f"Node '{current_node_id}' not found in definition.", non_retryable=True)
-
-                node_type = node.get("type", "unknown")
-                node_label = node.get("data", {}).get("label", current_node_id)
-
-                # --- End Node Check ---
-                if node_type == "end":
-                    workflow.logger.info(f"🏁 Workflow reached end node: {node_label} ({current_node_id})")
-                    break
-
-                workflow.logger.info(f"⚡ Executing node: {node_label} ({current_node_id}, Type: {node_type})")
-                await self._publish_node_event(current_node_id, node_type, "started")
-
-                history_entry = {
-                    "node_id": current_node_id,
-                    "type": node_type,
-                    "label": node_label, # Add label for better history
-                    "start_time": workflow.now().isoformat(),
-                    "end_time": None,
-                    "status": "running",
-                    "result": None,
-                    "error": None,
-                }
-                self.execution_history.append(history_entry)
-
-                try:
-                    # --- Node Execution ---
-                    result = await self._execute_node(node)
-
-                    # --- Map Output to Schema ---
-                    node_config = node.get("data", {}).get("config", {})
-                    mapped_output = output_mapper.map_output(
-                        node_type=node_type,
-                        raw_output=result,
-                        node_id=current_node_id,
-                        node_config=node_config
-                    )
-                    self.mapped_outputs[current_node_id] = mapped_output
-                    print(f"=== MAPPED OUTPUT STORED ===")
-                    print(f"Node: {current_node_id} ({node_type})")
-                    print(f"Mapped type: {type(mapped_output)}")
-                    print(f"Mapped data: {mapped_output}")
-                    print(f"All mapped_outputs keys: {list(self.mapped_outputs.keys())}")
-
-                    # TODO: Re-enable ExecutionContext tracking
-                    # node_metadata = {
-                    #     "label": node_label,
-                    #     "config": node_config,
-                    #     "raw_output": result,
-                    # }
-                    # if isinstance(result, dict):
-                    #     if "cost" in result:
-                    #         node_metadata["cost"] = result["cost"]
-                    #     if "tokens_used" in result:
-                    #         node_metadata["tokens_used"] = result["tokens_used"]
-                    # self.execution_context.add_node_execution(
-                    #     node_id=current_node_id,
-                    #     node_type=node_type,
-                    #     output=mapped_output,
-                    #     metadata=node_metadata,
-                    #     timestamp=workflow.now()
-                    # )
-
-                    # --- Update State & History ---
-                    self.node_outputs[current_node_id] = result
-                    history_entry["result"] = result
-                    history_entry["status"] = "success"
-                    history_entry["end_time"] = workflow.now().isoformat()
-                    await self._publish_node_event(current_node_id, node_type, "completed", result=result)
-
-                    # --- Determine Next Node ---
-                    current_node_id = self._get_next_node_id(node, edges, result)
-
-                except ActivityError as e:
-                    error_message = f"ActivityError in node {node_label} ({current_node_id}): {e.__cause__ or e}"
-                    workflow.logger.error(f"❌ {error_message}")
-                    history_entry["status"] = "failed"
-                    history_entry["error"] = error_message
-                    history_entry["end_time"] = workflow.now().isoformat()
-                    await self._publish_node_event(current_node_id, node_type, "failed", error=error_message)
-
-                    # --- Attempt Self-Healing (if applicable) ---
-                    # if node_type == 'agent': # Example self-healing trigger
-                    #     is_rerouted = await self._handle_agent_failure(node, nodes, edges)
-                    #     if is_rerouted:
-                    #         current_node_id = self._get_next_node_id(...) # Need refined logic here
-                    #         continue # Skip compensation if rerouted successfully
-
-                    # --- Trigger Compensation ---
-                    await self._trigger_compensation(node_map)
-                    await self._publish_status("failed", error=error_message)
-                    raise ApplicationError(error_message) from e
-
-                except Exception as e: # Includes ApplicationError from _execute_node logic
-                    error_message = f"Error in node {node_label} ({current_node_id}): {e}"
-                    workflow.logger.error(f"❌ {error_message}")
-                    history_entry["status"] = "failed"
-                    history_entry["error"] = error_message
-                    history_entry["end_time"] = workflow.now().isoformat()
-                    await self._publish_node_event(current_node_id, node_type, "failed", error=error_message)
-
-                    # --- Trigger Compensation ---
-                    await self._trigger_compensation(node_map)
-                    await self._publish_status("failed", error=error_message)
-                    raise
-
-            # --- Workflow Completion ---
-            # Use simple last node output for now (will add intelligent selection later)
-            final_output = None
-            if current_node_id and node_map.get(current_node_id, {}).get("type") == "end":
-                end_node_config = node_map[current_node_id].get("data", {}).get("config", {})
-                if end_node_config.get("capture_output", True):
-                    # Get output from the last executed (non-end) node
-                    if self.execution_history:
-                        last_executed = self.execution_history[-1]
-                        final_output = last_executed.get("result")
-            else:
-                # If no end node, use output from the last node
-                final_output = self.node_outputs.get(current_node_id if current_node_id else self.execution_history[-1]["node_id"], None)
-            
-            workflow.logger.info(f"✅ Workflow {workflow_id} completed successfully. Final output: {final_output is not None}")
-            await self._publish_status("completed", result=final_output)
-            return {
-                "status": "completed",
-                "result": final_output,
-                "execution_history": self.execution_history,
-                "node_outputs": self.node_outputs
-            }
+            if not self._dag_scheduling:
+                await self._run_sequential(graph)
+            elif next_node:
+                await self._run_branch(next_node[0], next_node[1], graph, scheduler)
 
         except Exception as e:
-            # Catch failures during the main loop or compensation
-            final_error = f"💥 Workflow failed: {str(e)}"
-            workflow.logger.error(final_error)
-            # Ensure final status is published even if compensation failed
-            if not any(h["event_type"] == "workflow.failed" for h in self._get_internal_event_history()):
-                 await self._publish_status("failed", error=str(e))
+            # Any branch failure cancels its siblings, then the whole run is compensated once
+            error_message = str(e)
+            workflow.logger.error(f"💥 Workflow failed: {error_message}")
+            await self._trigger_compensation(node_map)
+            await self._publish_status("failed", error=error_message)
+            if not self._dag_scheduling:
+                # The sequential loop published the failure again on its way out
+                await self._publish_status("failed", error=error_message)
+            await self._flush_events()
             return {
                 "status": "failed",
-                "error": str(e),
+                "error": error_message,
                 "execution_history": self.execution_history,
                 "node_outputs": self.node_outputs
             }
 
-    async def _execute_node(self, node: Dict[str, Any]) -> Any:
+        # --- Workflow Completion ---
+        final_output = None
+        if self._end_node_id:
+            end_node_config = node_map[self._end_node_id].get("data", {}).get("config", {})
+            if end_node_config.get("capture_output", True):
+                # Output of the node that led into the end node
+                final_output = self.node_outputs.get(self._end_source_ids[0]) if self._end_source_ids else None
+        else:
+            # If no end node, use output from the last completed node
+            last_success = next((h for h in reversed(self.execution_history) if h.get("status") == "success"), None)
+            final_output = last_success.get("result") if last_success else None
+
+        # Large outputs were offloaded by the activities that produced them; callers get the content
+        final_output = await self._resolve_blobs(final_output)
+
+        workflow.logger.info(f"✅ Workflow {workflow_id} completed successfully. Final output: {final_output is not None}")
+        await self._publish_status("completed", result=final_output)
+        await self._flush_events()
+        return {
+            "status": "completed",
+            "result": final_output,
+            "execution_history": self.execution_history,
+            "node_outputs": self.node_outputs
+        }
+
+    async def _run_branch(self, node_id: str, source_ids: List[str], graph: CompiledWorkflow, scheduler: DagScheduler) -> None:
+        """Runs one branch sequentially until it forks, joins elsewhere, or ends."""
+        ready: List[ReadyNode] = [(node_id, source_ids)]
+        while len(ready) == 1:
+            current_node_id, current_sources = ready[0]
+            if self._should_continue_as_new():
+                await self._continue_as_new(ready[0], scheduler)
+            taken_targets = await self._run_node(current_node_id, current_sources, graph)
+            ready = scheduler.complete(current_node_id, taken_targets)
+
+        if ready:
+            await self._run_parallel(ready, graph, scheduler)
+
+    async def _run_parallel(self, ready: List[ReadyNode], graph: CompiledWorkflow, scheduler: DagScheduler) -> None:
+        """Starts every ready successor at once and waits for all of them."""
+        workflow.logger.info(f"🔀 Fan-out to {len(ready)} parallel branches: {[node_id for node_id, _ in ready]}")
+        # This branch waits while its children run
+        self._active_branches += len(ready) - 1
+        tasks = [
+            asyncio.create_task(self._run_forked_branch(node_id, source_ids, graph, scheduler))
+            for node_id, source_ids in ready
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the sibling branches before compensation runs (or the run continues as new)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self._active_branches += 1
+
+    async def _run_sequential(self, graph: CompiledWorkflow) -> None:
+        """
+        Execution order from before the DAG scheduler: one node at a time, following only
+        the first outgoing edge of nodes that are not conditionals or approvals.
+        Only replays of executions started before the scheduler take this path.
+        """
+        node_id = graph.start_node_id
+        source_ids: List[str] = []
+        while node_id:
+            taken_targets = await self._run_node(node_id, source_ids, graph)
+            if taken_targets is None:
+                successors = graph.successors(node_id)
+                if len(successors) > 1:
+                    workflow.logger.warning(f"Node {node_id} has multiple outgoing edges but isn't a Conditional/Approval. Following the first edge.")
+                taken_targets = successors[:1]
+            source_ids = [node_id]
+            node_id = taken_targets[0] if taken_targets else None
+
+    async def _run_forked_branch(self, node_id: str, source_ids: List[str], graph: CompiledWorkflow, scheduler: DagScheduler) -> None:
+        try:
+            await self._run_branch(node_id, source_ids, graph, scheduler)
+        finally:
+            self._active_branches -= 1
+
+    # --- Continue-as-new ---
+
+    def _should_continue_as_new(self) -> bool:
+        """
+        Checked between nodes. Only a lone branch can checkpoint: no sibling is
+        mid-node and no approval wait is in flight, so the next node is the whole frontier.
+        """
+        if self._active_branches != 1:
+            return False
+        info = workflow.info()
+        return (
+            info.is_continue_as_new_suggested()
+            or info.get_current_history_length() >= self._limits.get("history_length", settings.WORKFLOW_MAX_HISTORY_LENGTH)
+            or info.get_current_history_size() >= self._limits.get("history_bytes", settings.WORKFLOW_MAX_HISTORY_BYTES)
+        )
+
+    async def _continue_as_new(self, next_node: ReadyNode, scheduler: DagScheduler) -> None:
+        info = workflow.info()
+        workflow.logger.info(
+            f"♻️ Continuing as new before {next_node[0]} "
+            f"({info.get_current_history_length()} events, {info.get_current_history_size()} bytes)"
+        )
+        await self._flush_events()
+        workflow.continue_as_new(args=[
+            self.workflow_context["workflow_id"],
+            self._workflow_def,
+            self.workflow_context.get("input", {}),
+            {"limits": self._limits, "state": self._checkpoint_state(next_node, scheduler)},
+        ])
+
+    def _checkpoint_state(self, next_node: ReadyNode, scheduler: DagScheduler) -> Dict[str, Any]:
+        """
+        Compact state for the next run. Large outputs are already blob references;
+        history entries point at node_outputs instead of repeating results, and mapped
+        outputs are rebuilt on resume rather than carried.
+        """
+        history = []
+        for entry in self.execution_history:
+            result = entry.get("result")
+            if result is not None and result is self.node_outputs.get(entry.get("node_id")):
+                entry = {**entry, "result": None, "result_in_node_outputs": True}
+            history.append(entry)
+        return {
+            "workflow_context": self.workflow_context,
+            "node_outputs": self.node_outputs,
+            "execution_history": history,
+            "next_node": [next_node[0], list(next_node[1])],
+            "scheduler": scheduler.to_state(),
+            "end_node_id": self._end_node_id,
+            "end_source_ids": self._end_source_ids,
+            "paused": self._paused,
+            # An approval signal that arrived before its node started
+            "approval": {"status": self._approval_status, "data": self._approval_data},
+            "continued_runs": self._continued_runs + 1,
+        }
+
+    def _restore_checkpoint(self, state: Dict[str, Any], graph: CompiledWorkflow) -> DagScheduler:
+        self.workflow_context = state["workflow_context"]
+        self.node_outputs = state["node_outputs"]
+        self.execution_history = []
+        for entry in state["execution_history"]:
+            if entry.pop("result_in_node_outputs", False):
+                entry["result"] = self.node_outputs.get(entry["node_id"])
+            self.execution_history.append(entry)
+        self._end_node_id = state.get("end_node_id")
+        self._end_source_ids = state.get("end_source_ids", [])
+        self._paused = state.get("paused", False)
+        approval = state.get("approval") or {}
+        self._approval_status = approval.get("status")
+        self._approval_data = approval.get("data")
+        self._continued_runs = state.get("continued_runs", 0)
+
+        for entry in self.execution_history:
+            node = graph.get_node(entry["node_id"])
+            if node and entry.get("status") == "success" and entry["node_id"] in self.node_outputs:
+                self._map_output(node, self.node_outputs[entry["node_id"]])
+        return DagScheduler.from_state(graph, state["scheduler"])
+
+    def _map_output(self, node: Dict[str, Any], result: Any) -> BaseNodeOutput:
+        node_id = node.get("id", "")
+        mapped_output = output_mapper.map_output(
+            node_type=node.get("type", "unknown"),
+            raw_output=result,
+            node_id=node_id,
+            node_config=node.get("data", {}).get("config", {})
+        )
+        self.mapped_outputs[node_id] = mapped_output
+        return mapped_output
+
+    async def _run_node(self, node_id: str, source_ids: List[str], graph: CompiledWorkflow) -> Optional[List[str]]:
+        """
+        Executes a single node and returns the successors it selects
+        (None follows every outgoing edge, [] ends the branch).
+        """
+        # --- Pause Handling ---
+        await workflow.wait_condition(lambda: not self._paused)
+
+        node = graph.get_node(node_id)
+        if not node:
+            raise ApplicationError(f"Node '{node_id}' not found in definition.", non_retryable=True)
+
+        node_type = node.get("type", "unknown")
+        node_label = node.get("data", {}).get("label", node_id)
+
+        # --- End Node Check ---
+        if node_type == "end":
+            # Not an executed step: it stays out of the history (and so out of compensation)
+            workflow.logger.info(f"🏁 Branch reached end node: {node_label} ({node_id})")
+            self._end_node_id = node_id
+            self._end_source_ids = source_ids
+            return []
+
+        history_entry = {
+            "node_id": node_id,
+            "type": node_type,
+            "label": node_label, # Add label for better history
+            "start_time": workflow.now().isoformat(),
+            "end_time": None,
+            "status": "running",
+            "result": None,
+            "error": None,
+        }
+
+        workflow.logger.info(f"⚡ Executing node: {node_label} ({node_id}, Type: {node_type})")
+        await self._publish_node_event(node_id, node_type, "started")
+        self.execution_history.append(history_entry)
+
+        try:
+            # --- Node Execution ---
+            result = await self._execute_node(node, source_ids, graph.input_spec(node_id))
+
+            # --- Map Output to Schema ---
+            mapped_output = self._map_output(node, result)
+
+            # TODO: Re-enable ExecutionContext tracking
+            # node_metadata = {
+            #     "label": node_label,
+            #     "config": node_config,
+            #     "raw_output": result,
+            # }
+            # if isinstance(result, dict):
+            #     if "cost" in result:
+            #         node_metadata["cost"] = result["cost"]
+            #     if "tokens_used" in result:
+            #         node_metadata["tokens_used"] = result["tokens_used"]
+            # self.execution_context.add_node_execution(
+            #     node_id=node_id,
+            #     node_type=node_type,
+            #     output=mapped_output,
+            #     metadata=node_metadata,
+            #     timestamp=workflow.now()
+            # )
+
+            # --- Update State & History ---
+            self.node_outputs[node_id] = result
+            history_entry["result"] = result
+            history_entry["status"] = "success"
+            history_entry["end_time"] = workflow.now().isoformat()
+            await self._publish_node_event(node_id, node_type, "completed", result=result)
+
+        except asyncio.CancelledError:
+            # A sibling branch failed (or the workflow was cancelled)
+            history_entry["status"] = "cancelled"
+            history_entry["end_time"] = workflow.now().isoformat()
+            raise
+
+        except ActivityError as e:
+            error_message = f"ActivityError in node {node_label} ({node_id}): {e.__cause__ or e}"
+            workflow.logger.error(f"❌ {error_message}")
+            history_entry["status"] = "failed"
+            history_entry["error"] = error_message
+            history_entry["end_time"] = workflow.now().isoformat()
+            await self._publish_node_event(node_id, node_type, "failed", error=error_message)
+            raise ApplicationError(error_message) from e
+
+        except Exception as e: # Includes ApplicationError from _execute_node logic
+            error_message = f"Error in node {node_label} ({node_id}): {e}"
+            workflow.logger.error(f"❌ {error_message}")
+            history_entry["status"] = "failed"
+            history_entry["error"] = error_message
+            history_entry["end_time"] = workflow.now().isoformat()
+            await self._publish_node_event(node_id, node_type, "failed", error=error_message)
+            raise
+
+        # --- Determine Next Nodes ---
+        return await self._get_next_node_ids(node, graph, result)
+
+    def _build_activity_context(self, node_id: str, spec: NodeInputSpec, previous_output: Any, source_ids: List[str]) -> Dict[str, Any]:
+        """Execution identity plus only the state the node declares it reads (see NODE_INPUT_DEPENDENCIES)."""
+        activity_context = {
+            "workflow_id": self.workflow_context["workflow_id"],
+            "execution_id": self.workflow_context["execution_id"],
+            "current_node_id": node_id,
+            "node_outputs": spec.project_outputs(self.node_outputs, source_ids),
+        }
+        if spec.previous_output:
+            activity_context["previous_output"] = previous_output
+        if spec.workflow_input:
+            activity_context["input"] = self.workflow_context.get("input")
+        return activity_context
+
+    async def _execute_node(self, node: Dict[str, Any], source_ids: List[str], spec: NodeInputSpec) -> Any:
         """Executes the appropriate activity based on node type."""
         node_type = node.get("type", "unknown")
         node_id = node.get("id", "")
         node_config = node.get("data", {}).get("config", {})
 
-        # Get intelligent input from previous node using output mapper
-        previous_output_data = self._get_node_input(node_id, node_type, node_config)
+        # Get intelligent input from the upstream node of this branch using output mapper
+        previous_output_data = self._get_node_input(node_id, node_type, node_config, source_ids) if spec.previous_output else None
 
         # Prepare context to pass to activities
-        activity_context = {
-            **self.workflow_context,
-            "node_outputs": self.node_outputs,
-            "current_node_id": node_id,
-            "previous_output": previous_output_data
-        }
+        activity_context = self._build_activity_context(node_id, spec, previous_output_data, source_ids)
+        if node_type in ("merge", "map"):
+            # Join barrier: the branches that actually reached this node (a map reads the first one's raw output)
+            activity_context["incoming_branch_node_ids"] = source_ids
+
+        # Checkpoint: publish buffered lifecycle events before anything that can take a while
+        if node_type not in WORKFLOW_ONLY_NODE_TYPES:
+            await self._flush_events()
 
         # Define default retry policy
         retry_policy = DEFAULT_ACTIVITY_RETRY_POLICY
@@ -337,16 +577,18 @@ class OrchestrationWorkflow:
         elif node_type == "approval":
             timeout = timedelta(seconds=60)
             retry_policy=RetryPolicy(maximum_attempts=1) # Don't retry sending approval request usually
-            await workflow.execute_activity(
-                request_ui_approval, args=[node, activity_context],
-                start_to_close_timeout=timeout, retry_policy=retry_policy
-            )
-            # Wait for the signal
-            await workflow.wait_condition(lambda: self._approval_status is not None)
-            approval_result = {"action": self._approval_status, **(self._approval_data or {})}
-            # Reset for potential future approvals in the same workflow run
-            self._approval_status = None
-            self._approval_data = None
+            # One approval at a time: the signal carries no node id
+            async with self._approval_lock:
+                await workflow.execute_activity(
+                    request_ui_approval, args=[node, activity_context],
+                    start_to_close_timeout=timeout, retry_policy=retry_policy
+                )
+                # Wait for the signal
+                await workflow.wait_condition(lambda: self._approval_status is not None)
+                approval_result = {"action": self._approval_status, **(self._approval_data or {})}
+                # Reset for potential future approvals in the same workflow run
+                self._approval_status = None
+                self._approval_data = None
             return approval_result # Return the action ('approved'/'rejected') and any extra data
 
         elif node_type == "eval":
@@ -414,11 +656,14 @@ class OrchestrationWorkflow:
                 start_to_close_timeout=timeout, retry_policy=RetryPolicy(maximum_attempts=1)
             )
 
+        elif node_type == "map":
+            return await self._run_map(node, activity_context)
+
         # --- Nodes handled by workflow logic, not activities ---
         elif node_type == "trigger":
             return self.workflow_context.get("input", {})
         elif node_type == "conditional":
-            # Conditional logic happens in _get_next_node_id
+            # Conditional logic happens in _get_next_node_ids
             return {"status": "condition evaluated"}
         elif node_type == "end":
             return {"status": "workflow end"}
@@ -426,6 +671,55 @@ class OrchestrationWorkflow:
         else:
             raise ApplicationError(f"Unknown node type: {node_type}", non_retryable=True)
 
+    async def _run_map(self, node: Dict[str, Any], activity_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fans the map steps out over the node's items in batches. Lists longer than the
+        shard size are split across MapShardWorkflow children, each with its own history.
+        """
+        node_id = node.get("id", "")
+        map_config = map_settings(node)
+        prepared = await workflow.execute_activity(
+            prepare_map_items, args=[node, activity_context],
+            start_to_close_timeout=timedelta(minutes=5), retry_policy=DEFAULT_ACTIVITY_RETRY_POLICY
+        )
+        batches, total_items = prepared["batches"], prepared["total_items"]
+        shards = plan_shards(len(batches), map_config.batches_per_shard)
+
+        if len(shards) <= 1:
+            batch_outputs = await run_map_batches(node, batches, 0, total_items, activity_context, map_config.batches_in_flight)
+        else:
+            # Shards share the node's concurrency limit: never more running shards than batch slots
+            concurrent_shards = min(len(shards), map_config.max_concurrent_shards, map_config.batches_in_flight)
+            shard_in_flight = map_config.batches_in_flight // concurrent_shards
+            workflow.logger.info(f"🧩 Map node {node_id}: {total_items} items across {len(shards)} child workflows")
+            semaphore = asyncio.Semaphore(concurrent_shards)
+
+            async def run_shard(shard_index: int, first_batch: int, batch_count: int) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    return await workflow.execute_child_workflow(
+                        MapShardWorkflow.run,
+                        args=[node, batches[first_batch:first_batch + batch_count], first_batch, total_items,
+                              activity_context, shard_in_flight],
+                        id=f"{workflow.info().workflow_id}-{node_id}-shard-{shard_index}",
+                    )
+
+            shard_outputs = await asyncio.gather(*(
+                run_shard(shard_index, first_batch, batch_count)
+                for shard_index, (first_batch, batch_count) in enumerate(shards)
+            ))
+            batch_outputs = [output for shard in shard_outputs for output in shard]
+
+        result = await workflow.execute_activity(
+            collect_map_results, args=[node, batch_outputs, total_items, activity_context],
+            start_to_close_timeout=timedelta(minutes=5), retry_policy=DEFAULT_ACTIVITY_RETRY_POLICY
+        )
+        failed_count = result.get("failed_count", 0)
+        if failed_count and map_config.on_item_failure != "continue":
+            failed = result.get("failed_items")
+            first = f" (first: item {failed[0]['index']}: {failed[0]['error']})" if isinstance(failed, list) and failed else ""
+            raise ApplicationError(f"{failed_count} of {total_items} map items failed{first}", non_retryable=True)
+        return result
+
     async def _trigger_compensation(self, node_map: Dict[str, Dict]) -> None:
         """Triggers SAGA compensation for successfully completed nodes."""
         workflow.logger.info("🔄 Triggering compensation (rollback)")
@@ -452,6 +746,7 @@ class OrchestrationWorkflow:
                     )
                 )
 
+        await self._flush_events()
         try:
             await asyncio.gather(*compensation_futures)
             workflow.logger.info("✅ Compensation completed successfully.")
@@ -464,99 +759,108 @@ class OrchestrationWorkflow:
             # raise ApplicationError("Compensation failed") from e
 
 
-    def _find_start_node_id(self, nodes: List[Dict]) -> Optional[str]:
-        """Finds the ID of the first 'trigger' node."""
-        for node in nodes:
-            if node.get("type") == "trigger":
-                return node.get("id")
-        # Fallback if no trigger node (should be validated earlier)
-        return nodes[0].get("id") if nodes else None
-
-    def _get_next_node_id(
+    async def _get_next_node_ids(
         self,
         current_node: Dict[str, Any],
-        edges: List[Dict],
+        graph: CompiledWorkflow,
         result: Any
-    ) -> Optional[str]:
-        """Determines the next node ID based on edges and node type logic."""
+    ) -> Optional[List[str]]:
+        """
+        Determines which successors receive a live edge based on node type logic.
+        Returns None to follow every outgoing edge (parallel fan-out).
+        """
         current_id = current_node.get("id")
         node_type = current_node.get("type")
 
         # --- Conditional Logic ---
         if node_type == "conditional":
-            condition_expr = current_node.get("data", {}).get("config", {}).get("condition_expression", "False")
+            condition = graph.condition(current_id)
+            spec = graph.input_spec(current_id)
+            # Offloaded outputs are blob references; the condition compares their content
+            nodes = await self._resolve_blobs(spec.project_outputs(self.node_outputs))
             try:
                 # Evaluate expression safely using workflow state
-                condition_eval = self._evaluate_condition(condition_expr, result)
-                workflow.logger.info(f"Condition '{condition_expr}' evaluated to {condition_eval}")
+                condition_eval = self._evaluate_condition(condition, result, spec, nodes)
+                workflow.logger.info(f"Condition '{condition.source}' evaluated to {condition_eval}")
             except Exception as e:
-                workflow.logger.warning(f"Failed to evaluate condition '{condition_expr}': {e}. Defaulting to false.")
+                workflow.logger.warning(f"Failed to evaluate condition '{condition.source}': {e}. Defaulting to false.")
                 condition_eval = False
 
             handle_id = 'true' if condition_eval else 'false'
-            edge = next((e for e in edges if e.get("source") == current_id and e.get("sourceHandle") == handle_id), None)
-            return edge.get("target") if edge else None
+            target = graph.handle_target(current_id, handle_id)
+            return [target] if target else []
 
         # --- Approval Logic ---
         elif node_type == "approval":
             # 'result' contains {'action': 'approved'|'rejected', ...}
             action = result.get("action", "rejected")
             handle_id = 'approve' if action == "approved" else 'reject'
-            edge = next((e for e in edges if e.get("source") == current_id and e.get("sourceHandle") == handle_id), None)
-            return edge.get("target") if edge else None
+            target = graph.handle_target(current_id, handle_id)
+            return [target] if target else []
 
-        # --- Default Logic (Follow the first outgoing edge) ---
-        else:
-            outgoing_edges = [e for e in edges if e.get("source") == current_id]
-            if not outgoing_edges:
-                return None
-            if len(outgoing_edges) > 1:
-                 workflow.logger.warning(f"Node {current_id} has multiple outgoing edges but isn't a Conditional/Approval. Following the first edge.")
-            return outgoing_edges[0].get("target")
-
-    def _evaluate_condition(self, expression: str, current_result: Any) -> bool:
+        # --- Default Logic (Follow every outgoing edge) ---
+        return None
+
+    def _evaluate_condition(self, condition: CompiledExpression, current_result: Any, spec: Optional[NodeInputSpec] = None,
+                            nodes: Optional[Dict[str, Any]] = None) -> bool:
         """
-        Safely evaluates a Python condition expression.
-        Uses a limited context to prevent unsafe operations.
+        Evaluates a condition compiled (and validated against the expression whitelist)
+        once per workflow definition. `nodes` are the outputs it reads with blob references
+        resolved; without them the projected node_outputs are used as they are.
         """
-        # Context includes node outputs and initial input
-        context = {
-            "output": current_result, # Result of the *immediately preceding* node
-            "nodes": self.node_outputs, # Outputs of *all completed* nodes by ID
-            "input": self.workflow_context.get("input"), # Initial workflow input
-        }
-        # Allowed builtins (extend carefully)
-        safe_builtins = {
-            "True": True, "False": False, "None": None,
-            "len": len, "str": str, "int": int, "float": float, "list": list, "dict": dict,
-            "abs": abs, "round": round, "max": max, "min": min, "sum": sum, "any": any, "all": all,
-        }
         try:
-            # Evaluate using a restricted global and local scope
-            # Note: eval() still has risks if expression is user-controlled; consider safer alternatives if needed.
-            return bool(eval(expression, {"__builtins__": safe_builtins}, context))
+            return bool(condition.evaluate(
+                output=current_result,  # Result of the *immediately preceding* node
+                # Outputs of completed nodes by ID, limited to the ones the expression names (when statically known)
+                nodes=nodes if nodes is not None else spec.project_outputs(self.node_outputs) if spec else self.node_outputs,
+                input=self.workflow_context.get("input"),  # Initial workflow input
+            ))
         except Exception as e:
-            workflow.logger.error(f"Error evaluating condition '{expression}': {e}")
+            workflow.logger.error(f"Error evaluating condition '{condition.source}': {e}")
             return False # Default to False on error
 
-    async def _publish_status(self, status: str, result: Optional[Any] = None, error: Optional[str] = None):
-        """Helper to publish workflow-level status events."""
-        await workflow.execute_activity(
-            publish_workflow_status,
-            args=[
-                workflow.info().workflow_id,
-                self.workflow_context["workflow_id"],
-                status,
-                result,
-                error
-            ],
-            start_to_close_timeout=timedelta(seconds=10),
-            retry_policy=RetryPolicy(maximum_attempts=2),
+    async def _resolve_blobs(self, value: Any) -> Any:
+        """
+        `value` with its blob references loaded, through a local activity since workflow
+        code cannot read the store. Nothing is scheduled when there are no references.
+        """
+        if not has_blob_refs(value):
+            return value
+        return await workflow.execute_local_activity(
+            resolve_blob_refs,
+            args=[value],
+            start_to_close_timeout=timedelta(seconds=30),
+            retry_policy=DEFAULT_ACTIVITY_RETRY_POLICY,
         )
 
+    async def _publish_status(self, status: str, result: Optional[Any] = None, error: Optional[str] = None):
+        """Helper to buffer workflow-level status events (published right away for pre-batching histories)."""
+        if not self._batch_events:
+            await workflow.execute_activity(
+                publish_workflow_status,
+                args=[
+                    workflow.info().workflow_id,
+                    self.workflow_context["workflow_id"],
+                    status,
+                    result,
+                    error
+                ],
+                start_to_close_timeout=timedelta(seconds=10),
+                retry_policy=RetryPolicy(maximum_attempts=2),
+            )
+            return
+        self._event_buffer.append({
+            "event_type": f"workflow.{status}",
+            "data": {
+                "execution_id": workflow.info().workflow_id,
+                "workflow_id": self.workflow_context["workflow_id"],
+                "result": result,
+                "error": error,
+            },
+        })
+
     async def _publish_node_event(self, node_id: Optional[str], node_type: str, event_suffix: str,      result: Optional[Any] = None, error: Optional[str] = None):
-        """Helper to publish node-level events via an activity."""
-        # We use an activity here to interact with the external event bus
+        """Helper to buffer node-level events until the next flush checkpoint (published right away for pre-batching histories)."""
         event_type = f"node.{event_suffix}"
         if node_type == "workflow": # For compensation events etc.
              event_type = f"workflow.{event_suffix}"
@@ -570,16 +874,32 @@ class OrchestrationWorkflow:
             "error": error,
             "timestamp": workflow.now().isoformat() # Add timestamp
         }
-        # Use publish_generic_event activity to publish to event bus
-        await workflow.execute_activity(
-            publish_generic_event,
-            args=[event_type, data],
+        if not self._batch_events:
+            await workflow.execute_activity(
+                publish_generic_event,
+                args=[event_type, data],
+                start_to_close_timeout=timedelta(seconds=10),
+                retry_policy=RetryPolicy(maximum_attempts=2),
+            )
+            return
+        self._event_buffer.append({"event_type": event_type, "data": data})
+
+    async def _flush_events(self) -> None:
+        """
+        Publishes all buffered events in one local activity.
+        Called at checkpoints: before long-running activities, before approval waits and at completion.
+        """
+        if not self._event_buffer:
+            return
+        # Swap the buffer before awaiting so parallel branches keep appending to a fresh one
+        batch, self._event_buffer = self._event_buffer, []
+        await workflow.execute_local_activity(
+            publish_event_batch,
+            args=[batch],
             start_to_close_timeout=timedelta(seconds=10),
             retry_policy=RetryPolicy(maximum_attempts=2),
         )
 
-
-
     @workflow.signal(name="approval_signal")
     def approval_signal(self, data: dict) -> None:
         self._approval_status = data.get("action")
@@ -0,0 +1,84 @@
+"""
+Benchmark: 100 executions of the same template starting at once, each running one identical agent request.
+
+The provider is a stand-in for chat.completions.create that takes PROVIDER_LATENCY_MS
+and charges for its tokens; AgentScore recording is stubbed out so only the agent
+path is measured. Three setups, each with a fresh, empty response cache:
+- no dedup: every execution calls the provider (the old path)
+- cache only: every request misses, because all of them start before the first
+  answer is stored
+- cache + coalesce: the first request calls the provider; the other 99 wait for it
+
+The stand-in has no rate limit, so wall time barely moves; against a real provider
+the 99 extra calls also eat into the rate limit and queue behind each other.
+
+Run from backend/:
+    python -m benchmarks.bench_agent_single_flight
+"""
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+from app.core.response_cache import LocalLRUCache
+from app.core.single_flight import SingleFlight
+from app.services import agent_executor
+from app.services.agent_executor import AgentExecutor
+from app.services.llm_cache import LLMResponseCache
+
+EXECUTIONS = 100
+PROVIDER_LATENCY_MS = 300
+PROMPT = {"prompt": "The checkout flow keeps timing out and support never answered. Very disappointed."}
+
+
+class Provider:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        await asyncio.sleep(PROVIDER_LATENCY_MS / 1000)
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "negative"
+        response.usage.prompt_tokens = 850
+        response.usage.completion_tokens = 5
+        response.usage.model_dump.return_value = {"total_tokens": 855}
+        return response
+
+
+async def run(cache: bool, coalesce: bool):
+    provider = Provider()
+    executor = AgentExecutor()
+    executor.openai_client = MagicMock()
+    executor.openai_client.chat.completions.create = provider.create
+    executor.self_healing = MagicMock()
+    agent_executor.llm_response_cache = LLMResponseCache(store=LocalLRUCache(16 * 1024 * 1024))
+    agent_executor.agent_single_flight = SingleFlight("bench")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        executor.execute(
+            name="Sentiment", system_instructions="Classify the sentiment as positive, neutral or negative.",
+            input_data=PROMPT, temperature=0.0, cache=cache, coalesce=coalesce,
+        )
+        for _ in range(EXECUTIONS)
+    ))
+    elapsed = time.perf_counter() - start
+    assert all(r["output"] == "negative" for r in results)
+    return provider.calls, elapsed, sum(r["cost"] for r in results)
+
+
+def main():
+    print(f"{EXECUTIONS} concurrent identical agent requests, provider latency {PROVIDER_LATENCY_MS} ms\n")
+    print(f"{'setup':<20} {'provider calls':>15} {'wall ms':>9} {'cost $':>10}")
+    for label, cache, coalesce in (
+        ("no dedup", False, False),
+        ("cache only", True, False),
+        ("cache + coalesce", True, True),
+    ):
+        calls, elapsed, cost = asyncio.run(run(cache, coalesce))
+        print(f"{label:<20} {calls:>15} {elapsed * 1000:>9.0f} {cost:>10.6f}")
+
+
+if __name__ == "__main__":
+    main()
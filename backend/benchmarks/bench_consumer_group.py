@@ -0,0 +1,84 @@
+"""
+Benchmark: projection throughput vs. number of consumer-group members.
+
+Fills a scratch stream with EVENTS entries, then drains it with 1, 2 and 4
+consumer processes in one group. Each handler sleeps HANDLER_MS to stand in for
+the DB update, so throughput should scale roughly linearly with consumers.
+
+Needs a local Redis (REDIS_URL, default redis://localhost:6379). Run from backend/:
+    python -m benchmarks.bench_consumer_group
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+import redis.asyncio as redis
+
+from app.core.stream_consumer import StreamConsumer
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+STREAM = "bench:projection"
+EVENTS = 2000
+HANDLER_MS = 2
+
+
+async def fill_stream(group: str) -> None:
+    client = redis.from_url(REDIS_URL, decode_responses=True)
+    await client.delete(STREAM)
+    await client.xgroup_create(STREAM, group, id="$", mkstream=True)
+    async with client.pipeline(transaction=False) as pipe:
+        for i in range(EVENTS):
+            data = {"workflow_id": "wf-bench", "execution_id": f"ex-{i}"}
+            pipe.xadd(STREAM, {"event_type": "workflow.completed", "data": json.dumps(data), "timestamp": str(time.time())})
+        await pipe.execute()
+    await client.aclose()
+
+
+async def consume(group: str, name: str, counter) -> None:
+    client = redis.from_url(REDIS_URL, decode_responses=True)
+
+    async def handler(event):
+        await asyncio.sleep(HANDLER_MS / 1000)
+        with counter.get_lock():
+            counter.value += 1
+
+    consumer = StreamConsumer(client, group=group, consumer=name, stream=STREAM, batch_size=50, block_ms=200)
+    consumer.add_handler("workflow.completed", handler)
+    while counter.value < EVENTS:
+        await consumer.read_batch()
+    await client.aclose()
+
+
+def consumer_process(group: str, name: str, counter) -> None:
+    asyncio.run(consume(group, name, counter))
+
+
+def run(consumers: int) -> float:
+    group = f"bench-{consumers}"
+    asyncio.run(fill_stream(group))
+    counter = multiprocessing.Value("i", 0)
+    processes = [
+        multiprocessing.Process(target=consumer_process, args=(group, f"c{i}", counter))
+        for i in range(consumers)
+    ]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return EVENTS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    print(f"Draining {EVENTS} events, {HANDLER_MS}ms handler")
+    baseline = None
+    for consumers in (1, 2, 4):
+        rate = run(consumers)
+        baseline = baseline or rate
+        print(f"  {consumers} consumer(s): {rate:8.0f} events/s  ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
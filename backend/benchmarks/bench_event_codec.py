@@ -0,0 +1,98 @@
+"""
+Benchmark: encode/decode cost and size of realistic agent-output events.
+
+Each event carries an LLM node result (a few KB of text plus token usage and a
+structured tool-call list). For every installed codec this measures encode and
+decode time per event, the encoded size and the size after zlib (what the event
+archive stores). It then compares the two listener paths for one event sent to
+50 WebSocket clients: decode the envelope and re-serialise it per client (the
+previous send_json path), against reading only the stream ID and forwarding the
+raw text (LazyEvent).
+
+orjson and msgpack are optional; codecs that are not installed are skipped.
+
+Run from backend/:
+    python -m benchmarks.bench_event_codec
+"""
+import json
+import random
+import string
+import time
+import zlib
+
+from app.core.codec import CODECS, LazyEvent
+from app.core.events import EventBus
+
+EVENTS = 2000
+CLIENTS = 50
+
+
+def agent_output_event(seq: int):
+    rng = random.Random(seq)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(600)]
+    return {
+        "workflow_id": "wf-bench",
+        "execution_id": "ex-bench",
+        "node_id": f"agent-{seq % 8}",
+        "status": "completed",
+        "output": {
+            "text": " ".join(words),
+            "model": "gpt-4o-mini",
+            "usage": {"prompt_tokens": rng.randint(200, 4000), "completion_tokens": rng.randint(100, 1200)},
+            "tool_calls": [
+                {"name": "search", "arguments": {"query": " ".join(words[i:i + 6]), "top_k": 5}, "score": rng.random()}
+                for i in range(0, 30, 6)
+            ],
+        },
+        "duration_ms": rng.randint(300, 9000),
+    }
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return (time.perf_counter() - start) / len(items) * 1e6, results
+
+
+def bench_codecs(events):
+    print(f"{'codec':<10} {'encode µs':>10} {'decode µs':>10} {'bytes':>8} {'zlib bytes':>11}")
+    for name, codec in CODECS.items():
+        encode_us, encoded = timed(codec.dumps, events)
+        decode_us, _ = timed(codec.loads, encoded)
+        as_bytes = [e if isinstance(e, bytes) else e.encode("utf-8") for e in encoded]
+        size = sum(len(b) for b in as_bytes) / len(as_bytes)
+        compressed = sum(len(zlib.compress(b)) for b in as_bytes) / len(as_bytes)
+        print(f"{name:<10} {encode_us:>10.1f} {decode_us:>10.1f} {size:>8.0f} {compressed:>11.0f}")
+
+
+def bench_listener(events):
+    bus = EventBus.__new__(EventBus)
+    envelopes = []
+    for i, data in enumerate(events):
+        _, message = bus._encode_event("node.completed", data, time.time())
+        envelopes.append(message[:-1] + f', "id": "1700000000000-{i}"}}')
+
+    def decode_and_resend(raw):
+        event = json.loads(raw)
+        return [json.dumps(event) for _ in range(CLIENTS)], event["id"]
+
+    def forward_raw(raw):
+        event = LazyEvent(raw, "events:execution:ex-bench")
+        return [event.raw for _ in range(CLIENTS)], event.id
+
+    decode_us, _ = timed(decode_and_resend, envelopes)
+    lazy_us, _ = timed(forward_raw, envelopes)
+    print(f"\nOne event to {CLIENTS} clients:")
+    print(f"  decode + send_json per client: {decode_us:>9.1f} µs")
+    print(f"  LazyEvent raw forward:         {lazy_us:>9.1f} µs ({decode_us / lazy_us:.0f}x less CPU)")
+
+
+def main():
+    events = [agent_output_event(i) for i in range(EVENTS)]
+    print(f"{EVENTS} agent-output events; codecs available: {', '.join(CODECS)}\n")
+    bench_codecs(events)
+    bench_listener(events)
+
+
+if __name__ == "__main__":
+    main()
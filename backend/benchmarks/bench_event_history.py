@@ -0,0 +1,85 @@
+"""
+Benchmark: Temporal history events per node with batched lifecycle publishing.
+
+Runs OrchestrationWorkflow on the Temporal time-skipping test server with
+stubbed activities, then counts history events per executed node.
+
+Run from backend/ (downloads the test server on first use):
+    python -m benchmarks.bench_event_history
+"""
+import asyncio
+import uuid
+from collections import Counter
+from typing import Any, Dict, List
+
+from temporalio import activity
+from temporalio.api.enums.v1 import EventType
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from app.temporal.workflows import OrchestrationWorkflow
+
+TASK_QUEUE = "bench-event-history"
+
+# Before batching every node issued two publish_generic_event activities
+# (started/completed) plus the workflow-level publish_workflow_status calls.
+# Each activity adds Scheduled/Started/Completed and a workflow task round trip
+# (Scheduled/Started/Completed): 6 history events.
+EVENTS_PER_ACTIVITY_ROUND_TRIP = 6
+LEGACY_PUBLISH_ACTIVITIES_PER_NODE = 2
+
+
+@activity.defn(name="execute_agent_node")
+async def stub_agent(node: dict, activity_context: dict) -> dict:
+    return {"output": "ok", "model": "stub", "cost": 0.0, "temperature_used": 0.0, "usage": {}}
+
+
+@activity.defn(name="publish_event_batch")
+async def stub_publish_event_batch(events: List[Dict[str, Any]]) -> dict:
+    return {"status": "published", "published": len(events)}
+
+
+def build_chain(agent_count: int) -> Dict[str, Any]:
+    nodes = [{"id": "trigger", "type": "trigger", "data": {"config": {}}}]
+    nodes += [{"id": f"agent-{i}", "type": "agent", "data": {"config": {}}} for i in range(agent_count)]
+    nodes.append({"id": "end", "type": "end", "data": {"config": {}}})
+    edges = [
+        {"id": f"e{i}", "source": nodes[i]["id"], "target": nodes[i + 1]["id"]}
+        for i in range(len(nodes) - 1)
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+async def count_history(env: WorkflowEnvironment, agent_count: int) -> Counter:
+    handle = await env.client.start_workflow(
+        OrchestrationWorkflow.run,
+        args=["bench", build_chain(agent_count), {"input_text": "hello"}],
+        id=f"bench-{uuid.uuid4()}",
+        task_queue=TASK_QUEUE,
+    )
+    await handle.result()
+    history = await handle.fetch_history()
+    return Counter(EventType.Name(event.event_type) for event in history.events)
+
+
+async def main():
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        async with Worker(
+            env.client,
+            task_queue=TASK_QUEUE,
+            workflows=[OrchestrationWorkflow],
+            activities=[stub_agent, stub_publish_event_batch],
+        ):
+            print(f"{'agents':>6} | {'events':>6} | {'per node':>8} | {'legacy per node':>15} | {'markers':>7}")
+            print("-" * 56)
+            for agent_count in (5, 20, 50):
+                counts = await count_history(env, agent_count)
+                total = sum(counts.values())
+                per_node = total / agent_count
+                legacy_per_node = per_node + LEGACY_PUBLISH_ACTIVITIES_PER_NODE * EVENTS_PER_ACTIVITY_ROUND_TRIP
+                markers = counts.get("EVENT_TYPE_MARKER_RECORDED", 0)
+                print(f"{agent_count:>6} | {total:>6} | {per_node:>8.1f} | {legacy_per_node:>15.1f} | {markers:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
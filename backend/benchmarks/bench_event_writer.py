@@ -0,0 +1,94 @@
+"""
+Benchmark: sustained event chronicle inserts per second.
+
+Compares the previous path (one session + commit per event, in a worker thread)
+with EventLogWriter batching. Uses a SQLite file as a local stand-in for Postgres
+unless BENCH_DATABASE_URL points at a real database.
+
+Run from backend/:
+    python -m benchmarks.bench_event_writer
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.event_log_writer import EventLogWriter
+from app.models.event_log import EventLog
+
+EVENTS = 5000
+PUBLISHERS = 20
+
+
+def make_event(i: int):
+    data = {
+        "workflow_id": "wf-bench",
+        "execution_id": f"ex-{i % 50}",
+        "node_id": f"node-{i % 10}",
+        "node_type": "agent",
+        "result": {"output": "lorem ipsum " * 20, "cost": 0.0001},
+        "timestamp": datetime.now().isoformat(),
+    }
+    return "node.completed", data, time.time()
+
+
+async def bench_single_row(engine) -> float:
+    Session = sessionmaker(bind=engine)
+
+    def persist(event_type, data, timestamp):
+        db = Session()
+        db.add(EventLog(id=str(uuid4()), workflow_id=data["workflow_id"], execution_id=data["execution_id"],
+                        node_id=data["node_id"], event_type=event_type, event_data=data,
+                        timestamp=datetime.fromtimestamp(timestamp)))
+        db.commit()
+        db.close()
+
+    async def publisher(offset: int):
+        for i in range(offset, EVENTS, PUBLISHERS):
+            await asyncio.to_thread(persist, *make_event(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[publisher(p) for p in range(PUBLISHERS)])
+    return EVENTS / (time.perf_counter() - start)
+
+
+async def bench_batched(engine) -> tuple:
+    writer = EventLogWriter(bind=engine)
+
+    async def publisher(offset: int):
+        for i in range(offset, EVENTS, PUBLISHERS):
+            await writer.enqueue(*make_event(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[publisher(p) for p in range(PUBLISHERS)])
+    await writer.stop()
+    return EVENTS / (time.perf_counter() - start), writer.get_metrics()
+
+
+def fresh_engine(tmpdir: str, name: str):
+    url = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmpdir, name)}"
+    engine = create_engine(url)
+    EventLog.__table__.drop(engine, checkfirst=True)
+    EventLog.__table__.create(engine)
+    return engine
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single = await bench_single_row(fresh_engine(tmpdir, "single.db"))
+        batched, metrics = await bench_batched(fresh_engine(tmpdir, "batched.db"))
+
+    print(f"{EVENTS} events from {PUBLISHERS} concurrent publishers")
+    print(f"{'single-row commits':>20}: {single:>10.0f} events/s")
+    print(f"{'batched writer':>20}: {batched:>10.0f} events/s  ({batched / single:.1f}x)")
+    print(f"writer metrics: avg batch {metrics['avg_batch_size']}, "
+          f"avg flush {metrics['avg_flush_ms']}ms, max flush {metrics['max_flush_ms']}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Benchmark: API call throughput of one worker, a new httpx client per call vs. the shared pool.
+
+A stand-in HTTP/1.1 server (keep-alive, small JSON body, SERVER_DELAY_MS of
+simulated upstream latency) runs in a separate process on localhost. The
+worker side sends REQUESTS POSTs, CONCURRENCY at a time, the way parallel
+API call activities would:
+- per-call: `async with httpx.AsyncClient()` around every request (the old path)
+- pooled: every request through HttpClientPool
+
+Localhost has no DNS lookup, no TLS and almost no round-trip time, so the gap
+against a real HTTPS endpoint is larger than shown here.
+
+Run from backend/:
+    python -m benchmarks.bench_http_client
+"""
+import asyncio
+import multiprocessing
+import socket
+import time
+
+import httpx
+
+from app.core.http_client import HttpClientPool
+
+REQUESTS = 1000
+CONCURRENCY = 20
+SERVER_DELAY_MS = 2
+PAYLOAD = {"input": "Summarise this ticket", "context": {"id": 42, "priority": "high"}}
+
+
+def serve(port: int, connections) -> None:
+    async def handle(reader, writer):
+        with connections.get_lock():
+            connections.value += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        await reader.readexactly(int(line.split(b":")[1]))
+                await asyncio.sleep(SERVER_DELAY_MS / 1000)
+                body = b'{"status": "ok"}'
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def run(send) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            response = await send()
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    connections = multiprocessing.Value("i", 0)
+    server = multiprocessing.Process(target=serve, args=(port, connections), daemon=True)
+    server.start()
+    url = f"http://127.0.0.1:{port}/hook"
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    connections.value = 0
+
+    async def per_call():
+        async with httpx.AsyncClient() as client:
+            return await client.post(url, json=PAYLOAD, timeout=60.0)
+
+    per_call_rate = await run(per_call)
+    per_call_connections, connections.value = connections.value, 0
+
+    pool = HttpClientPool()
+    pooled_rate = await run(lambda: pool.post(url, json=PAYLOAD, timeout=60.0))
+    metrics = pool.get_metrics()
+    await pool.close()
+    pooled_connections = connections.value
+    server.terminate()
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent, {SERVER_DELAY_MS} ms server latency")
+    print(f"{'client':<10} {'calls/s':>9} {'connections':>12}")
+    print(f"{'per-call':<10} {per_call_rate:>9,.0f} {per_call_connections:>12}")
+    print(f"{'pooled':<10} {pooled_rate:>9,.0f} {pooled_connections:>12}")
+    print(f"speedup {pooled_rate / per_call_rate:.1f}x, pool reuse ratio {metrics['reuse_ratio']}, peak in use {metrics['peak_in_use']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
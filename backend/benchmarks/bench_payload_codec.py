@@ -0,0 +1,104 @@
+"""
+Benchmark: Temporal history bytes for the bundled templates, with and without payload compression.
+
+Runs no Temporal server. For each template it rebuilds the payloads that one
+execution writes to history, in the shapes the workflow produces:
+- the workflow input (id, definition, input)
+- each activity's arguments (node plus projected context) and its result
+- the publish_event_batch local activity batches
+- the final workflow result (execution_history plus node_outputs)
+Agent results are typical chat-completion responses of AGENT_WORDS words. Each
+payload is encoded with the default data converter, then again with the
+compression codec at the default 4 KB threshold.
+
+Run from backend/:
+    python -m benchmarks.bench_payload_codec
+"""
+import asyncio
+import random
+
+from app.core.payload_codec import CompressionCodec, build_data_converter
+from app.services.compiled_workflow import compile_workflow
+from app.services.templates import get_workflow_templates
+from app.temporal.workflows import WORKFLOW_ONLY_NODE_TYPES, OrchestrationWorkflow
+
+AGENT_WORDS = 600
+VOCABULARY = (
+    "the customer product delivery team report analysis market research data trend growth risk "
+    "quality review summary findings recommendation we should consider this that with for and "
+    "of to in is are was were be been has have it its their our your a an on by from as at "
+    "improve reduce increase strategy content policy safe unsafe score result sentiment positive "
+    "negative neutral feedback support response time cost revenue user users experience issue"
+).split()
+
+
+def agent_result(rng: random.Random) -> dict:
+    words = [rng.choice(VOCABULARY) for _ in range(AGENT_WORDS)]
+    text = ". ".join(" ".join(words[i:i + 14]).capitalize() for i in range(0, len(words), 14)) + "."
+    prompt_tokens = rng.randint(300, 1500)
+    return {
+        "output": text,
+        "model": "gpt-4o-mini",
+        "cost": round(rng.random() / 100, 6),
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 800, "total_tokens": prompt_tokens + 800,
+                  "completion_tokens_details": {"reasoning_tokens": 0}, "prompt_tokens_details": {"cached_tokens": 0}},
+        "temperature_used": 0.7,
+    }
+
+
+def history_payloads(template: dict) -> list:
+    rng = random.Random(template["id"])
+    definition = template["definition"]
+    graph = compile_workflow(definition)
+    wf = OrchestrationWorkflow()
+    wf.workflow_context = {"workflow_id": template["id"], "execution_id": "ex-bench", "input": {"input_text": "Review this"}}
+    # One entry per history event: the list of values it carries as payloads
+    values = [[template["id"], definition, wf.workflow_context["input"]]]
+    history, events, previous = [], [], wf.workflow_context["input"]
+
+    for node_id in graph.node_order:
+        node = graph.get_node(node_id)
+        node_type = node["type"]
+        if node_type in WORKFLOW_ONLY_NODE_TYPES:
+            result = previous if node_type == "trigger" else {"status": "workflow end"}
+        else:
+            context = wf._build_activity_context(node_id, graph.input_spec(node_id), previous, [])
+            values.append([node, context])
+            result = agent_result(rng) if node_type == "agent" else {"action": "approved", "approved_by": "reviewer"}
+            values.append([events])  # Buffered events are flushed before each activity
+            events = []
+        values.append([result])
+        wf.node_outputs[node_id] = result
+        history.append({"node_id": node_id, "type": node_type, "status": "success", "result": result})
+        events.append({"event_type": "node.completed", "data": {"node_id": node_id, "result": result}})
+        previous = result
+
+    values.append([events])
+    values.append([{"status": "completed", "result": previous, "execution_history": history, "node_outputs": wf.node_outputs}])
+    return values
+
+
+async def history_bytes(values: list, codec: CompressionCodec = None) -> int:
+    converter = build_data_converter(codec or CompressionCodec(compress=False))
+    total = 0
+    for value in values:
+        total += sum(payload.ByteSize() for payload in await converter.encode(value))
+    return total
+
+
+async def main():
+    print(f"{'template':<36} {'events':>8} {'plain KB':>9} {'zlib KB':>8} {'saved':>6}")
+    grand_plain = grand_zlib = 0
+    for template in get_workflow_templates():
+        values = history_payloads(template)
+        plain = await history_bytes(values)
+        compressed = await history_bytes(values, CompressionCodec(threshold_bytes=4096))
+        grand_plain += plain
+        grand_zlib += compressed
+        name = template["name"].encode("ascii", "ignore").decode().strip()
+        print(f"{name:<36} {len(values):>8} {plain / 1024:>9.1f} {compressed / 1024:>8.1f} {1 - compressed / plain:>6.0%}")
+    print(f"{'total':<36} {'':>8} {grand_plain / 1024:>9.1f} {grand_zlib / 1024:>8.1f} {1 - grand_zlib / grand_plain:>6.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
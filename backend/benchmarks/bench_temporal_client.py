@@ -0,0 +1,90 @@
+"""
+Benchmark: Temporal work behind POST /workflows/{id}/execute, per-request connect vs shared client.
+
+Starts a local Temporal dev server (downloaded on first use), then times
+start_workflow the way the endpoint did before (fresh Client.connect per request)
+and the way it does now (TemporalClientManager). Workflows are started on a task
+queue with no worker, so only the API-side cost is measured.
+
+Run from backend/:
+    python -m benchmarks.bench_temporal_client
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable, List
+from unittest.mock import patch
+
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+
+from app.core.temporal_client import TemporalClientManager
+
+REQUESTS = 200
+CONCURRENCY = 10
+TASK_QUEUE = "bench-no-worker"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(request: Callable[[], Awaitable[None]]) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[one() for _ in range(REQUESTS)])
+    return latencies
+
+
+async def start_workflow(client: Client) -> None:
+    await client.start_workflow(
+        "OrchestrationWorkflow",
+        args=["bench", {"nodes": [], "edges": []}, {}],
+        id=f"bench-{uuid.uuid4()}",
+        task_queue=TASK_QUEUE,
+    )
+
+
+async def main():
+    async with await WorkflowEnvironment.start_local() as env:
+        target = env.client.service_client.config.target_host
+
+        async def per_request_connect():
+            client = await Client.connect(target, namespace="default")
+            await start_workflow(client)
+
+        async def connect_local():
+            return await Client.connect(target, namespace="default")
+
+        manager = TemporalClientManager()
+
+        async def shared_client():
+            await start_workflow(await manager.get_client())
+
+        with patch("app.core.temporal_client.connect_temporal", connect_local):
+            before = await run_load(per_request_connect)
+            after = await run_load(shared_client)
+
+        print(f"{REQUESTS} requests, concurrency {CONCURRENCY}")
+        print(f"{'mode':>20} | {'p50 ms':>8} | {'p99 ms':>8} | {'mean ms':>8}")
+        print("-" * 54)
+        for label, samples in (("connect per request", before), ("shared client", after)):
+            print(
+                f"{label:>20} | {percentile(samples, 50):>8.2f} | "
+                f"{percentile(samples, 99):>8.2f} | {statistics.mean(samples):>8.2f}"
+            )
+        print(f"shared client metrics: {manager.get_metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
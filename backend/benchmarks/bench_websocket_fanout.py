@@ -0,0 +1,86 @@
+"""
+Benchmark: fan-out of one execution channel to 1,000 WebSocket clients.
+
+Simulated sockets take SEND_MS per send_json (network write); SLOW_CLIENTS of them
+take SLOW_SEND_MS. Compares the previous serial broadcast (await each socket in
+turn) with the per-connection queues of ConnectionManager, measuring how long the
+broadcaster is blocked and how long until every healthy client got every event.
+
+Run from backend/:
+    python -m benchmarks.bench_websocket_fanout
+"""
+import asyncio
+import time
+
+from app.api.events import ConnectionManager
+
+CLIENTS = 1000
+SLOW_CLIENTS = 5
+EVENTS = 20
+SEND_MS = 0.2
+SLOW_SEND_MS = 50
+CHANNEL = "execution:ex-bench"
+
+
+class SimulatedSocket:
+    def __init__(self, send_ms: float):
+        self.send_ms = send_ms
+        self.received = 0
+        self.last_received_at = 0.0
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.send_ms / 1000)
+        self.received += 1
+        self.last_received_at = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_sockets():
+    return [SimulatedSocket(SLOW_SEND_MS if i < SLOW_CLIENTS else SEND_MS) for i in range(CLIENTS)]
+
+
+async def bench_serial():
+    sockets = make_sockets()
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        for socket in sockets:
+            await socket.send_json({"seq": i})
+    blocked = time.perf_counter() - start
+    return blocked, blocked
+
+
+async def bench_queued():
+    sockets = make_sockets()
+    manager = ConnectionManager(max_queue=256, max_resyncs=3)
+    for socket in sockets:
+        manager.register(socket, CHANNEL)
+
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        await manager.broadcast(CHANNEL, {"seq": i})
+    blocked = time.perf_counter() - start
+
+    healthy = sockets[SLOW_CLIENTS:]
+    while any(socket.received < EVENTS for socket in healthy):
+        await asyncio.sleep(0.001)
+    delivered = max(socket.last_received_at for socket in healthy) - start
+
+    latency = manager.get_metrics()["fanout_latency"][CHANNEL]
+    for socket in sockets:
+        manager.disconnect(socket, CHANNEL)
+    return blocked, delivered, latency
+
+
+async def main():
+    print(f"{CLIENTS} clients ({SLOW_CLIENTS} slow), {EVENTS} events on one channel")
+    blocked, delivered = await bench_serial()
+    print(f"  serial broadcast: broadcaster blocked {blocked * 1000:8.1f}ms, healthy clients done {delivered * 1000:8.1f}ms")
+    blocked, delivered, latency = await bench_queued()
+    print(f"  queued broadcast: broadcaster blocked {blocked * 1000:8.1f}ms, healthy clients done {delivered * 1000:8.1f}ms")
+    print(f"  fan-out latency: avg {latency['avg_ms']}ms, max {latency['max_ms']}ms over {latency['count']} sends")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
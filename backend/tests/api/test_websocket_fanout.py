@@ -0,0 +1,183 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.api.events import ConnectionManager
+
+pytestmark = pytest.mark.asyncio
+
+
+def fake_socket(send_delay: float = 0.0):
+    websocket = MagicMock()
+    websocket.sent = []
+
+    async def send_json(message):
+        await asyncio.sleep(send_delay)
+        websocket.sent.append(message)
+
+    async def send_text(text):
+        await asyncio.sleep(send_delay)
+        websocket.sent.append(json.loads(text))
+
+    websocket.send_json = send_json
+    websocket.send_text = send_text
+    websocket.close = AsyncMock()
+    return websocket
+
+
+async def test_broadcast_does_not_wait_for_slow_clients():
+    """
+    GIVEN one fast and one very slow client on a channel
+    WHEN an event is broadcast
+    THEN broadcast returns immediately and the fast client receives it without waiting for the slow one.
+    """
+    manager = ConnectionManager(max_queue=10, max_resyncs=3)
+    fast, slow = fake_socket(), fake_socket(send_delay=5)
+    manager.register(fast, "execution:ex-1")
+    manager.register(slow, "execution:ex-1")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await manager.broadcast("execution:ex-1", {"event_type": "node.completed"})
+    assert loop.time() - start < 0.05
+
+    await asyncio.sleep(0.01)
+    assert fast.sent == [{"event_type": "node.completed"}]
+    assert slow.sent == []
+    assert manager.get_metrics()["fanout_latency"]["execution:ex-1"]["count"] == 1
+    manager.disconnect(slow, "execution:ex-1")
+
+
+async def test_overflowing_client_gets_resync_then_is_evicted():
+    """
+    GIVEN a stalled client with a queue of two
+    WHEN more events arrive than it can buffer
+    THEN its backlog is replaced by a resync message, and repeated overflows evict it.
+    """
+    manager = ConnectionManager(max_queue=2, max_resyncs=1)
+    stalled = fake_socket(send_delay=10)
+    connection = manager.register(stalled, "execution:ex-1")
+    await asyncio.sleep(0)  # writer takes the first message and blocks on it
+
+    for i in range(4):
+        await manager.broadcast("execution:ex-1", {"seq": i})
+    queued = [message for _, message in list(connection.queue._queue)]
+    assert queued[0] == {"type": "resync", "channel": "execution:ex-1"}
+
+    for i in range(4, 8):
+        await manager.broadcast("execution:ex-1", {"seq": i})
+
+    assert "execution:ex-1" not in manager.active_connections
+    assert manager.evictions == 1
+    stalled.close.assert_awaited_once()
+
+
+async def test_entity_channel_is_subscribed_only_while_watched():
+    """
+    GIVEN two clients watching the same execution
+    WHEN they connect and then leave one by one
+    THEN the instance subscribes to the execution's Redis channel once and unsubscribes after the last leaves.
+    """
+    from app.api import events as events_api
+
+    manager = ConnectionManager(max_queue=10, max_resyncs=3)
+    event_bus = MagicMock()
+    event_bus.subscribe = AsyncMock()
+    event_bus.unsubscribe = AsyncMock()
+    first, second = fake_socket(), fake_socket()
+    with patch.object(events_api, "manager", manager), patch.object(events_api, "event_bus", event_bus), \
+            patch.object(events_api, "watched_channels", set()):
+        for websocket in (first, second):
+            manager.register(websocket, "execution:ex-9")
+            await events_api.watch_channel("execution:ex-9")
+        event_bus.subscribe.assert_awaited_once_with("events:execution:ex-9", events_api.push_to_execution_clients)
+
+        manager.disconnect(first, "execution:ex-9")
+        await events_api.unwatch_channel_if_idle("execution:ex-9")
+        event_bus.unsubscribe.assert_not_awaited()
+
+        manager.disconnect(second, "execution:ex-9")
+        await events_api.unwatch_channel_if_idle("execution:ex-9")
+        event_bus.unsubscribe.assert_awaited_once_with("events:execution:ex-9", events_api.push_to_execution_clients)
+
+
+async def test_reconnect_replays_gap_then_skips_duplicate_live_events():
+    """
+    GIVEN a client resuming after event 1-0 while event 3-0 is also arriving live
+    WHEN it catches up from the stream and its writer starts
+    THEN it receives 2-0 and 3-0 exactly once, in order, in the live envelope.
+    """
+    from app.api import events as events_api
+
+    manager = ConnectionManager(max_queue=10, max_resyncs=3)
+    websocket = fake_socket()
+    connection = manager.register(websocket, "execution:ex-1", start_writer=False)
+    stream = [{"id": f"{i}-0", "event_type": "node.completed", "data": {"seq": i}, "timestamp": float(i)} for i in (1, 2, 3)]
+
+    async def read_execution_page(execution_id, cursor=None, start_id="-", limit=100, event_types=None):
+        assert execution_id == "ex-1"
+        after = events_api.parse_stream_id(cursor)
+        page = [e for e in stream if events_api.parse_stream_id(e["id"]) > after][:limit]
+        return page, (page[-1]["id"] if len(page) == limit else None)
+
+    event_archive = MagicMock()
+    event_archive.read_execution_page = read_execution_page
+    # Live copy of 3-0 queued while the catch-up runs, plus a newer 4-0
+    await manager.broadcast("execution:ex-1", {"id": "3-0", "event_type": "node.completed"})
+    await manager.broadcast("execution:ex-1", {"id": "4-0", "event_type": "node.completed"})
+    with patch.object(events_api, "event_archive", event_archive):
+        assert await events_api.catch_up(connection, "1-0") == 2
+    manager.start_writer(connection)
+    await asyncio.sleep(0.01)
+
+    ids = [m.get("id") for m in websocket.sent if m.get("type") != "replay.complete"]
+    assert ids == ["2-0", "3-0", "4-0"]
+    assert {"type": "replay.complete", "last_event_id": "3-0", "replayed": 2} in websocket.sent
+    # Replayed events use the live envelope: version, string timestamp, ID last
+    assert websocket.sent[0] == {"v": 1, "event_type": "node.completed", "data": {"seq": 2}, "timestamp": "2.0", "id": "2-0"}
+    manager.disconnect(websocket, "execution:ex-1")
+
+
+async def test_reconnect_after_trimmed_gap_asks_for_resync():
+    """
+    GIVEN a workflow client whose last event was already trimmed from the length-capped workflow stream
+    WHEN it reconnects
+    THEN it is told to resync instead of receiving a partial catch-up.
+    """
+    from app.api import events as events_api
+
+    manager = ConnectionManager(max_queue=10, max_resyncs=3)
+    websocket = fake_socket()
+    connection = manager.register(websocket, "workflow:wf-1", start_writer=False)
+    event_bus = MagicMock()
+    event_bus.read_stream = AsyncMock(return_value=[{"id": "50-0", "event_type": "node.completed", "data": {}}])
+
+    with patch.object(events_api, "event_bus", event_bus):
+        assert await events_api.catch_up(connection, "10-0") == 0
+
+    assert websocket.sent == [{"type": "resync", "channel": "workflow:wf-1"}]
+
+
+async def test_lazy_events_are_forwarded_as_raw_text():
+    """
+    GIVEN an event received from a watched execution channel
+    WHEN it is pushed to that execution's clients
+    THEN the published text is sent as-is and the payload is never decoded.
+    """
+    from app.api import events as events_api
+    from app.core.codec import LazyEvent
+
+    manager = ConnectionManager(max_queue=10, max_resyncs=3)
+    websocket = fake_socket()
+    websocket.send_text = AsyncMock()
+    manager.register(websocket, "execution:ex-1")
+    raw = '{"v": 1, "event_type": "node.completed", "data": {"execution_id": "ex-1"}, "timestamp": "1.0", "id": "5-0"}'
+    event = LazyEvent(raw, "events:execution:ex-1")
+
+    with patch.object(events_api, "manager", manager):
+        await events_api.push_to_execution_clients(event)
+    await asyncio.sleep(0.01)
+
+    websocket.send_text.assert_awaited_once_with(raw)
+    assert not event.is_decoded
+    manager.disconnect(websocket, "execution:ex-1")
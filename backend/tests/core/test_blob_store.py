@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from app.core.blob_store import BlobStore, FilesystemBlobBackend, PostgresBlobBackend, is_blob_ref
+from app.models.blob import Blob
+
+pytestmark = pytest.mark.asyncio
+
+
+def agent_result(text):
+    return {"output": text, "model": "gpt-4o-mini", "cost": 0.002, "usage": {"total_tokens": 900}}
+
+
+@pytest.fixture(params=["postgres", "filesystem"])
+def store(request, tmp_path):
+    if request.param == "postgres":
+        engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+        Blob.__table__.create(engine)
+        backend = PostgresBlobBackend(bind=engine)
+    else:
+        backend = FilesystemBlobBackend(root=str(tmp_path / "blobs"))
+    return BlobStore(backend=backend, threshold_bytes=1024, cache_size=4)
+
+
+async def test_only_oversized_fields_are_offloaded(store):
+    """
+    GIVEN an agent result with a large text output and small metadata
+    WHEN it is offloaded
+    THEN only the text becomes a reference and the metadata stays inline.
+    """
+    result = agent_result("lorem ipsum " * 500)
+
+    offloaded = await store.offload(result)
+
+    assert is_blob_ref(offloaded["output"])
+    assert {k: v for k, v in offloaded.items() if k != "output"} == {k: v for k, v in result.items() if k != "output"}
+    assert await store.offload(agent_result("short")) == agent_result("short")
+
+
+async def test_identical_content_is_stored_once(store):
+    """
+    GIVEN two nodes producing the same large output
+    WHEN both are offloaded
+    THEN they share one reference and the content is written once.
+    """
+    first = await store.offload(agent_result("same " * 1000))
+    second = await store.offload(agent_result("same " * 1000))
+
+    assert first["output"] == second["output"]
+    assert store.metrics["blobs_written"] == 1 and store.metrics["blobs_deduplicated"] == 1
+
+
+async def test_resolve_fetches_only_the_references_it_is_given(store):
+    """
+    GIVEN node outputs for three nodes, two of them offloaded
+    WHEN an activity resolves just its own input, with a cold cache
+    THEN that reference is loaded from the backend and the other is not touched.
+    """
+    outputs = {
+        "a": await store.offload(agent_result("a" * 5000)),
+        "b": await store.offload(agent_result("b" * 5000)),
+        "c": agent_result("inline"),
+    }
+    store._cache.clear()
+
+    resolved = await store.resolve({"previous_output": outputs["a"]})
+
+    assert resolved["previous_output"] == agent_result("a" * 5000)
+    assert store.metrics["blobs_resolved"] == 1
+    assert is_blob_ref(outputs["b"]["output"])  # untouched
+    assert await store.resolve(outputs["c"]) is outputs["c"]
+
+
+async def test_missing_or_malformed_references_raise_lookup_error(store):
+    """
+    GIVEN a well-formed reference that was never stored, and a path-like string
+    WHEN they are fetched
+    THEN LookupError is raised.
+    """
+    with pytest.raises(LookupError):
+        await store.get("blob:sha256:" + "0" * 64)
+    with pytest.raises(LookupError):
+        await store.get("blob:sha256:../../etc/passwd")
+
+
+async def test_non_dict_results_are_offloaded_whole(tmp_path):
+    """
+    GIVEN a large list result
+    WHEN it is offloaded to the Postgres backend
+    THEN the whole value becomes one compressed row that resolves back to the list.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Blob.__table__.create(engine)
+    store = BlobStore(backend=PostgresBlobBackend(bind=engine), threshold_bytes=1024)
+    items = [{"id": i, "title": f"item {i}"} for i in range(200)]
+
+    ref = await store.offload(items)
+    store._cache.clear()
+
+    assert is_blob_ref(ref) and await store.resolve(ref) == items
+    with engine.connect() as conn:
+        size, stored = conn.execute(select(Blob.size_bytes, func.length(Blob.payload))).one()
+    assert stored < size
@@ -0,0 +1,111 @@
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+from decimal import Decimal
+import pytest
+from unittest.mock import MagicMock
+from app.core.codec import CODECS, ENVELOPE_VERSION, JsonCodec, LazyEvent, get_codec
+from app.core.events import EventBus
+
+pytestmark = pytest.mark.asyncio
+
+
+def published_envelope(data, stream_id=None):
+    _, message = EventBus._encode_event(MagicMock(), "node.completed", data, 1700000000.0)
+    if stream_id:
+        # What the publish script appends for entity channels
+        message = message[:-1] + f', "id": "{stream_id}"}}'
+    return message
+
+
+async def test_lazy_event_reads_id_without_decoding():
+    """
+    GIVEN an entity-channel envelope whose payload itself contains an "id"
+    WHEN only the stream ID is read
+    THEN the trailing stream ID is returned and the payload is never decoded.
+    """
+    event = LazyEvent(published_envelope({"execution_id": "ex-1", "result": {"id": "7-7"}}, "1700000000000-3"),
+                      "events:execution:ex-1")
+
+    assert event.id == "1700000000000-3"
+    assert not event.is_decoded
+    assert EventBus._dispatch_key(event) == "execution:ex-1"
+    assert not event.is_decoded
+
+
+async def test_lazy_event_ignores_payload_id_when_no_stream_id():
+    """
+    GIVEN a global-channel envelope (no stream ID) whose payload ends with an "id" field
+    WHEN its ID is read
+    THEN no ID is reported.
+    """
+    event = LazyEvent(published_envelope({"execution_id": "ex-1", "id": "5-5"}), "node.completed")
+
+    assert event.id is None
+
+
+async def test_lazy_event_decodes_current_and_legacy_envelopes():
+    """
+    GIVEN a versioned envelope and a legacy one with a nested JSON string payload
+    WHEN they are read like dicts
+    THEN both expose "data" as an object.
+    """
+    current = LazyEvent(published_envelope({"execution_id": "ex-1"}))
+    legacy = LazyEvent(json.dumps({"event_type": "workflow.completed", "data": json.dumps({"execution_id": "ex-2"})}))
+
+    assert current["v"] == ENVELOPE_VERSION and current.get("data") == {"execution_id": "ex-1"}
+    assert legacy.get("data") == {"execution_id": "ex-2"}
+    assert dict(legacy)["event_type"] == "workflow.completed"
+
+
+async def test_unavailable_or_binary_codec_falls_back_to_json():
+    """
+    GIVEN codec names that are unknown, or binary where text is required
+    WHEN they are resolved
+    THEN stdlib json is used.
+    """
+    assert isinstance(get_codec("does-not-exist"), JsonCodec)
+    if "msgpack" in CODECS:
+        assert isinstance(get_codec("msgpack"), JsonCodec)
+        assert get_codec("msgpack", binary_ok=True).binary
+
+
+class Priority(enum.Enum):
+    HIGH = "high"
+
+
+@dataclasses.dataclass
+class Usage:
+    tokens: int
+
+
+@pytest.mark.parametrize("codec", list(CODECS.values()), ids=list(CODECS))
+async def test_codecs_round_trip_payloads_alike(codec):
+    """
+    GIVEN a payload with non-str keys and values JSON has no type for
+    WHEN each installed codec encodes and decodes it
+    THEN every codec returns the same thing, with keys and values written as stdlib json writes them.
+    """
+    payload = {
+        "scores": {1: "a", None: "b", 2.5: "c", False: "d"},
+        "at": datetime.datetime(2026, 1, 1, 12, 0, 0, 5, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2026, 1, 2),
+        "run": uuid.UUID(int=1),
+        "cost": Decimal("1.5"),
+        "priority": Priority.HIGH,
+        "usage": Usage(tokens=3),
+        "path": ("a", "b"),
+    }
+
+    assert codec.loads(codec.dumps(payload)) == {
+        "scores": {"1": "a", "null": "b", "2.5": "c", "false": "d"},
+        "at": "2026-01-01T12:00:00.000005+00:00",
+        "day": "2026-01-02",
+        "run": "00000000-0000-0000-0000-000000000001",
+        "cost": "1.5",
+        "priority": "high",
+        "usage": {"tokens": 3},
+        "path": ["a", "b"],
+    }
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from app.core.dispatcher import KeyedDispatcher
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_events_with_same_key_run_in_order():
+    """
+    GIVEN a slow first event and a fast second event for the same execution
+    WHEN both are submitted
+    THEN the second is only handled after the first finishes.
+    """
+    dispatcher = KeyedDispatcher(max_in_flight=10)
+    handled = []
+
+    async def listener(message):
+        await asyncio.sleep(message["delay"])
+        handled.append(message["seq"])
+
+    await dispatcher.submit("ex-1", [listener], {"seq": 1, "delay": 0.05})
+    await dispatcher.submit("ex-1", [listener], {"seq": 2, "delay": 0})
+    await dispatcher.drain()
+
+    assert handled == [1, 2]
+
+
+async def test_different_keys_run_concurrently():
+    """
+    GIVEN a slow listener
+    WHEN events for different executions are submitted
+    THEN they are handled concurrently rather than one after another.
+    """
+    dispatcher = KeyedDispatcher(max_in_flight=10)
+
+    async def slow_listener(message):
+        await asyncio.sleep(0.1)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for i in range(5):
+        await dispatcher.submit(f"ex-{i}", [slow_listener], {})
+    await dispatcher.drain()
+
+    assert loop.time() - start < 0.3
+
+
+async def test_failing_listener_is_isolated_and_recorded():
+    """
+    GIVEN one listener that raises and one that succeeds
+    WHEN an event is dispatched
+    THEN the healthy listener still runs and the failure shows up in its histogram.
+    """
+    dispatcher = KeyedDispatcher(max_in_flight=10)
+    received = []
+
+    async def broken(message):
+        raise RuntimeError("boom")
+
+    async def healthy(message):
+        received.append(message)
+
+    await dispatcher.submit("ex-1", [broken, healthy], {"n": 1})
+    await dispatcher.drain()
+
+    assert received == [{"n": 1}]
+    metrics = dispatcher.get_metrics()
+    broken_stats = metrics["listeners"][broken.__qualname__]
+    assert broken_stats["count"] == 1 and broken_stats["errors"] == 1
+    assert metrics["listeners"][healthy.__qualname__]["buckets_ms"]["+Inf"] == 1
+    assert metrics["in_flight"] == 0 and metrics["active_keys"] == 0
+
+
+async def test_submit_waits_when_in_flight_cap_is_reached():
+    """
+    GIVEN a dispatcher capped at two in-flight messages that are both blocked
+    WHEN a third message is submitted
+    THEN submit waits until one of them finishes.
+    """
+    dispatcher = KeyedDispatcher(max_in_flight=2)
+    release = asyncio.Event()
+
+    async def blocked(message):
+        await release.wait()
+
+    await dispatcher.submit("ex-1", [blocked], {})
+    await dispatcher.submit("ex-2", [blocked], {})
+    third = asyncio.create_task(dispatcher.submit("ex-3", [blocked], {}))
+    await asyncio.sleep(0.01)
+    assert not third.done()
+
+    release.set()
+    await asyncio.wait_for(third, timeout=1)
+    await dispatcher.drain()
+    assert dispatcher.in_flight == 0
@@ -0,0 +1,171 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import create_engine, func, select
+from app.core.event_archive import EventArchive, decode_block
+from app.core.events import EventBus, parse_stream_id
+from app.models.event_log import EventArchiveBlock
+
+pytestmark = pytest.mark.asyncio
+
+NOW = 1_700_000_000.0
+
+
+class FakeStreams:
+    """Just enough of redis.asyncio for the archiver: one stream, a hash and a sorted set."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.hash = {}
+        self.index = {}
+        self.deleted = []
+
+    async def xrange(self, stream_key, min="-", max="+", count=None):
+        exclusive = min.startswith("(")
+        lower = parse_stream_id(min.lstrip("(")) if min != "-" else None
+        upper = parse_stream_id(max) if max != "+" else None
+        matched = [
+            (eid, fields) for eid, fields in self.entries
+            if (lower is None or parse_stream_id(eid) > lower or (not exclusive and parse_stream_id(eid) == lower))
+            and (upper is None or parse_stream_id(eid) <= upper)
+        ]
+        return matched[:count]
+
+    async def hget(self, key, field):
+        return self.hash.get(field)
+
+    async def hset(self, key, field, value):
+        self.hash[field] = value
+
+    async def zrange(self, key, start, end, withscores=False):
+        return list(self.index.items())
+
+    async def zscore(self, key, member):
+        return self.index.get(member)
+
+    def pipeline(self, transaction=True):
+        streams = self
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+
+        async def execute():
+            streams.deleted.append(pipe.delete.call_args.args[0])
+            streams.index.pop(pipe.zrem.call_args.args[1], None)
+            streams.hash.pop(pipe.hdel.call_args.args[1], None)
+
+        pipe.execute = execute
+        return pipe
+
+
+def make_entries(count, start_ms):
+    return [
+        (f"{start_ms + i}-0", {
+            "event_type": "node.completed" if i % 2 else "node.started",
+            "data": json.dumps({"workflow_id": "wf-1", "execution_id": "ex-1", "seq": i, "output": "lorem " * 50}),
+            "timestamp": str((start_ms + i) / 1000),
+        })
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    EventArchiveBlock.__table__.create(engine)
+    bus = EventBus()
+    bus.redis_client = FakeStreams([])
+
+    async def read_page(stream_key, cursor=None, start_id="-", limit=100, event_types=None):
+        start = f"({cursor}" if cursor else start_id
+        entries = await bus.redis_client.xrange(stream_key, min=start, count=limit)
+        events = [EventBus._parse_stream_entry(eid, f) for eid, f in entries if not event_types or f["event_type"] in event_types]
+        return events, (entries[-1][0] if len(entries) == limit else None)
+
+    bus.read_page = read_page
+    return EventArchive(bus=bus, bind=engine, block_size=4, archive_after_seconds=300, hot_window_seconds=3600), engine
+
+
+async def test_quiet_stream_is_compacted_into_compressed_blocks(archive):
+    """
+    GIVEN a stream of 10 events that has been quiet longer than the archive delay
+    WHEN an archive pass runs
+    THEN the events land in blocks of at most 4 and the cursor records the last archived ID.
+    """
+    event_archive, engine = archive
+    redis = event_archive.redis
+    redis.entries = make_entries(10, int((NOW - 600) * 1000))
+    redis.index = {"ex-1": NOW - 600}
+
+    assert await event_archive.archive_once(now=NOW) == 10
+
+    with engine.connect() as conn:
+        blocks = conn.execute(select(EventArchiveBlock.__table__).order_by(EventArchiveBlock.first_ms)).all()
+    assert [b.event_count for b in blocks] == [4, 4, 2]
+    assert blocks[0].workflow_id == "wf-1"
+    assert decode_block(blocks[0].payload) == redis.entries[:4]
+    assert sum(len(b.payload) for b in blocks) < sum(len(f["data"]) for _, f in redis.entries)
+    assert redis.hash["ex-1"] == redis.entries[-1][0]
+
+    # A second pass has nothing new to archive
+    assert await event_archive.archive_once(now=NOW) == 0
+
+
+async def test_active_stream_only_archives_entries_near_the_trim_point(archive):
+    """
+    GIVEN an active stream with old entries and entries from the last minute
+    WHEN an archive pass runs
+    THEN only entries older than half the hot window are archived.
+    """
+    event_archive, engine = archive
+    redis = event_archive.redis
+    redis.entries = make_entries(3, int((NOW - 3000) * 1000)) + make_entries(3, int((NOW - 60) * 1000))
+    redis.index = {"ex-1": NOW - 1}
+
+    assert await event_archive.archive_once(now=NOW) == 3
+    assert redis.deleted == []
+
+
+async def test_replay_reads_archive_then_redis_without_duplicates(archive):
+    """
+    GIVEN an execution whose first 6 events are archived, while Redis still holds events 4-9
+    WHEN it is replayed in pages of 4
+    THEN every event appears exactly once, in order, across both tiers.
+    """
+    event_archive, _ = archive
+    redis = event_archive.redis
+    all_entries = make_entries(10, 1000)
+    redis.entries = all_entries[:6]
+    redis.index = {"ex-1": NOW - 600}
+    await event_archive.archive_once(now=NOW)
+    redis.entries = all_entries[4:]  # the hot tier trimmed the oldest entries
+
+    ids, cursor = [], None
+    while True:
+        page, cursor = await event_archive.read_execution_page("ex-1", cursor, limit=4)
+        ids += [event["id"] for event in page]
+        if cursor is None:
+            break
+
+    assert ids == [eid for eid, _ in all_entries]
+    completed = [e async for e in event_archive.iter_execution_events("ex-1", event_types={"node.completed"})]
+    assert [e["data"]["seq"] for e in completed] == [1, 3, 5, 7, 9]
+
+
+async def test_fully_archived_stream_is_deleted_after_the_hot_window(archive):
+    """
+    GIVEN a stream whose last event is older than the hot window
+    WHEN an archive pass runs
+    THEN its events are archived and the Redis stream, index entry and cursor are removed.
+    """
+    event_archive, engine = archive
+    redis = event_archive.redis
+    redis.entries = make_entries(3, int((NOW - 7200) * 1000))
+    redis.index = {"ex-1": NOW - 7200}
+
+    await event_archive.archive_once(now=NOW)
+
+    assert redis.deleted == ["execution:ex-1:events"]
+    assert redis.index == {} and "ex-1" not in redis.hash
+    with engine.connect() as conn:
+        assert conn.execute(select(func.sum(EventArchiveBlock.event_count))).scalar() == 3
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, func, select
+from app.core.event_log_writer import EventLogWriter
+from app.models.event_log import EventLog
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    EventLog.__table__.create(engine)
+    return engine
+
+
+def count_rows(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(EventLog.__table__)).scalar()
+
+
+async def test_flushes_full_batches(sqlite_engine):
+    """
+    GIVEN a writer with batch size 10 and a long flush interval
+    WHEN 25 events are enqueued and the writer is stopped
+    THEN every row is inserted in batches of at most 10.
+    """
+    writer = EventLogWriter(batch_size=10, flush_interval_ms=60_000, bind=sqlite_engine)
+    for i in range(25):
+        await writer.enqueue("node.completed", {"workflow_id": "wf", "execution_id": "ex", "seq": i}, 1700000000.0 + i)
+    await asyncio.sleep(0.05)
+    await writer.stop()
+
+    assert count_rows(sqlite_engine) == 25
+    metrics = writer.get_metrics()
+    assert metrics["events_written"] == 25
+    assert metrics["batches_flushed"] == 3
+    assert metrics["queue_depth"] == 0
+
+
+async def test_flushes_partial_batch_after_interval(sqlite_engine):
+    """
+    GIVEN a writer with a 20ms flush interval
+    WHEN fewer events than the batch size are enqueued
+    THEN they are written once the interval elapses, without stopping the writer.
+    """
+    writer = EventLogWriter(batch_size=500, flush_interval_ms=20, bind=sqlite_engine)
+    for i in range(3):
+        await writer.enqueue("node.started", {"workflow_id": "wf", "execution_id": "ex"}, 1700000000.0 + i)
+    await asyncio.sleep(0.2)
+
+    assert count_rows(sqlite_engine) == 3
+    await writer.stop()
+
+
+async def test_full_queue_applies_backpressure(sqlite_engine):
+    """
+    GIVEN a writer whose queue holds 5 events
+    WHEN more events are enqueued than fit
+    THEN producers wait for the writer instead of dropping events.
+    """
+    writer = EventLogWriter(batch_size=5, flush_interval_ms=10, max_queue_size=5, bind=sqlite_engine)
+    await asyncio.gather(*[
+        writer.enqueue("node.started", {"workflow_id": "wf", "execution_id": "ex"}, 1700000000.0 + i)
+        for i in range(40)
+    ])
+    await writer.stop()
+
+    assert count_rows(sqlite_engine) == 40
+    assert writer.get_metrics()["events_dropped"] == 0
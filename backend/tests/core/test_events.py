@@ -0,0 +1,166 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.events import PUBLISH_TO_STREAMS_SCRIPT, EventBus, parse_stream_id
+from app.core.codec import ENVELOPE_VERSION
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def bus():
+    """EventBus with a mocked Redis pipeline that records queued commands."""
+    event_bus = EventBus()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    event_bus.redis_client = MagicMock()
+    event_bus.redis_client.pipeline.return_value = pipe
+    with patch("app.core.events.event_log_writer") as writer:
+        writer.enqueue = AsyncMock()
+        yield event_bus, pipe, writer
+
+
+async def test_publish_queues_all_commands_in_one_pipeline(bus):
+    """
+    GIVEN an event with workflow and execution IDs
+    WHEN it is published
+    THEN the event-type PUBLISH and the stream append script go out in one non-transactional pipeline round trip.
+    """
+    event_bus, pipe, writer = bus
+    data = {"workflow_id": "wf-1", "execution_id": "ex-1", "node_id": "n1", "result": {"output": "hi"}}
+
+    await event_bus.publish("node.completed", data)
+
+    event_bus.redis_client.pipeline.assert_called_once_with(transaction=False)
+    pipe.execute.assert_awaited_once()
+
+    channel, message = pipe.publish.call_args.args
+    envelope = json.loads(message)
+    assert channel == "node.completed"
+    assert envelope["v"] == ENVELOPE_VERSION
+    assert envelope["event_type"] == "node.completed"
+    assert envelope["data"] == data
+
+    script, numkeys, *keys_and_args = pipe.eval.call_args.args
+    assert script == PUBLISH_TO_STREAMS_SCRIPT
+    assert keys_and_args[:numkeys] == ["workflow:wf-1:events", "execution:ex-1:events"]
+    event_type, data_str, _, pubsub_message, version, *channels = keys_and_args[numkeys:]
+    assert json.loads(data_str) == data and pubsub_message == message
+    assert version == ENVELOPE_VERSION
+    assert channels[0::3] == ["events:workflow:wf-1", "events:execution:ex-1"]
+    # The execution stream keeps a time-bounded hot window (the archive has the rest);
+    # the workflow stream is never archived, so it keeps its latest entries instead
+    assert channels[1:3] == ["MAXLEN", 10000]
+    assert channels[4] == "MINID" and channels[5].endswith("-0")
+    pipe.pexpire.assert_not_called()
+    pipe.zadd.assert_called_once()
+
+
+async def test_publish_many_uses_a_single_round_trip(bus):
+    """
+    GIVEN a batch of events for one execution
+    WHEN publish_many is called
+    THEN every event is queued in order on one pipeline that executes once.
+    """
+    event_bus, pipe, writer = bus
+    events = [(f"node.{i}", {"execution_id": "ex-2", "seq": i}) for i in range(5)]
+
+    await event_bus.publish_many(events)
+
+    pipe.execute.assert_awaited_once()
+    assert [c.args[0] for c in pipe.publish.call_args_list] == [event_type for event_type, _ in events]
+    assert pipe.eval.call_count == 5
+    assert writer.enqueue.await_count == 5
+
+
+async def test_unsubscribe_drops_redis_subscription_with_last_listener(bus):
+    """
+    GIVEN two listeners on one entity channel
+    WHEN both are removed
+    THEN the Redis subscription is only dropped after the last one.
+    """
+    event_bus, _, _ = bus
+    event_bus.pubsub = MagicMock()
+    event_bus.pubsub.subscribe = AsyncMock()
+    event_bus.pubsub.unsubscribe = AsyncMock()
+    first, second = AsyncMock(), AsyncMock()
+
+    await event_bus.subscribe("events:execution:ex-1", first)
+    await event_bus.subscribe("events:execution:ex-1", second)
+    await event_bus.unsubscribe("events:execution:ex-1", first)
+    event_bus.pubsub.unsubscribe.assert_not_awaited()
+
+    await event_bus.unsubscribe("events:execution:ex-1", second)
+    event_bus.pubsub.subscribe.assert_awaited_once_with("events:execution:ex-1")
+    event_bus.pubsub.unsubscribe.assert_awaited_once_with("events:execution:ex-1")
+    assert "events:execution:ex-1" not in event_bus.listeners
+
+
+async def test_stream_ids_compare_numerically():
+    """
+    GIVEN stream IDs whose string order differs from their numeric order
+    WHEN they are parsed
+    THEN they compare by milliseconds, then sequence.
+    """
+    assert parse_stream_id("999-5") < parse_stream_id("1000-0") < parse_stream_id("1000-1")
+    assert parse_stream_id("1000") == (1000, 0)
+
+
+def stream_entries(event_types):
+    return [
+        (f"{i + 1}-0", {"event_type": t, "data": json.dumps({"seq": i + 1}), "timestamp": "1.0"})
+        for i, t in enumerate(event_types)
+    ]
+
+
+def fake_xrange(entries):
+    """XRANGE over an in-memory stream, honouring exclusive '(' starts and COUNT."""
+    async def xrange(stream_key, min="-", max="+", count=None):
+        start = parse_stream_id(min.lstrip("(")) if min != "-" else None
+        exclusive = min.startswith("(")
+        matched = [
+            e for e in entries
+            if start is None or parse_stream_id(e[0]) > start or (not exclusive and parse_stream_id(e[0]) == start)
+        ]
+        return matched[:count]
+    return xrange
+
+
+async def test_read_page_filters_and_returns_cursor(bus):
+    """
+    GIVEN a stream of started/completed events
+    WHEN pages of two completed events are requested
+    THEN each page is filtered by type and the cursor continues where the last page stopped.
+    """
+    event_bus, _, _ = bus
+    event_bus.redis_client.xrange = fake_xrange(stream_entries(["node.started", "node.completed"] * 3))
+
+    page, cursor = await event_bus.read_page("execution:ex-1:events", limit=2, event_types={"node.completed"})
+    assert [e["id"] for e in page] == ["2-0", "4-0"] and cursor == "4-0"
+
+    page, cursor = await event_bus.read_page("execution:ex-1:events", cursor=cursor, limit=2, event_types={"node.completed"})
+    assert [e["id"] for e in page] == ["6-0"] and cursor is None
+    assert page[0]["data"] == {"seq": 6}
+
+
+async def test_iter_stream_reads_page_by_page(bus):
+    """
+    GIVEN a stream longer than one page
+    WHEN it is iterated
+    THEN every event is yielded in order while XRANGE is called with bounded counts.
+    """
+    event_bus, _, _ = bus
+    xrange = fake_xrange(stream_entries(["node.completed"] * 250))
+    counts = []
+
+    async def counting_xrange(stream_key, min="-", max="+", count=None):
+        counts.append(count)
+        return await xrange(stream_key, min, max, count)
+
+    event_bus.redis_client.xrange = counting_xrange
+    ids = [event["id"] async for event in event_bus.iter_stream("execution:ex-1:events", page_size=100)]
+
+    assert ids == [f"{i}-0" for i in range(1, 251)]
+    assert set(counts) == {100}
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.http_client import HttpClientPool
+from app.temporal import activities
+
+pytestmark = pytest.mark.asyncio
+
+
+class StandInServer:
+    """Minimal HTTP/1.1 keep-alive server that counts the connections it accepts."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        await reader.readexactly(int(line.split(b":")[1]))
+                self.requests += 1
+                await asyncio.sleep(self.delay)
+                body = b'{"ok": true}'
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def test_sequential_calls_reuse_one_connection():
+    """
+    GIVEN a pool and a stand-in server
+    WHEN twenty calls are made one after another
+    THEN the server sees a single connection and the pool reports the other nineteen as reused.
+    """
+    pool = HttpClientPool()
+    async with StandInServer() as server:
+        for _ in range(20):
+            response = await pool.post(f"{server.url}/items", json={"n": 1})
+            assert response.json() == {"ok": True}
+        await pool.close()
+
+    assert server.connections == 1
+    metrics = pool.get_metrics()
+    assert metrics["connections_opened"] == 1 and metrics["connections_reused"] == 19
+    assert metrics["in_use"] == 0 and metrics["waiting"] == 0 and not metrics["open"]
+
+
+async def test_per_host_limit_queues_excess_requests():
+    """
+    GIVEN a pool allowing two connections per host and a slow server
+    WHEN ten calls are made at once
+    THEN at most two are in flight, the rest wait, and the server sees at most two connections.
+    """
+    pool = HttpClientPool(max_connections_per_host=2)
+    async with StandInServer(delay=0.02) as server:
+        await asyncio.gather(*(pool.get(f"{server.url}/slow") for _ in range(10)))
+        await pool.close()
+
+    metrics = pool.get_metrics()
+    assert metrics["peak_in_use"] == 2 and metrics["peak_waiting"] >= 8
+    assert server.connections <= 2 and server.requests == 10
+
+
+async def test_api_call_node_uses_the_shared_pool():
+    """
+    GIVEN the api_call activity with the worker pool swapped for a test pool
+    WHEN two API nodes call the same host
+    THEN both go through the pool over one connection.
+    """
+    pool = HttpClientPool()
+    async with StandInServer() as server:
+        node = {"id": "api", "type": "api_call", "data": {"config": {"url": f"{server.url}/hook", "method": "POST"}}}
+        with patch.object(activities, "http_client", pool):
+            for _ in range(2):
+                result = await activities.execute_api_call_node(node, {"previous_output": {"output": "hi"}})
+                assert result["status_code"] == 200 and result["body"] == {"ok": True}
+        await pool.close()
+
+    assert pool.metrics["requests"] == 2 and server.connections == 1
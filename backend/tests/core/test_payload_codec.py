@@ -0,0 +1,50 @@
+import os
+import pytest
+from temporalio.api.common.v1 import Payload
+from app.core.payload_codec import COMPRESSED_ENCODING, CompressionCodec, build_data_converter
+
+pytestmark = pytest.mark.asyncio
+
+HISTORY = [{"node_id": f"agent-{i}", "status": "success", "result": {"output": "The customer is happy. " * 40}} for i in range(20)]
+
+
+async def test_large_payloads_round_trip_compressed():
+    """
+    GIVEN the data converter with compression enabled
+    WHEN a large execution history and a small value are encoded
+    THEN only the large one is compressed, and both decode to the original values.
+    """
+    codec = CompressionCodec(threshold_bytes=1024)
+    converter = build_data_converter(codec)
+
+    payloads = await converter.encode([HISTORY, "wf-1"])
+
+    assert payloads[0].metadata["encoding"] == COMPRESSED_ENCODING
+    assert payloads[1].metadata["encoding"] == b"json/plain"
+    assert await converter.decode(payloads, [list, str]) == [HISTORY, "wf-1"]
+    assert codec.get_metrics()["bytes_saved"] > 0
+
+
+async def test_uncompressed_history_stays_readable():
+    """
+    GIVEN payloads written before compression (plain JSON) and after it was switched off
+    WHEN they are decoded
+    THEN plain payloads pass through and compressed ones are still expanded.
+    """
+    plain = (await build_data_converter(CompressionCodec(compress=False)).encode([HISTORY]))[0]
+    compressed = (await CompressionCodec(threshold_bytes=1024).encode([plain]))[0]
+
+    decoded = await CompressionCodec(compress=False).decode([plain, compressed])
+
+    assert decoded == [plain, plain]
+
+
+async def test_incompressible_payloads_are_left_alone():
+    """
+    GIVEN a payload that does not shrink under zlib
+    WHEN it is encoded
+    THEN it is sent unchanged.
+    """
+    payload = Payload(metadata={"encoding": b"binary/plain"}, data=os.urandom(8192))
+
+    assert (await CompressionCodec(threshold_bytes=1024).encode([payload])) == [payload]
@@ -0,0 +1,145 @@
+import asyncio
+import pytest
+from app.core.single_flight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+class StandInRedis:
+    """The few Redis commands SingleFlight uses, in memory (expiry is not modelled)."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    def register_script(self, script):
+        async def release(keys, args):
+            if self.data.get(keys[0]) == args[0]:
+                del self.data[keys[0]]
+                return 1
+            return 0
+        return release
+
+
+class Provider:
+    """A slow call that counts how often it is made; fails or blocks on demand."""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError("provider unavailable")
+        return {"output": "positive", "cost": 0.001}
+
+
+async def start(flight, provider, count):
+    tasks = [asyncio.create_task(flight.run("same-request", provider)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+async def test_concurrent_identical_calls_share_one_call():
+    """
+    GIVEN 50 identical requests arriving while the first is still outstanding
+    WHEN the call completes
+    THEN it was made once, every caller gets its result, and only the first is not marked shared.
+    """
+    flight, provider = SingleFlight("test"), Provider()
+    tasks = await start(flight, provider, 50)
+    provider.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert provider.calls == 1
+    assert all(result == {"output": "positive", "cost": 0.001} for result, _ in results)
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.metrics["calls"] == 1 and flight.metrics["coalesced"] == 49 and flight.in_flight == 0
+
+    # Later requests are not coalesced with a finished call
+    provider.release = asyncio.Event()
+    provider.release.set()
+    await flight.run("same-request", provider)
+    assert provider.calls == 2
+
+
+async def test_failures_reach_every_waiter():
+    """
+    GIVEN ten waiters on a call that fails
+    WHEN it raises
+    THEN every waiter gets the error, and the failed call is not kept for the next request.
+    """
+    flight, provider = SingleFlight("test"), Provider(fail=True)
+    tasks = await start(flight, provider, 10)
+    provider.release.set()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(o, RuntimeError) and str(o) == "provider unavailable" for o in outcomes)
+    assert flight.metrics["failures"] == 1 and flight.in_flight == 0
+
+
+async def test_cancelled_waiters_leave_the_call_to_the_others():
+    """
+    GIVEN three waiters on one call
+    WHEN the one that started it is cancelled, and later the other two
+    THEN the call keeps going while anyone waits, and is cancelled with the last waiter.
+    """
+    flight, provider = SingleFlight("test"), Provider()
+    first, second, third = await start(flight, provider, 3)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    assert first.cancelled() and not provider.cancelled
+
+    second.cancel()
+    third.cancel()
+    await asyncio.gather(second, third, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert provider.cancelled and flight.metrics["cancelled"] == 1 and flight.in_flight == 0
+
+
+async def test_workers_coordinate_through_redis():
+    """
+    GIVEN two workers sharing Redis, each with identical requests in flight
+    WHEN the worker holding the lock finishes, and later a second round fails
+    THEN the provider is called once per round and the other worker gets the result, or the error.
+    """
+    redis = StandInRedis()
+    workers = [SingleFlight("test", redis_client=redis, poll_interval_seconds=0.001) for _ in range(2)]
+    provider = Provider()
+
+    tasks = await start(workers[0], provider, 5) + await start(workers[1], provider, 5)
+    await asyncio.sleep(0.01)
+    provider.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert provider.calls == 1
+    assert all(result["output"] == "positive" for result, _ in results)
+    assert workers[1].metrics["remote_results"] == 1 and workers[1].metrics["calls"] == 0
+    assert not any(key.startswith("test:lock:") for key in redis.data)
+
+    failing = Provider(fail=True)
+    tasks = await start(workers[0], failing, 1) + await start(workers[1], failing, 1)
+    await asyncio.sleep(0.01)
+    failing.release.set()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert failing.calls == 1
+    assert str(outcomes[0]) == "provider unavailable"
+    assert "provider unavailable" in str(outcomes[1])
@@ -0,0 +1,100 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from redis.exceptions import ResponseError
+from app.core.stream_consumer import DEAD_LETTER_STREAM, PROJECTION_STREAM, StreamConsumer
+
+pytestmark = pytest.mark.asyncio
+
+
+def entry(entry_id, event_type="workflow.completed", execution_id="ex-1"):
+    return entry_id, {
+        "event_type": event_type,
+        "data": json.dumps({"execution_id": execution_id}),
+        "timestamp": "1700000000.0",
+    }
+
+
+@pytest.fixture
+def redis_client():
+    client = MagicMock()
+    client.xgroup_create = AsyncMock()
+    client.xreadgroup = AsyncMock(return_value=[])
+    client.xpending_range = AsyncMock(return_value=[])
+    client.xclaim = AsyncMock(return_value=[])
+    client.xack = AsyncMock()
+    client.xrange = AsyncMock(return_value=[])
+    client.xadd = AsyncMock()
+    return client
+
+
+async def test_entries_are_acked_after_handlers_succeed(redis_client):
+    """
+    GIVEN two new entries in the projection stream
+    WHEN the consumer reads a batch
+    THEN the handler sees the pub/sub-shaped event and both entries are acked together.
+    """
+    redis_client.xreadgroup.return_value = [[PROJECTION_STREAM, [entry("1-0"), entry("2-0", execution_id="ex-2")]]]
+    handler = AsyncMock()
+    consumer = StreamConsumer(redis_client, group="g", consumer="c1")
+    consumer.add_handler("workflow.completed", handler)
+
+    assert await consumer.read_batch() == 2
+
+    assert handler.await_args_list[0].args[0]["data"] == {"execution_id": "ex-1"}
+    redis_client.xack.assert_awaited_once_with(PROJECTION_STREAM, "g", "1-0", "2-0")
+    assert consumer.metrics["acked"] == 2
+
+
+async def test_failed_entry_stays_pending(redis_client):
+    """
+    GIVEN a handler that raises
+    WHEN the entry is consumed
+    THEN it is not acked, so it stays pending for redelivery.
+    """
+    redis_client.xreadgroup.return_value = [[PROJECTION_STREAM, [entry("1-0")]]]
+    consumer = StreamConsumer(redis_client, group="g", consumer="c1")
+    consumer.add_handler("workflow.completed", AsyncMock(side_effect=RuntimeError("db down")))
+
+    await consumer.read_batch()
+
+    redis_client.xack.assert_not_awaited()
+    assert consumer.metrics["handler_failures"] == 1
+
+
+async def test_idle_pending_entries_are_claimed_and_poison_entries_dead_lettered(redis_client):
+    """
+    GIVEN one stale pending entry and one that exhausted its deliveries
+    WHEN the consumer reclaims
+    THEN the stale entry is claimed and handled, and the poison entry moves to the dead-letter stream.
+    """
+    redis_client.xpending_range.return_value = [
+        {"message_id": "1-0", "consumer": "crashed", "time_since_delivered": 60000, "times_delivered": 1},
+        {"message_id": "2-0", "consumer": "crashed", "time_since_delivered": 60000, "times_delivered": 5},
+    ]
+    redis_client.xclaim.return_value = [entry("1-0")]
+    redis_client.xrange.return_value = [entry("2-0")]
+    handler = AsyncMock()
+    consumer = StreamConsumer(redis_client, group="g", consumer="c2", max_deliveries=5)
+    consumer.add_handler("workflow.completed", handler)
+
+    assert await consumer.reclaim_pending() == 1
+
+    redis_client.xclaim.assert_awaited_once_with(PROJECTION_STREAM, "g", "c2", consumer.claim_idle_ms, ["1-0"])
+    handler.assert_awaited_once()
+    assert redis_client.xadd.await_args.args[0] == DEAD_LETTER_STREAM
+    assert consumer.metrics["dead_lettered"] == 1 and consumer.metrics["reclaimed"] == 1
+
+
+async def test_existing_group_is_reused(redis_client):
+    """
+    GIVEN a consumer group that already exists
+    WHEN an instance starts
+    THEN BUSYGROUP is ignored and the group keeps its position.
+    """
+    redis_client.xgroup_create.side_effect = ResponseError("BUSYGROUP Consumer Group name already exists")
+    consumer = StreamConsumer(redis_client, group="g", consumer="c1")
+
+    await consumer.ensure_group()
+
+    redis_client.xgroup_create.assert_awaited_once_with(PROJECTION_STREAM, "g", id="$", mkstream=True)
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from temporalio.service import RPCError, RPCStatusCode
+from app.core.temporal_client import TemporalClientManager
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_requests_share_one_connection():
+    """
+    GIVEN a fresh client manager
+    WHEN many requests ask for the client at the same time
+    THEN Client.connect runs once and every request gets the same client.
+    """
+    manager = TemporalClientManager()
+    client = MagicMock()
+
+    with patch("app.core.temporal_client.connect_temporal", AsyncMock(return_value=client)) as connect:
+        clients = await asyncio.gather(*[manager.get_client() for _ in range(20)])
+
+    assert all(c is client for c in clients)
+    connect.assert_awaited_once()
+    assert manager.get_metrics()["connects"] == 1
+    assert manager.get_metrics()["client_requests"] == 20
+
+
+async def test_channel_failure_triggers_reconnect():
+    """
+    GIVEN a connected manager
+    WHEN a request reports an UNAVAILABLE RPC error
+    THEN the next request opens a new connection and it is counted as a reconnect.
+    """
+    manager = TemporalClientManager()
+    first, second = MagicMock(), MagicMock()
+
+    with patch("app.core.temporal_client.connect_temporal", AsyncMock(side_effect=[first, second])):
+        assert await manager.get_client() is first
+        manager.report_failure(RPCError("unavailable", RPCStatusCode.UNAVAILABLE, b""))
+        assert await manager.get_client() is second
+
+    metrics = manager.get_metrics()
+    assert metrics["reconnects"] == 1
+    assert metrics["channel_failures"] == 1
+
+
+async def test_request_errors_keep_the_connection():
+    """
+    GIVEN a connected manager
+    WHEN a request fails with a non-channel error (e.g. workflow not found)
+    THEN the client is kept.
+    """
+    manager = TemporalClientManager()
+    client = MagicMock()
+
+    with patch("app.core.temporal_client.connect_temporal", AsyncMock(return_value=client)):
+        await manager.get_client()
+        manager.report_failure(RPCError("not found", RPCStatusCode.NOT_FOUND, b""))
+
+    assert manager.is_connected
@@ -0,0 +1,48 @@
+import json
+import time
+import pytest
+from app.core.worker_metrics import WORKER_METRICS_KEY, WorkerMetricsReporter, read_worker_metrics
+
+pytestmark = pytest.mark.asyncio
+
+
+class StandInRedis:
+    """The hash commands the reporter and reader use, in memory."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+
+async def test_the_api_reads_each_live_workers_pool_metrics():
+    """
+    GIVEN two workers reporting their HTTP pool metrics, and a snapshot from a worker
+    that stopped reporting long ago
+    WHEN the API reads the http_client section
+    THEN it gets both live workers' metrics by name, the stale one is dropped, and a
+    worker that stops cleanly removes its own snapshot.
+    """
+    redis = StandInRedis()
+    first = WorkerMetricsReporter({"http_client": lambda: {"in_use": 3}}, redis_client=redis, worker_name="w1", interval_seconds=15)
+    second = WorkerMetricsReporter({"http_client": lambda: {"in_use": 0}}, redis_client=redis, worker_name="w2", interval_seconds=15)
+    await first.publish()
+    await second.publish()
+    redis.hashes[WORKER_METRICS_KEY]["gone"] = json.dumps({"reported_at": time.time() - 3600, "http_client": {"in_use": 9}})
+
+    workers = await read_worker_metrics(redis, "http_client", max_age_seconds=45)
+
+    assert sorted(workers) == ["w1", "w2"]
+    assert workers["w1"]["in_use"] == 3 and "reported_at" in workers["w1"]
+    assert "gone" not in redis.hashes[WORKER_METRICS_KEY]
+
+    first.start()
+    await first.stop()
+    assert list(redis.hashes[WORKER_METRICS_KEY]) == ["w2"]
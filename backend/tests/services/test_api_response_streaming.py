@@ -0,0 +1,118 @@
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from temporalio.exceptions import ApplicationError
+from app.core.blob_store import BlobStore, FilesystemBlobBackend, is_blob_ref
+from app.core.http_client import HttpClientPool
+from app.services.output_mapper import output_mapper
+from app.temporal import activities
+
+pytestmark = pytest.mark.asyncio
+
+CATALOG = {"items": [{"sku": f"sku-{i}", "price": i, "description": "x" * 200} for i in range(200)], "total": 200}
+
+
+def api_node(**config):
+    return {"id": "catalog", "type": "api_call", "data": {"config": {
+        "name": "Catalog", "url": "https://shop.example.com/catalog", "method": "GET", **config,
+    }}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlobStore(backend=FilesystemBlobBackend(root=str(tmp_path / "blobs")), threshold_bytes=1024, cache_size=64)
+    with patch.object(activities, "blob_store", store):
+        yield store
+
+
+async def run_node(handler, node):
+    pool = HttpClientPool()
+    pool._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        with patch.object(activities, "http_client", pool):
+            return await activities.execute_api_call_node(node, {})
+    finally:
+        await pool.close()
+
+
+def chunked(data: bytes, size: int = 4096):
+    """A body without Content-Length, sent in pieces."""
+    async def chunks():
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+    return chunks()
+
+
+async def test_large_bodies_spill_to_the_blob_store_and_downstream_nodes_select_a_subset(store):
+    """
+    GIVEN an API returning a ~50KB JSON catalog with extra response headers
+    WHEN the API node runs and an agent after it selects only the SKUs with input_path
+    THEN the node output holds a blob reference and the allowed headers only,
+    and the agent's prompt contains the SKUs without the descriptions.
+    """
+    raw = json.dumps(CATALOG).encode()
+    handler = lambda request: httpx.Response(200, content=raw, headers={
+        "Content-Type": "application/json", "ETag": '"v1"', "X-Backend-Node": "db-7", "Set-Cookie": "session=1",
+    })
+
+    result = await run_node(handler, api_node())
+
+    assert is_blob_ref(result["body"]) and result["body_bytes"] == len(raw)
+    assert await store.get(result["body"]) == CATALOG
+    assert set(result["headers"]) == {"content-type", "content-length", "etag"}
+
+    mapped = output_mapper.map_output("api_call", result, "catalog")
+    agent_input = output_mapper.extract_for_target(mapped, "agent")
+    assert "prompt" not in agent_input and agent_input["api_response"] == result["body"]
+
+    agent = {"id": "summarize", "type": "agent", "data": {"config": {"name": "Summarize", "input_path": "$.api_response.items[*].sku"}}}
+    with patch.object(activities.agent_executor_util, "execute", AsyncMock(return_value={"output": "ok"})) as execute:
+        await activities.execute_agent_node(agent, {"previous_output": agent_input})
+    prompt = execute.call_args.kwargs["input_data"]["prompt"]
+    assert "sku-199" in prompt and "xxxx" not in prompt
+
+
+async def test_response_path_keeps_only_the_selection_inline(store):
+    """
+    GIVEN the same catalog and a node selecting the total and the first SKU
+    WHEN the node runs
+    THEN the body is the small selection, inline, and response_headers picks the headers kept.
+    """
+    handler = lambda request: httpx.Response(200, json=CATALOG, headers={"X-Request-Id": "abc"})
+
+    single = await run_node(handler, api_node(response_path="$.total", response_headers=["X-Request-Id"]))
+    multiple = await run_node(handler, api_node(response_path="$.items[0:2].sku"))
+
+    assert single["body"] == 200 and single["headers"] == {"x-request-id": "abc"}
+    assert multiple["body"] == ["sku-0", "sku-1"]
+
+
+async def test_oversized_responses_fail_without_retries(store):
+    """
+    GIVEN a node limited to 10KB and an API answering with 50KB, with and without Content-Length
+    WHEN the node runs
+    THEN it fails with a non-retryable error in both cases.
+    """
+    raw = json.dumps(CATALOG).encode()
+
+    for handler in (
+        lambda request: httpx.Response(200, content=raw, headers={"Content-Type": "application/json"}),
+        lambda request: httpx.Response(200, content=chunked(raw), headers={"Content-Type": "application/json"}),
+    ):
+        with pytest.raises(ApplicationError, match="10240 byte limit") as error:
+            await run_node(handler, api_node(max_response_bytes=10240))
+        assert error.value.non_retryable
+
+
+async def test_error_responses_quote_the_start_of_the_body(store):
+    """
+    GIVEN an API answering 502 with a large error page
+    WHEN the node runs
+    THEN the failure message carries the status and only the start of the page.
+    """
+    handler = lambda request: httpx.Response(502, content=chunked(b"<html>" + b"e" * 100_000))
+
+    with pytest.raises(RuntimeError, match="status 502: <html>eee") as error:
+        await run_node(handler, api_node())
+    assert len(str(error.value)) < activities.API_ERROR_DETAIL_BYTES + 100
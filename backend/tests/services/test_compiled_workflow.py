@@ -0,0 +1,85 @@
+from app.services.compiled_workflow import compile_workflow, definition_hash
+from app.services.validation import validate_workflow
+
+
+def make_definition():
+    return {
+        "nodes": [
+            {"id": "start", "type": "trigger", "data": {}},
+            {"id": "check", "type": "conditional", "data": {"config": {"condition_expression": "True"}}},
+            {"id": "yes", "type": "agent", "data": {}},
+            {"id": "no", "type": "agent", "data": {}},
+            {"id": "done", "type": "end", "data": {}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "start", "target": "check"},
+            {"id": "e2", "source": "check", "target": "yes", "sourceHandle": "true"},
+            {"id": "e3", "source": "check", "target": "no", "sourceHandle": "false"},
+            {"id": "e4", "source": "yes", "target": "done"},
+            {"id": "e5", "source": "no", "target": "done"},
+        ],
+    }
+
+
+def test_compile_builds_indexes():
+    """
+    GIVEN a definition with a conditional branch
+    WHEN it is compiled
+    THEN adjacency, handle maps, in-degrees and the start node are indexed.
+    """
+    graph = compile_workflow(make_definition())
+
+    assert graph.start_node_id == "start"
+    assert graph.successors("check") == ["yes", "no"]
+    assert graph.handle_target("check", "true") == "yes"
+    assert graph.handle_target("check", "false") == "no"
+    assert graph.handle_target("check", "approve") is None
+    assert graph.in_degree["done"] == 2
+    assert graph.predecessors("done") == ["yes", "no"]
+
+
+def test_compile_is_cached_by_content():
+    """
+    GIVEN two equal definitions built separately
+    WHEN both are compiled
+    THEN the same compiled graph is returned, and a changed definition gets a new one.
+    """
+    first = compile_workflow(make_definition())
+    second = compile_workflow(make_definition())
+    assert first is second
+
+    changed = make_definition()
+    changed["edges"].pop()
+    assert definition_hash(changed) != first.definition_hash
+    assert compile_workflow(changed) is not first
+
+
+def test_validate_workflow_uses_graph_degrees():
+    """
+    GIVEN a merge node with a single incoming edge
+    WHEN the definition is validated
+    THEN the merge in-degree check reports it.
+    """
+    definition = make_definition()
+    definition["nodes"][4]["type"] = "merge"
+    definition["nodes"][4]["data"] = {"label": "Join"}
+    definition["edges"].pop()
+
+    errors = validate_workflow(definition)
+    assert any("must have at least two incoming connections" in e for e in errors)
+
+
+def test_validate_workflow_rejects_cycles():
+    """
+    GIVEN a conditional whose false branch loops back to an earlier node
+    WHEN the definition is validated
+    THEN the cycle is reported with its path, since the scheduler never re-enters a started node.
+    """
+    definition = make_definition()
+    assert compile_workflow(definition).find_cycle() is None
+
+    definition["edges"][4] = {"id": "e5", "source": "no", "target": "check"}
+    graph = compile_workflow(definition)
+
+    assert graph.find_cycle() == ["check", "no", "check"]
+    assert any("cycle (check → no → check)" in e for e in validate_workflow(definition))
@@ -0,0 +1,69 @@
+from app.services.compiled_workflow import compile_workflow
+from app.services.dag_scheduler import DagScheduler
+
+
+def node(node_id, node_type):
+    return {"id": node_id, "type": node_type, "data": {}}
+
+
+def edge(source, target, handle=None):
+    data = {"id": f"{source}-{target}", "source": source, "target": target}
+    if handle:
+        data["sourceHandle"] = handle
+    return data
+
+
+def make_scheduler(nodes, edges):
+    scheduler = DagScheduler(compile_workflow({"nodes": nodes, "edges": edges}))
+    scheduler.start(nodes[0]["id"])
+    return scheduler
+
+
+def test_fan_out_and_join_barrier():
+    """
+    GIVEN a trigger fanning out to three agents joined by a merge node
+    WHEN the branches complete one by one
+    THEN all agents start together and the merge starts only after the last one.
+    """
+    scheduler = make_scheduler(
+        [node("t", "trigger"), node("a", "agent"), node("b", "agent"), node("c", "agent"), node("m", "merge")],
+        [edge("t", "a"), edge("t", "b"), edge("t", "c"), edge("a", "m"), edge("b", "m"), edge("c", "m")],
+    )
+
+    assert scheduler.complete("t") == [("a", ["t"]), ("b", ["t"]), ("c", ["t"])]
+    assert scheduler.complete("b") == []
+    assert scheduler.complete("a") == []
+    assert scheduler.complete("c") == [("m", ["b", "a", "c"])]
+
+
+def test_untaken_branch_does_not_block_join():
+    """
+    GIVEN a conditional whose two branches meet at a merge node
+    WHEN only the 'true' branch is taken
+    THEN the 'false' branch is skipped and the merge runs with the live branch only.
+    """
+    scheduler = make_scheduler(
+        [node("t", "trigger"), node("c", "conditional"), node("y", "agent"), node("n", "agent"), node("m", "merge")],
+        [edge("t", "c"), edge("c", "y", "true"), edge("c", "n", "false"), edge("y", "m"), edge("n", "m")],
+    )
+
+    scheduler.complete("t")
+    assert scheduler.complete("c", ["y"]) == [("y", ["c"])]
+    assert "n" in scheduler.skipped
+    assert scheduler.complete("y") == [("m", ["y"])]
+
+
+def test_non_join_node_runs_once():
+    """
+    GIVEN two parallel branches that both lead to a plain agent node
+    WHEN both branches complete
+    THEN the agent starts on the first arrival and is not started again.
+    """
+    scheduler = make_scheduler(
+        [node("t", "trigger"), node("a", "agent"), node("b", "agent"), node("x", "agent")],
+        [edge("t", "a"), edge("t", "b"), edge("a", "x"), edge("b", "x")],
+    )
+
+    scheduler.complete("t")
+    assert scheduler.complete("a") == [("x", ["a"])]
+    assert scheduler.complete("b") == []
@@ -0,0 +1,76 @@
+import pytest
+from app.services.compiled_workflow import compile_workflow
+from app.services.expression_engine import ExpressionError, compile_expression
+from app.services.validation import validate_workflow
+
+
+def test_expressions_evaluate_against_output_nodes_and_input():
+    """
+    GIVEN conditions using comparisons, .get, builtins and a comprehension
+    WHEN they are evaluated
+    THEN they read output, nodes and input like the previous eval path did.
+    """
+    nodes = {"score": {"value": 0.9}, "review": {"labels": ["ok", "fast"]}}
+    assert compile_expression('nodes["score"]["value"] > 0.5 and input["x"] == 1').evaluate(nodes=nodes, input={"x": 1}) is True
+    assert compile_expression('nodes.get("missing", {}).get("ok", False)').evaluate(nodes=nodes) is False
+    assert compile_expression('len(nodes["review"]["labels"]) == 2').evaluate(nodes=nodes) is True
+    assert compile_expression('any(item["n"] > output["min"] for item in output["items"])').evaluate(
+        output={"min": 2, "items": [{"n": 1}, {"n": 3}]}
+    ) is True
+    assert compile_expression('output["text"].lower().startswith("yes")').evaluate(output={"text": "YES please"}) is True
+
+
+@pytest.mark.parametrize("source", [
+    '().__class__.__bases__[0].__subclasses__()',
+    'output.__class__',
+    '"{0.__class__}".format(output)',
+    '(lambda: 1)()',
+    '9 ** 9 ** 9',
+    '__import__("os").system("id")',
+    'open("/etc/passwd")',
+    'getattr(output, "x")',
+    'dict(**output)',
+    '[x := 1]',
+])
+def test_unsafe_expressions_are_rejected_at_compile_time(source):
+    """
+    GIVEN an expression using dunders, formatting, lambdas, powers, imports or unknown names
+    WHEN it is compiled
+    THEN it is marked invalid and evaluating it raises without running anything.
+    """
+    compiled = compile_expression(source)
+
+    assert compiled.error
+    with pytest.raises(ExpressionError):
+        compiled.evaluate(output={"x": 1})
+
+
+def test_node_refs_list_statically_named_nodes():
+    """
+    GIVEN an expression naming two nodes by literal key
+    WHEN it is compiled
+    THEN node_refs lists exactly those nodes.
+    """
+    compiled = compile_expression('nodes["a"]["ok"] or nodes.get("b", {}).get("ok")')
+
+    assert compiled.node_refs == {"a", "b"}
+    assert not compiled.dependencies.all_nodes
+
+
+def test_conditions_are_compiled_once_per_definition():
+    """
+    GIVEN a workflow definition with a conditional node
+    WHEN it is compiled twice (cache hit) and its condition looked up repeatedly
+    THEN the same compiled expression is returned every time, and invalid ones fail validation.
+    """
+    definition = {
+        "nodes": [{"id": "check", "type": "conditional", "data": {"config": {"condition_expression": 'output["ok"]'}}}],
+        "edges": [],
+    }
+    graph = compile_workflow(definition)
+
+    assert graph.condition("check") is compile_workflow(definition).condition("check")
+    assert graph.condition("check").evaluate(output={"ok": True}) is True
+
+    definition["nodes"][0]["data"]["config"]["condition_expression"] = 'output.__class__'
+    assert any("invalid condition expression" in error for error in validate_workflow(definition))
@@ -0,0 +1,162 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.http_client import HttpClientPool
+from app.core.response_cache import LocalLRUCache
+from app.services.http_cache import CachePolicy, HttpResponseCache, request_key
+from app.services.validation import validate_workflow
+from app.services.output_mapper import output_mapper
+from app.temporal import activities
+
+pytestmark = pytest.mark.asyncio
+
+
+def api_node(**config):
+    return {"id": "prices", "type": "api_call", "data": {"config": {
+        "name": "Prices", "url": "https://ref.example.com/prices", "method": "GET", "cache": True, **config,
+    }}}
+
+
+class Origin:
+    """Mock origin recording requests; answers 304 when If-None-Match matches its ETag."""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = self.headers.get("ETag")
+        if etag and request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers=self.headers)
+        return httpx.Response(200, json={"plan": "pro", "price": 42}, headers=self.headers)
+
+
+async def run_node(origin, cache, node, runs=2):
+    pool = HttpClientPool()
+    pool._client = httpx.AsyncClient(transport=httpx.MockTransport(origin))
+    with patch.object(activities, "http_client", pool), patch.object(activities, "http_response_cache", cache):
+        results = [await activities.execute_api_call_node(node, {}) for _ in range(runs)]
+    await pool.close()
+    return results
+
+
+async def test_fresh_responses_are_served_without_a_request():
+    """
+    GIVEN an API node with caching on and an origin sending max-age=60
+    WHEN it runs twice
+    THEN only the first run reaches the origin, and the second maps to an APICallOutput marked as a cache hit.
+    """
+    origin = Origin({"Cache-Control": "max-age=60"})
+    cache = HttpResponseCache(store=LocalLRUCache(1024 * 1024))
+
+    first, second = await run_node(origin, cache, api_node())
+
+    assert len(origin.requests) == 1
+    assert first["cache"] == {"hit": False, "status": "miss", "stored": True}
+    assert second["body"] == first["body"] and second["cache"]["status"] == "hit"
+    mapped = output_mapper.map_output("api_call", second, "prices")
+    assert mapped.from_cache and mapped.is_success and mapped.response_time_ms >= 0 and mapped.url.endswith("/prices")
+    assert cache.metrics["hits"] == 1 and cache.metrics["misses"] == 1
+
+
+async def test_stale_entries_are_revalidated_with_their_etag():
+    """
+    GIVEN an origin sending an ETag with no-cache
+    WHEN the node runs twice
+    THEN the second request carries If-None-Match and the 304 returns the cached body.
+    """
+    origin = Origin({"Cache-Control": "no-cache", "ETag": '"v1"'})
+    cache = HttpResponseCache(store=LocalLRUCache(1024 * 1024))
+
+    first, second = await run_node(origin, cache, api_node())
+
+    assert origin.requests[1].headers["if-none-match"] == '"v1"'
+    assert second["status_code"] == 200 and second["body"] == {"plan": "pro", "price": 42}
+    assert second["cache"]["status"] == "revalidated"
+    assert cache.metrics["revalidated"] == 1
+
+
+async def test_no_store_is_respected_but_a_node_ttl_caches_plain_responses():
+    """
+    GIVEN one origin sending no-store and another sending no caching headers at all
+    WHEN a node runs against each, the second with cache_ttl_seconds set
+    THEN the no-store response is fetched every time and the plain one only once.
+    """
+    no_store = Origin({"Cache-Control": "no-store"})
+    await run_node(no_store, HttpResponseCache(store=LocalLRUCache(1024 * 1024)), api_node(cache_ttl_seconds=300))
+    plain = Origin({})
+    await run_node(plain, HttpResponseCache(store=LocalLRUCache(1024 * 1024)), api_node(cache_ttl_seconds=300))
+
+    assert len(no_store.requests) == 2
+    assert len(plain.requests) == 1
+
+
+async def test_unsafe_methods_are_only_cached_with_an_explicit_ttl():
+    """
+    GIVEN a cached POST node without cache_ttl_seconds, and one with it
+    WHEN each runs twice
+    THEN the first sends both requests and fails validation; the second is treated as idempotent and cached.
+    """
+    post = api_node(method="POST")
+    plain = Origin({"Cache-Control": "max-age=300"})
+    await run_node(plain, HttpResponseCache(store=LocalLRUCache(1024 * 1024)), post)
+    assert len(plain.requests) == 2
+
+    definition = {"nodes": [{"id": "start", "type": "trigger", "data": {}}, post], "edges": [{"id": "e1", "source": "start", "target": "prices"}]}
+    assert any("only GET and HEAD are cached" in e for e in validate_workflow(definition))
+
+    explicit = api_node(method="POST", cache_ttl_seconds=300)
+    plain = Origin({})
+    await run_node(plain, HttpResponseCache(store=LocalLRUCache(1024 * 1024)), explicit)
+    assert len(plain.requests) == 1
+    definition["nodes"][1] = explicit
+    assert not any("cached" in e for e in validate_workflow(definition))
+
+
+async def test_keys_vary_on_selected_headers_and_body():
+    """
+    GIVEN the same URL requested with different credentials, bodies or unrelated headers
+    WHEN request keys are computed
+    THEN credentials and bodies change the key, headers outside the vary list do not.
+    """
+    vary = CachePolicy().vary_headers
+    base = request_key("GET", "https://x/a", {"Authorization": "Bearer a", "X-Trace": "1"}, None, vary)
+
+    assert base == request_key("get", "https://x/a", {"authorization": "Bearer a", "X-Trace": "2"}, None, vary)
+    assert base != request_key("GET", "https://x/a", {"Authorization": "Bearer b"}, None, vary)
+    assert base != request_key("GET", "https://x/a", {"Authorization": "Bearer a"}, {"q": 1}, vary)
+
+
+async def test_lru_evicts_least_recently_used_entries_past_the_size_bound():
+    """
+    GIVEN a local cache holding 250 bytes
+    WHEN three 100-byte entries are stored after the first one was read again
+    THEN the entry read least recently is evicted.
+    """
+    lru = LocalLRUCache(max_bytes=250)
+    await lru.set("a", "a" * 100, 60)
+    await lru.set("b", "b" * 100, 60)
+    await lru.get("a")
+
+    evicted = await lru.set("c", "c" * 100, 60)
+
+    assert evicted == 1
+    assert await lru.get("b") is None and await lru.get("a") and await lru.get("c")
+
+
+async def test_unavailable_store_falls_back_to_a_normal_request():
+    """
+    GIVEN a cache store that raises on every call
+    WHEN a cached node runs
+    THEN the request still goes out and the error is counted.
+    """
+    store = AsyncMock()
+    store.get.side_effect = ConnectionError("redis down")
+    store.set.side_effect = ConnectionError("redis down")
+    cache = HttpResponseCache(store=store)
+
+    result, = await run_node(Origin({"Cache-Control": "max-age=60"}), cache, api_node(), runs=1)
+
+    assert result["status_code"] == 200 and result["cache"]["stored"] is False
+    assert cache.metrics["errors"] == 2
@@ -0,0 +1,88 @@
+from app.services.compiled_workflow import compile_workflow
+from app.services.input_projection import analyze_expression, input_spec_for
+from app.temporal.workflows import OrchestrationWorkflow
+
+
+def conditional(expression):
+    return {"id": "check", "type": "conditional", "data": {"config": {"condition_expression": expression}}}
+
+
+def test_condition_dependencies_are_found_statically():
+    """
+    GIVEN condition expressions reading nodes by literal key, via .get, or dynamically
+    WHEN they are analyzed
+    THEN literal keys are listed and anything else depends on every output.
+    """
+    literal = analyze_expression('nodes["score"]["passed"] and nodes.get("review", {}).get("ok") and input["x"] > 1')
+    assert literal.node_ids == {"score", "review"}
+    assert not literal.all_nodes and literal.uses_input and not literal.uses_output
+
+    for dynamic in ('len(nodes) > 2', 'nodes[input["key"]]', 'any(v for v in nodes.values())', 'nodes.get(output["next"])'):
+        assert analyze_expression(dynamic).all_nodes, dynamic
+    assert analyze_expression("nodes[").all_nodes
+
+
+def test_node_types_get_only_what_they_declare():
+    """
+    GIVEN agent, merge, conditional and unknown nodes
+    WHEN their input specs are built
+    THEN agents get the previous output only, merges their incoming branches,
+    conditionals the nodes they name, maps their incoming branch plus the nodes
+    their items expression names, and unknown types keep everything.
+    """
+    agent = input_spec_for({"id": "a", "type": "agent"})
+    assert agent.previous_output and not agent.workflow_input and not agent.all_node_outputs
+    assert agent.project_outputs({"x": 1, "y": 2}) == {}
+
+    merge = input_spec_for({"id": "m", "type": "merge"})
+    assert merge.project_outputs({"x": 1, "y": 2, "z": 3}, branch_ids=["x", "z"]) == {"x": 1, "z": 3}
+
+    check = input_spec_for(conditional('nodes["x"]["ok"]'))
+    assert check.project_outputs({"x": {"ok": True}, "y": 2}) == {"x": {"ok": True}}
+
+    mapper = input_spec_for({"id": "m", "type": "map", "data": {"config": {"items_expression": 'output["rows"] + nodes["extra"]["rows"]'}}})
+    assert not mapper.previous_output and mapper.branch_outputs
+    assert mapper.project_outputs({"src": 1, "extra": 2, "z": 3}, branch_ids=["src"]) == {"src": 1, "extra": 2}
+
+    legacy = input_spec_for({"id": "q", "type": "meta"})
+    assert legacy.all_node_outputs and legacy.project_outputs({"x": 1}) == {"x": 1}
+
+
+def test_activity_context_stays_constant_size_along_a_chain():
+    """
+    GIVEN a long chain of agents with every output already recorded
+    WHEN the context for the last agent is built
+    THEN it carries the identity and previous output, but none of the earlier outputs.
+    """
+    nodes = [{"id": "start", "type": "trigger", "data": {}}] + [
+        {"id": f"agent-{i}", "type": "agent", "data": {}} for i in range(50)
+    ]
+    graph = compile_workflow({"nodes": nodes, "edges": []})
+    wf = OrchestrationWorkflow()
+    wf.workflow_context = {"workflow_id": "wf-1", "execution_id": "ex-1", "input": {"q": "hi"}}
+    wf.node_outputs = {node["id"]: {"output": "x" * 1000} for node in nodes}
+
+    context = wf._build_activity_context("agent-49", graph.input_spec("agent-49"), {"output": "prev"}, ["agent-48"])
+
+    assert context == {
+        "workflow_id": "wf-1",
+        "execution_id": "ex-1",
+        "current_node_id": "agent-49",
+        "node_outputs": {},
+        "previous_output": {"output": "prev"},
+    }
+
+
+def test_condition_sees_the_outputs_it_names():
+    """
+    GIVEN a conditional reading one upstream node
+    WHEN it is evaluated against a projected node map
+    THEN the result matches evaluation against all outputs.
+    """
+    graph = compile_workflow({"nodes": [conditional('nodes["score"]["value"] > 0.5')], "edges": []})
+    wf = OrchestrationWorkflow()
+    wf.workflow_context = {"input": {}}
+    wf.node_outputs = {"score": {"value": 0.9}, "other": {"value": 0.1}}
+
+    assert wf._evaluate_condition(graph.condition("check"), None, graph.input_spec("check")) is True
+    assert wf._evaluate_condition(graph.condition("check"), None) is True
@@ -0,0 +1,165 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.response_cache import LocalLRUCache
+from app.core.single_flight import SingleFlight
+from app.services import agent_executor
+from app.services.agent_executor import AgentExecutor
+from app.services.llm_cache import LLMResponseCache, llm_request_key
+from app.services.output_mapper import output_mapper
+
+pytestmark = pytest.mark.asyncio
+
+
+def completion(text="positive"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = text
+    response.usage.prompt_tokens = 1000
+    response.usage.completion_tokens = 100
+    response.usage.model_dump.return_value = {"total_tokens": 1100}
+    return response
+
+
+@pytest.fixture
+def executor():
+    executor = AgentExecutor()
+    executor.openai_client = MagicMock()
+    executor.openai_client.chat.completions.create = AsyncMock(side_effect=lambda **params: completion())
+    executor.self_healing = MagicMock()
+    return executor
+
+
+@pytest.fixture
+def cache():
+    cache = LLMResponseCache(store=LocalLRUCache(1024 * 1024))
+    with patch.object(agent_executor, "llm_response_cache", cache):
+        yield cache
+
+
+def sentiment(executor, prompt="I love it", **kwargs):
+    return executor.execute(
+        name="Sentiment", system_instructions="Classify the sentiment.", input_data={"prompt": prompt},
+        **{"temperature": 0.0, "cache": True, **kwargs},
+    )
+
+
+async def test_identical_requests_are_served_from_the_cache(executor, cache):
+    """
+    GIVEN an agent with caching on at temperature 0
+    WHEN it runs twice on the same prompt
+    THEN the provider is called once, and the second result costs nothing, records
+    its saved cost as a cache hit, and stays out of the latency/reliability counts.
+    """
+    first = await sentiment(executor)
+    second = await sentiment(executor)
+
+    assert executor.openai_client.chat.completions.create.await_count == 1
+    assert first["cache"] == {"hit": False, "stored": True}
+    assert second["output"] == first["output"] and second["cost"] == 0.0
+    assert second["cache"]["hit"] and second["cache"]["cost_saved"] == pytest.approx(first["cost"])
+
+    executor.self_healing.record_agent_execution.assert_called_once()
+    assert executor.self_healing.record_agent_execution.call_args.kwargs["cache_miss"] is True
+    executor.self_healing.record_cache_hit.assert_called_once_with("openai", "gpt-4o-mini", cost_saved=pytest.approx(first["cost"]))
+    metrics = await cache.get_metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 1 and metrics["entries"] == 1 and metrics["hit_ratio"] == 0.5
+
+    mapped = output_mapper.map_output("agent", second, "sentiment")
+    assert mapped.from_cache and mapped.output == "positive"
+
+
+async def test_any_difference_in_the_request_is_a_miss(executor, cache):
+    """
+    GIVEN a cached answer for one request
+    WHEN the prompt, temperature or expected format differs, or caching is off
+    THEN each of those calls goes to the provider.
+    """
+    await sentiment(executor)
+    await sentiment(executor, prompt="I hate it")
+    await sentiment(executor, temperature=0.7)
+    await sentiment(executor, expected_output_format="JSON")
+    uncached = await sentiment(executor, cache=False)
+
+    assert executor.openai_client.chat.completions.create.await_count == 5
+    assert "cache" not in uncached and cache.metrics["hits"] == 0
+    assert llm_request_key("openai", "gpt-4o-mini", [{"role": "user", "content": "a"}], 0.0, None) != \
+        llm_request_key("openai", "gpt-4o", [{"role": "user", "content": "a"}], 0.0, None)
+
+
+async def test_sampled_requests_are_not_cached_unless_asked(executor, cache):
+    """
+    GIVEN caching on for an agent at temperature 0.7
+    WHEN the same request is made twice, then twice more with cache_sampled
+    THEN the first two both call the provider and never touch the cache; with
+    cache_sampled the second is answered from the cache.
+    """
+    first = await sentiment(executor, temperature=0.7)
+    second = await sentiment(executor, temperature=0.7)
+
+    assert executor.openai_client.chat.completions.create.await_count == 2
+    assert "cache" not in first and "cache" not in second
+    assert cache.metrics["hits"] == cache.metrics["misses"] == cache.metrics["stored"] == 0
+
+    await sentiment(executor, temperature=0.7, cache_sampled=True)
+    pinned = await sentiment(executor, temperature=0.7, cache_sampled=True)
+
+    assert executor.openai_client.chat.completions.create.await_count == 3
+    assert pinned["cache"]["hit"]
+
+
+async def test_requests_without_a_temperature_are_not_cached(executor, cache):
+    """
+    GIVEN caching on for an agent with no temperature set
+    WHEN the same request is made twice
+    THEN both call the provider, which samples at its own default, and the cache is never touched.
+    """
+    first = await sentiment(executor, temperature=None)
+    second = await sentiment(executor, temperature=None)
+
+    assert executor.openai_client.chat.completions.create.await_count == 2
+    assert "temperature" not in executor.openai_client.chat.completions.create.call_args.kwargs
+    assert "cache" not in first and "cache" not in second
+    assert cache.metrics["hits"] == cache.metrics["misses"] == cache.metrics["stored"] == 0
+
+
+async def test_failures_and_store_errors_are_not_cached(executor, cache):
+    """
+    GIVEN a provider that fails once, then a cache store that is down
+    WHEN the same request is made
+    THEN the failure is not replayed from the cache, and an unavailable store means a normal call.
+    """
+    executor.openai_client.chat.completions.create.side_effect = [RuntimeError("rate limited"), completion()]
+    with pytest.raises(RuntimeError):
+        await sentiment(executor)
+    assert (await sentiment(executor))["output"] == "positive"
+
+    cache.store = MagicMock(get=AsyncMock(side_effect=ConnectionError("redis down")), set=AsyncMock(side_effect=ConnectionError("redis down")))
+    executor.openai_client.chat.completions.create.side_effect = lambda **params: completion("neutral")
+    result = await sentiment(executor, prompt="It's fine")
+
+    assert result["output"] == "neutral" and result["cache"] == {"hit": False, "stored": False}
+    assert cache.metrics["errors"] == 2
+
+
+async def test_concurrent_identical_requests_share_one_provider_call(executor, cache):
+    """
+    GIVEN 20 identical cached requests started together, before the cache holds an answer
+    WHEN the provider answers
+    THEN it was called once; the other requests get the answer at no cost, and only
+    the call that was made is recorded and cached.
+    """
+    async def slow_completion(**params):
+        await asyncio.sleep(0.01)
+        return completion()
+
+    executor.openai_client.chat.completions.create.side_effect = slow_completion
+    with patch.object(agent_executor, "agent_single_flight", SingleFlight("test")) as flight:
+        results = await asyncio.gather(*(sentiment(executor, coalesce=True) for _ in range(20)))
+
+    assert executor.openai_client.chat.completions.create.await_count == 1
+    assert all(r["output"] == "positive" for r in results)
+    shared = [r for r in results if r.get("coalesced")]
+    assert len(shared) == 19 and all(r["cost"] == 0.0 and "cache" not in r for r in shared)
+    executor.self_healing.record_agent_execution.assert_called_once()
+    assert cache.metrics["stored"] == 1 and flight.metrics["coalesced"] == 19
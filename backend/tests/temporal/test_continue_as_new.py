@@ -0,0 +1,116 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from temporalio import workflow
+from app.services.compiled_workflow import compile_workflow
+from app.services.dag_scheduler import DagScheduler
+from app.temporal.workflows import OrchestrationWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+DEFINITION = {
+    "nodes": [
+        {"id": "start", "type": "trigger", "data": {}},
+        {"id": "draft", "type": "agent", "data": {}},
+        {"id": "review", "type": "approval", "data": {}},
+        {"id": "publish", "type": "agent", "data": {}},
+        {"id": "done", "type": "end", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "start", "target": "draft"},
+        {"id": "e2", "source": "draft", "target": "review"},
+        {"id": "e3", "source": "review", "target": "publish", "sourceHandle": "approve"},
+        {"id": "e4", "source": "publish", "target": "done"},
+    ],
+}
+
+
+def workflow_midway():
+    """A workflow that has run start, draft and review, with publish up next."""
+    graph = compile_workflow(DEFINITION)
+    scheduler = DagScheduler(graph)
+    scheduler.start("start")
+    wf = OrchestrationWorkflow()
+    wf._limits = {"history_length": 100, "history_bytes": 10_000}
+    wf.workflow_context = {"workflow_id": "wf-1", "execution_id": "ex-1", "input": {"input_text": "hi"}}
+    results = {
+        "start": {"input_text": "hi"},
+        "draft": {"output": "blob:sha256:" + "a" * 64, "model": "gpt-4o-mini", "cost": 0.01,
+                  "temperature_used": 0.7, "usage": {}},
+        "review": {"action": "approved", "approved_by": "sam"},
+    }
+    for node_id, result in results.items():
+        wf.node_outputs[node_id] = result
+        wf.execution_history.append({"node_id": node_id, "type": graph.get_node(node_id)["type"], "label": node_id,
+                                     "status": "success", "result": result, "error": None})
+        wf._map_output(graph.get_node(node_id), result)
+        scheduler.complete(node_id, ["review"] if node_id == "draft" else ["publish"] if node_id == "review" else None)
+    wf._approval_status, wf._approval_data = "approved", {"action": "approved"}  # early signal for a later approval
+    return wf, graph, scheduler
+
+
+async def test_queries_return_the_same_results_across_continue_as_new():
+    """
+    GIVEN a workflow checkpointed midway
+    WHEN its checkpoint goes through JSON (as a payload would) and a new run restores it
+    THEN get_state, get_execution_history, mapped outputs and scheduler state all match,
+    and the checkpoint does not repeat node results in the history.
+    """
+    wf, graph, scheduler = workflow_midway()
+    state = wf._checkpoint_state(("publish", ["review"]), scheduler)
+    assert all(entry["result"] is None for entry in state["execution_history"])
+
+    resumed = OrchestrationWorkflow()
+    new_scheduler = resumed._restore_checkpoint(json.loads(json.dumps(state)), graph)
+
+    assert resumed.get_state() == wf.get_state()
+    assert resumed.get_execution_history() == wf.get_execution_history()
+    assert resumed.mapped_outputs.keys() == wf.mapped_outputs.keys()
+    assert resumed.mapped_outputs["draft"].node_type == "agent"
+    assert new_scheduler.to_state() == scheduler.to_state()
+    assert (resumed._approval_status, resumed._continued_runs) == ("approved", 1)
+
+
+async def test_checkpoints_only_when_a_limit_is_passed_by_a_lone_branch():
+    """
+    GIVEN history limits of 100 events / 10 KB
+    WHEN history grows past either one, or a fan-out is in flight
+    THEN continue-as-new is only chosen past a limit with a single branch running.
+    """
+    wf, _, _ = workflow_midway()
+    info = MagicMock()
+    info.is_continue_as_new_suggested.return_value = False
+    info.get_current_history_size.return_value = 5_000
+
+    with patch.object(workflow, "info", return_value=info):
+        info.get_current_history_length.return_value = 50
+        assert not wf._should_continue_as_new()
+        info.get_current_history_length.return_value = 100
+        assert wf._should_continue_as_new()
+        info.get_current_history_length.return_value = 50
+        info.get_current_history_size.return_value = 20_000
+        assert wf._should_continue_as_new()
+        wf._active_branches = 2
+        assert not wf._should_continue_as_new()
+
+
+async def test_continue_as_new_flushes_events_and_carries_limits_and_state():
+    """
+    GIVEN buffered events and a workflow ready to checkpoint
+    WHEN it continues as new
+    THEN events are flushed first and the new run gets the same inputs, limits and state.
+    """
+    wf, _, scheduler = workflow_midway()
+    wf._workflow_def = DEFINITION
+    wf._flush_events = AsyncMock()
+    info = MagicMock()
+
+    with patch.object(workflow, "info", return_value=info), patch.object(workflow, "logger"), \
+            patch.object(workflow, "continue_as_new") as continue_as_new:
+        await wf._continue_as_new(("publish", ["review"]), scheduler)
+
+    wf._flush_events.assert_awaited_once()
+    workflow_id, definition, input_data, checkpoint = continue_as_new.call_args.kwargs["args"]
+    assert (workflow_id, definition, input_data) == ("wf-1", DEFINITION, {"input_text": "hi"})
+    assert checkpoint["limits"] == wf._limits
+    assert checkpoint["state"]["next_node"] == ["publish", ["review"]]
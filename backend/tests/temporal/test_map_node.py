@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from temporalio import workflow
+from temporalio.exceptions import ApplicationError
+from app.core.blob_store import BlobStore, FilesystemBlobBackend, is_blob_ref
+from app.schemas.node_outputs import MapOutput
+from app.services.output_mapper import output_mapper
+from app.temporal import activities
+from app.temporal.workflows import MapShardWorkflow, OrchestrationWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+
+def map_node(**config):
+    steps = [{"id": "classify", "type": "agent", "data": {"config": {"name": "Classify"}}}]
+    return {"id": "tickets", "type": "map", "data": {"config": {"name": "Tickets", "steps": steps, **config}}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlobStore(backend=FilesystemBlobBackend(root=str(tmp_path / "blobs")), threshold_bytes=1024, cache_size=64)
+    with patch.object(activities, "blob_store", store):
+        yield store
+
+
+async def test_batches_retry_items_and_keep_item_order(store):
+    """
+    GIVEN seven tickets, one flaky and one that always fails
+    WHEN they are prepared, run in batches of three and collected
+    THEN results come back in item order, the flaky item is retried, the broken one
+    is reported with its attempts, and the output maps as a partial MapOutput.
+    """
+    node = map_node(items_expression='output["body"]["tickets"]', batch_size=3,
+                    item_max_attempts=2, item_retry_interval_seconds=0, on_item_failure="continue")
+    context = {"workflow_id": "wf-1", "execution_id": "ex-1", "node_outputs": {
+        "fetch": {"status_code": 200, "body": {"tickets": [f"ticket {i}" for i in range(7)]}},
+    }, "incoming_branch_node_ids": ["fetch"]}
+    attempts = {}
+
+    async def agent(step, step_context):
+        prompt = step_context["previous_output"]["prompt"]
+        attempts[prompt] = attempts.get(prompt, 0) + 1
+        if prompt == "ticket 5" or (prompt == "ticket 2" and attempts[prompt] == 1):
+            raise RuntimeError("rate limited")
+        return {"output": prompt.upper(), "model": "gpt-4o-mini", "cost": 0.0, "temperature_used": 0.7, "usage": {}}
+
+    with patch.object(activities, "execute_agent_node", side_effect=agent):
+        prepared = await activities.prepare_map_items(node, context)
+        batches = [
+            await activities.execute_map_batch(node, ref, index * 3, prepared["total_items"], context)
+            for index, ref in enumerate(prepared["batches"])
+        ]
+        output = await activities.collect_map_results(node, list(reversed(batches)), prepared["total_items"], context)
+
+    assert prepared["total_items"] == 7 and len(prepared["batches"]) == 3
+    assert all(is_blob_ref(batch["results"]) for batch in batches)
+    results = output["merged_data"]["results"]
+    assert [r["output"] if r else None for r in results] == ["TICKET 0", "TICKET 1", "TICKET 2", "TICKET 3", "TICKET 4", None, "TICKET 6"]
+    assert attempts["ticket 2"] == 2
+    assert output["failed_items"] == [{"index": 5, "error": "rate limited", "attempts": 2}]
+
+    mapped = output_mapper.map_output("map", output, "tickets")
+    assert isinstance(mapped, MapOutput)
+    assert mapped.status == "partial" and mapped.items_processed == 6 and mapped.has_more is False
+    assert mapped.sources == ["fetch"]
+
+
+async def run_map(node, total_items, batch_count):
+    """Runs _run_map against fake activities and child workflows; returns (result, calls, peak batches in flight)."""
+    in_flight, peak, children = 0, 0, []
+
+    async def execute_activity(fn, args, **kwargs):
+        nonlocal in_flight, peak
+        if fn is activities.prepare_map_items:
+            return {"total_items": total_items, "batches": [f"batch-{i}" for i in range(batch_count)]}
+        if fn is activities.collect_map_results:
+            batch_outputs, total = args[1], args[2]
+            return {"failed_count": sum(len(b["failed"]) for b in batch_outputs), "batch_order": [b["start_index"] for b in batch_outputs]}
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return {"start_index": args[2], "count": 1, "results": args[1], "failed": [] if args[1] != "batch-3" else [{"index": 3}]}
+
+    async def execute_child_workflow(run, args, id):
+        children.append((id, args[1], args[2], args[5]))
+        return await MapShardWorkflow().run(*args)
+
+    wf = OrchestrationWorkflow()
+    with patch.object(workflow, "execute_activity", side_effect=execute_activity), \
+         patch.object(workflow, "execute_child_workflow", side_effect=execute_child_workflow), \
+         patch.object(workflow, "info", return_value=MagicMock(workflow_id="ex-1")), \
+         patch.object(workflow, "logger", MagicMock()):
+        result = await wf._run_map(node, {"workflow_id": "wf-1", "execution_id": "ex-1"})
+    return result, children, peak
+
+
+async def test_large_maps_are_sharded_into_child_workflows_within_the_concurrency_limit():
+    """
+    GIVEN 20 items in batches of 2 with a shard size of 6 and a concurrency of 4 items
+    WHEN the map node runs
+    THEN four child workflows get consecutive batch ranges, no more than two batches
+    run at once, and batch outputs reach the collector in item order.
+    """
+    node = map_node(batch_size=2, shard_size=6, max_concurrency=4, on_item_failure="continue")
+
+    result, children, peak = await run_map(node, total_items=20, batch_count=10)
+
+    assert [(first, len(refs)) for _, refs, first, _ in children] == [(0, 3), (3, 3), (6, 3), (9, 1)]
+    assert children[0][0] == "ex-1-tickets-shard-0"
+    assert peak <= 2
+    assert result["batch_order"] == [0, 2, 4, 6, 8, 10, 12, 14, 16, 18]
+
+
+async def test_item_failures_fail_the_node_unless_configured_to_continue():
+    """
+    GIVEN a small map whose fourth batch reports a failed item
+    WHEN it runs with the default on_item_failure
+    THEN the node fails without starting child workflows.
+    """
+    with pytest.raises(ApplicationError, match="1 of 8 map items failed"):
+        await run_map(map_node(batch_size=2), total_items=8, batch_count=4)
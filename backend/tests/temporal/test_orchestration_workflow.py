@@ -0,0 +1,247 @@
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+from temporalio import workflow
+from app.temporal import workflows
+from app.temporal.workflows import OrchestrationWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+REPORT_REF = "blob:sha256:" + "a" * 64
+
+BRANCH_ON_OFFLOADED = {
+    "nodes": [
+        {"id": "start", "type": "trigger", "data": {}},
+        {"id": "research", "type": "agent", "data": {}},
+        {"id": "check", "type": "conditional",
+         "data": {"config": {"condition_expression": 'nodes["research"]["output"].startswith("LONG")'}}},
+        {"id": "summary", "type": "agent", "data": {}},
+        {"id": "done", "type": "end", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "start", "target": "research"},
+        {"id": "e2", "source": "research", "target": "check"},
+        {"id": "e3", "source": "check", "target": "summary", "sourceHandle": "true"},
+        {"id": "e4", "source": "check", "target": "done", "sourceHandle": "false"},
+        {"id": "e5", "source": "summary", "target": "done"},
+    ],
+}
+
+FAN_OUT = {
+    "nodes": [
+        {"id": "start", "type": "trigger", "data": {}},
+        {"id": "research", "type": "agent", "data": {}},
+        {"id": "summary", "type": "agent", "data": {}},
+        {"id": "notify", "type": "agent", "data": {}},
+        {"id": "done", "type": "end", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "start", "target": "research"},
+        {"id": "e2", "source": "research", "target": "summary"},
+        {"id": "e3", "source": "research", "target": "notify"},
+        {"id": "e4", "source": "summary", "target": "done"},
+    ],
+}
+
+
+DIAMOND = {
+    "nodes": [
+        {"id": "start", "type": "trigger", "data": {}},
+        {"id": "fetch", "type": "agent", "data": {}},
+        {"id": "enrich", "type": "agent", "data": {}},
+        {"id": "score", "type": "agent", "data": {}},
+        {"id": "join", "type": "merge", "data": {}},
+        {"id": "done", "type": "end", "data": {}},
+    ],
+    "edges": [
+        {"id": "e1", "source": "start", "target": "fetch"},
+        {"id": "e2", "source": "fetch", "target": "enrich"},
+        {"id": "e3", "source": "fetch", "target": "score"},
+        {"id": "e4", "source": "enrich", "target": "join"},
+        {"id": "e5", "source": "score", "target": "join"},
+        {"id": "e6", "source": "join", "target": "done"},
+    ],
+}
+
+
+class Activities:
+    """
+    Stand-in for workflow.execute_activity: records node activities and answers them.
+    Nodes in `fail` raise once every node in `blocked` has started; nodes in `blocked` wait until cancelled.
+    """
+
+    def __init__(self, fail=(), blocked=(), outputs=None):
+        self.nodes = []
+        self.outputs = outputs or {}
+        self.published = []
+        self.merged_from = None
+        self.compensated = []
+        self.cancelled = []
+        self.fail, self.blocked = set(fail), set(blocked)
+
+    async def __call__(self, fn, args, **kwargs):
+        node = args[0]
+        if fn is workflows.publish_generic_event:
+            self.published.append(args[0])
+            return None
+        if fn is workflows.publish_workflow_status:
+            self.published.append(f"workflow.{args[2]}")
+            return None
+        if fn is workflows.compensate_node:
+            self.compensated.append(node["id"])
+            return {}
+        if fn is workflows.execute_merge_node:
+            self.merged_from = sorted(args[1]["incoming_branch_node_ids"])
+            return {"merged_data": {}}
+        if fn is not workflows.execute_agent_node:
+            return {}
+        self.nodes.append(node["id"])
+        if node["id"] in self.blocked:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled.append(node["id"])
+                raise
+        if node["id"] in self.fail:
+            while not self.blocked <= set(self.nodes):
+                await asyncio.sleep(0)
+            raise RuntimeError("provider unavailable")
+        output = self.outputs.get(node["id"], node["id"].upper())
+        return {"output": output, "model": "gpt-4o-mini", "cost": 0.0, "temperature_used": 0.7, "usage": {}}
+
+
+async def run(definition, patched=True, activities=None, local_activity=None):
+    wf, activities = OrchestrationWorkflow(), activities or Activities()
+    info = MagicMock(workflow_id="ex-1")
+    info.is_continue_as_new_suggested.return_value = False
+    info.get_current_history_length.return_value = 0
+    info.get_current_history_size.return_value = 0
+    with patch.object(workflow, "info", return_value=info), patch.object(workflow, "logger"), \
+            patch.object(workflow, "now", return_value=datetime(2026, 1, 1)), \
+            patch.object(workflow, "wait_condition", AsyncMock()), \
+            patch.object(workflow, "patched", return_value=patched), \
+            patch.object(workflow, "execute_local_activity", local_activity or AsyncMock()), \
+            patch.object(workflow, "execute_activity", activities):
+        result = await wf.run("wf-1", definition, {"input_text": "hi"}, {"limits": {"history_length": 100, "history_bytes": 10_000}})
+    assert wf._active_branches == 1
+    return result, activities
+
+
+async def test_executions_started_before_the_scheduler_replay_sequentially():
+    """
+    GIVEN a node with two outgoing edges
+    WHEN the run is a replay of a history recorded without the dag-scheduler patch
+    THEN it follows only the first edge, as the sequential loop did; new runs take both.
+    """
+    legacy, legacy_activities = await run(FAN_OUT, patched=False)
+    current, current_activities = await run(FAN_OUT)
+
+    assert legacy["status"] == "completed" and legacy["result"]["output"] == "SUMMARY"
+    assert legacy_activities.nodes == ["research", "summary"]
+    assert sorted(current_activities.nodes) == ["notify", "research", "summary"]
+
+
+async def test_executions_started_before_batching_publish_each_event():
+    """
+    GIVEN a run replaying a history recorded without the batched-events patch
+    WHEN its nodes run
+    THEN every lifecycle event is its own activity, in order, and nothing goes through
+    the batch; new runs send the same events in publish_event_batch local activities.
+    """
+    activities, local_activity = Activities(), AsyncMock()
+    await run(FAN_OUT, activities=activities, local_activity=local_activity)
+
+    assert activities.published == []
+    batched = [event["event_type"] for call in local_activity.await_args_list for event in call.kwargs["args"][0]]
+    assert batched[0] == "workflow.started" and batched[-1] == "workflow.completed"
+
+    legacy_activities, legacy_local_activity = Activities(), AsyncMock()
+    legacy, _ = await run(FAN_OUT, patched=False, activities=legacy_activities, local_activity=legacy_local_activity)
+
+    assert legacy["status"] == "completed"
+    legacy_local_activity.assert_not_awaited()
+    assert legacy_activities.published == [
+        "workflow.started",
+        "node.started", "node.completed",  # start
+        "node.started", "node.completed",  # research
+        "node.started", "node.completed",  # summary
+        "workflow.completed",
+    ]
+
+
+async def test_the_end_node_is_not_part_of_the_history():
+    """
+    GIVEN a run that reaches its end node
+    WHEN it completes
+    THEN the end node captures the output of the node before it but is not an
+    execution_history entry, so it is never offered for compensation.
+    """
+    result, _ = await run(FAN_OUT)
+
+    assert result["result"]["output"] == "SUMMARY"
+    assert "done" not in [entry["node_id"] for entry in result["execution_history"]]
+
+
+async def test_parallel_branches_join_at_the_merge():
+    """
+    GIVEN a node fanning out to two branches that meet at a merge node
+    WHEN the run completes
+    THEN both branches run, and the merge runs once with both of them as its sources.
+    """
+    result, activities = await run(DIAMOND)
+
+    assert result["status"] == "completed"
+    assert activities.nodes[0] == "fetch" and sorted(activities.nodes[1:]) == ["enrich", "score"]
+    assert activities.merged_from == ["enrich", "score"]
+    assert [entry["node_id"] for entry in result["execution_history"]][-1] == "join"
+
+
+async def test_a_failed_branch_cancels_its_sibling_and_compensates_once():
+    """
+    GIVEN two parallel branches, one still running when the other fails
+    WHEN the failure reaches the fan-out
+    THEN the sibling is cancelled, the merge never runs, and the nodes that succeeded
+    are compensated once, most recent first.
+    """
+    activities = Activities(fail={"score"}, blocked={"enrich"})
+    result, _ = await run(DIAMOND, activities=activities)
+
+    assert result["status"] == "failed" and "provider unavailable" in result["error"]
+    assert activities.cancelled == ["enrich"] and activities.merged_from is None
+    statuses = {entry["node_id"]: entry["status"] for entry in result["execution_history"]}
+    assert statuses == {"start": "success", "fetch": "success", "enrich": "cancelled", "score": "failed"}
+    assert activities.compensated == ["fetch", "start"]
+
+
+async def test_conditions_and_the_final_output_see_offloaded_content():
+    """
+    GIVEN an agent output offloaded to a blob reference, a condition on it, and a
+    final output that is a reference as well
+    WHEN the run completes
+    THEN the condition compares the stored content, and the result holds the content
+    rather than the reference, both loaded through the resolve_blob_refs local activity.
+    """
+    blobs = {REPORT_REF: "LONG REPORT " * 2000}
+    summary_ref = "blob:sha256:" + "b" * 64
+    blobs[summary_ref] = "SUMMARY " * 2000
+
+    def resolve(value):
+        if isinstance(value, dict):
+            return {key: resolve(item) for key, item in value.items()}
+        return blobs.get(value, value) if isinstance(value, str) else value
+
+    resolved = []
+
+    async def local_activity(fn, args, **kwargs):
+        if fn is workflows.resolve_blob_refs:
+            resolved.append(args[0])
+            return resolve(args[0])
+        return None
+
+    activities = Activities(outputs={"research": REPORT_REF, "summary": summary_ref})
+    result, _ = await run(BRANCH_ON_OFFLOADED, activities=activities, local_activity=local_activity)
+
+    assert activities.nodes == ["research", "summary"]
+    assert result["result"]["output"] == blobs[summary_ref]
+    assert len(resolved) == 2